@@ -2,6 +2,15 @@ from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
 from django.contrib.auth.models import Group
 from .models import User,Order,FarmProduct,WeatherReport,FarmingUpdate
+from . import search
+
+
+class FullTextSearchMixin:
+    # Admin search box goes through the full-text index instead of icontains scans
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term.strip():
+            return queryset, False
+        return search.search(queryset, search_term), False
 
 
 @admin.register(User)   # instead of admin.site.register(User, CustomUserAdmin)
@@ -21,7 +30,7 @@ class CustomUserAdmin(UserAdmin):
 
 
 @admin.register(FarmProduct)
-class FarmProductAdmin(admin.ModelAdmin):
+class FarmProductAdmin(FullTextSearchMixin, admin.ModelAdmin):
     list_display = ("id", "name", "price_per_unit", "quantity", "created_at")
     search_fields = ("name",)
     list_filter = ("created_at",)
@@ -41,7 +50,7 @@ class WeatherReportAdmin(admin.ModelAdmin):
     search_fields = ("location", "temperature","humidity")
 
 @admin.register(FarmingUpdate)
-class FarmingUpdateAdmin(admin.ModelAdmin):
+class FarmingUpdateAdmin(FullTextSearchMixin, admin.ModelAdmin):
     model = FarmingUpdate
     list_display= ("title", "category",)
     search_fields = ("title",)
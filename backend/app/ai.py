@@ -0,0 +1,204 @@
+import asyncio
+import json
+import re
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from concurrent.futures import Future
+
+import openai
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+MODEL = "gpt-4o-mini"  # lightweight + fast
+SYSTEM_PROMPT = "You are AgriConnect AI, helping farmers with agriculture-related queries."
+MAX_TOKENS = 300
+
+
+def normalize_question(question):
+    """
+    Reduce a question to its cache key: case, spacing and trailing
+    punctuation don't change the answer ("When to sow wheat?" == "when to sow  wheat").
+    """
+    question = " ".join(question.casefold().split())
+    return re.sub(r"[\s?!.]+$", "", question)
+
+
+class AnswerCache:
+    """
+    Bounded LRU cache of answers with a TTL, which also collapses identical
+    in-flight questions into one model call.
+    """
+
+    def __init__(self, max_entries, ttl, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.clock = clock
+        self._entries = OrderedDict()  # key -> (expires_at, answer)
+        self._inflight = {}  # key -> Future
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.coalesced = self.evictions = 0
+
+    def get_or_compute(self, key, compute):
+        """Return (answer, cached). `compute` runs at most once per key at a time."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > self.clock():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1], True
+            if entry is not None:
+                del self._entries[key]
+
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                self.misses += 1
+                future = self._inflight[key] = Future()
+            else:
+                self.coalesced += 1
+
+        if not owner:
+            # Another request is already asking the model; share its answer.
+            return future.result(), True
+
+        try:
+            answer = compute()
+        except BaseException as exc:
+            future.set_exception(exc)
+            raise
+        else:
+            future.set_result(answer)
+            self.put(key, answer)
+            return answer, False
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def get(self, key):
+        """Return the cached answer for `key` or None, counting the lookup."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > self.clock():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            return None
+
+    def put(self, key, answer):
+        with self._lock:
+            self._entries[key] = (self.clock() + self.ttl, answer)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses + self.coalesced
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "evictions": self.evictions,
+                "hit_rate": round((self.hits + self.coalesced) / lookups, 4) if lookups else 0.0,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.coalesced = self.evictions = 0
+
+
+answer_cache = AnswerCache(settings.ASK_AI_CACHE_SIZE, settings.ASK_AI_CACHE_TTL)
+
+_client = None
+# AsyncOpenAI's connection pool belongs to the loop it was first used on, so
+# each event loop gets its own client; they go when their loop does
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def get_client():
+    # One client per process keeps its HTTP connection pool warm
+    global _client
+    if _client is None:
+        _client = openai.OpenAI(api_key=settings.OPENAI_API_KEY)
+    return _client
+
+
+def get_async_client():
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = _async_clients[loop] = openai.AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
+    return client
+
+
+def _messages(question):
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": question},
+    ]
+
+
+def ask_model(question):
+    response = get_client().chat.completions.create(
+        model=MODEL,
+        messages=_messages(question),
+        max_tokens=MAX_TOKENS,
+    )
+    return response.choices[0].message.content
+
+
+def ask(question):
+    """Return (answer, cached) for `question`, going to the model only on a miss."""
+    return answer_cache.get_or_compute(normalize_question(question), lambda: ask_model(question))
+
+
+# --------------------------
+# Server-sent events
+# --------------------------
+def sse_event(data, event=None):
+    payload = json.dumps(data, cls=DjangoJSONEncoder)
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {payload}\n\n"
+
+
+async def stream_answer(question):
+    """
+    Yield SSE frames for `question`: one `data: {"token": ...}` frame per
+    model delta as it arrives, then an `event: done` frame. A cached answer
+    is replayed as a single token. The full answer is cached once complete.
+    """
+    key = normalize_question(question)
+    answer = answer_cache.get(key)
+    if answer is not None:
+        yield sse_event({"token": answer})
+        yield sse_event({"cached": True}, event="done")
+        return
+
+    parts = []
+    try:
+        stream = await get_async_client().chat.completions.create(
+            model=MODEL,
+            messages=_messages(question),
+            max_tokens=MAX_TOKENS,
+            stream=True,
+        )
+        async for chunk in stream:
+            if not chunk.choices:
+                continue
+            token = chunk.choices[0].delta.content
+            if token:
+                parts.append(token)
+                yield sse_event({"token": token})
+    except Exception as e:
+        yield sse_event({"error": str(e)}, event="error")
+        return
+
+    answer_cache.put(key, "".join(parts))
+    yield sse_event({"cached": False}, event="done")
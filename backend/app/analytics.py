@@ -0,0 +1,286 @@
+"""
+Precomputed order analytics for the dashboard and /api/users/analytics/.
+
+Every order counts once in three OrderRollup rows — its farmer's, its
+buyer's and its product's — for the day it was placed. Order writes apply
+their delta to those rows in the same transaction: post_save/post_delete
+for single rows (creation, status changes, admin edits, cascades) and
+record_created() for checkout's bulk_create(), which sends no signals.
+Reads then cost one index range scan over at most a row per day, however
+many orders there are.
+
+Writes that bypass the ORM (QuerySet.update(), raw SQL) are not tracked;
+`manage.py rebuild_analytics` recomputes every rollup from app_order.
+"""
+import threading
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncDate
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.utils import timezone
+
+from .models import FarmProduct, Order, OrderRollup
+
+STATUSES = [value for value, _ in Order._meta.get_field("status").choices]
+# Orders in these statuses are counted but add no quantity or revenue
+UNBOOKED = {"cancelled"}
+COLUMNS = [*STATUSES, "quantity", "revenue"]
+SCOPES = {
+    # scope: Order lookup of its id
+    "farmer": "product__farmer",
+    "buyer": "buyer",
+    "product": "product",
+}
+
+
+# ---- Deltas ----
+def _state(order):
+    return tuple(getattr(order, field) for field in Order.ROLLUP_FIELDS)
+
+
+def farmer_id(order, product_id):
+    """The farmer of `product_id`, without a query when the product is cached or being deleted."""
+    if Order.product.is_cached(order) and order.product.pk == product_id:
+        return order.product.farmer_id
+    deleting = getattr(_deleting, "farmers", {})
+    if product_id in deleting:
+        return deleting[product_id]
+    return FarmProduct.objects.filter(pk=product_id).values_list("farmer_id", flat=True).first()
+
+
+# A cascade deletes a product's orders before the product itself, and their
+# instances don't carry it; remember the farmers of the products being deleted
+_deleting = threading.local()
+
+
+def _on_product_pre_delete(sender, instance, **kwargs):
+    if not hasattr(_deleting, "farmers"):
+        _deleting.farmers = {}
+    _deleting.farmers[instance.pk] = instance.farmer_id
+
+
+def _on_product_delete(sender, instance, **kwargs):
+    getattr(_deleting, "farmers", {}).pop(instance.pk, None)
+
+
+def _add(deltas, order, state, sign):
+    product_id, buyer_id, status, quantity, total_price = state
+    values = {status: sign}
+    if status not in UNBOOKED:
+        values["quantity"] = sign * quantity
+        values["revenue"] = sign * total_price
+
+    day = timezone.localdate(order.created_at)
+    for scope, scope_id in [
+        ("farmer", farmer_id(order, product_id)),
+        ("buyer", buyer_id),
+        ("product", product_id),
+    ]:
+        if scope_id is None:
+            continue
+        row = deltas[scope, scope_id, day]
+        for column, amount in values.items():
+            row[column] += amount
+
+
+def apply(deltas):
+    """Add {(scope, scope_id, day): {column: amount}} to the rollups."""
+    # A fixed order keeps concurrent checkouts from deadlocking on shared rows
+    changes = []
+    for key, values in sorted(deltas.items()):
+        values = {column: amount for column, amount in values.items() if amount}
+        if values:
+            changes.append((key, values))
+    if not changes:
+        return
+    if connection.vendor in ("postgresql", "sqlite"):
+        _upsert(changes)
+        return
+    for (scope, scope_id, day), values in changes:
+        rows = OrderRollup.objects.filter(scope=scope, scope_id=scope_id, day=day)
+        increments = {column: F(column) + amount for column, amount in values.items()}
+        if rows.update(**increments):
+            continue
+        try:
+            with transaction.atomic():
+                OrderRollup.objects.create(scope=scope, scope_id=scope_id, day=day, **values)
+        except IntegrityError:
+            # another transaction created the row first
+            rows.update(**increments)
+
+
+def _upsert(changes):
+    # One INSERT ... ON CONFLICT that adds to existing rows, whatever the basket size
+    quote = connection.ops.quote_name
+    table = quote(OrderRollup._meta.db_table)
+    fields = [OrderRollup._meta.get_field(name) for name in ["scope", "scope_id", "day", *COLUMNS]]
+    params = []
+    for key, values in changes:
+        row = [*key, *(values.get(column, 0) for column in COLUMNS)]
+        params.extend(field.get_db_prep_value(value, connection) for field, value in zip(fields, row))
+    placeholders = "(%s)" % ", ".join(["%s"] * len(fields))
+    sql = "INSERT INTO {table} ({columns}) VALUES {rows} ON CONFLICT ({key}) DO UPDATE SET {updates}".format(
+        table=table,
+        columns=", ".join(quote(field.column) for field in fields),
+        rows=", ".join([placeholders] * len(changes)),
+        key=", ".join(quote(name) for name in ["scope", "scope_id", "day"]),
+        updates=", ".join(f"{quote(column)} = {table}.{quote(column)} + excluded.{quote(column)}" for column in COLUMNS),
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+
+
+def _new_deltas():
+    return defaultdict(lambda: defaultdict(int))
+
+
+def record_created(orders):
+    """Count freshly bulk-created orders."""
+    deltas = _new_deltas()
+    for order in orders:
+        order._rollup_state = _state(order)
+        _add(deltas, order, order._rollup_state, 1)
+    apply(deltas)
+
+
+def _on_order_save(sender, instance, created=False, raw=False, **kwargs):
+    if raw:
+        return  # fixtures; rebuild_analytics afterwards
+    old = None if created else getattr(instance, "_rollup_state", None)
+    new = _state(instance)
+    if not created and old is None:
+        return  # not loaded from the database whole; nothing to diff against
+    if old == new:
+        return
+    deltas = _new_deltas()
+    if old is not None:
+        _add(deltas, instance, old, -1)
+    _add(deltas, instance, new, 1)
+    apply(deltas)
+    instance._rollup_state = new
+
+
+def _on_order_delete(sender, instance, **kwargs):
+    deltas = _new_deltas()
+    _add(deltas, instance, getattr(instance, "_rollup_state", None) or _state(instance), -1)
+    apply(deltas)
+
+
+post_save.connect(_on_order_save, sender=Order, dispatch_uid="analytics-order-save")
+post_delete.connect(_on_order_delete, sender=Order, dispatch_uid="analytics-order-delete")
+pre_delete.connect(_on_product_pre_delete, sender=FarmProduct, dispatch_uid="analytics-product-pre-delete")
+post_delete.connect(_on_product_delete, sender=FarmProduct, dispatch_uid="analytics-product-delete")
+
+
+# ---- Rebuild ----
+@transaction.atomic
+def rebuild(batch_size=1000, apps=None):
+    """
+    Recompute every rollup from app_order; returns the number of rows
+    written. A migration passes its `apps` to run this on historical models.
+    """
+    orders, rollups = (Order, OrderRollup) if apps is None else (
+        apps.get_model("app", "Order"), apps.get_model("app", "OrderRollup")
+    )
+    rollups.objects.all().delete()
+    booked = ~Q(status__in=UNBOOKED)
+    written = 0
+    for scope, lookup in SCOPES.items():
+        rows = (
+            orders.objects.annotate(day=TruncDate("created_at"))
+            .values(lookup, "day")
+            .annotate(
+                **{status: Count("id", filter=Q(status=status)) for status in STATUSES},
+                sold=Sum("quantity", filter=booked),
+                earned=Sum("total_price", filter=booked),
+            )
+            .order_by()
+        )
+        created = rollups.objects.bulk_create(
+            (
+                rollups(
+                    scope=scope,
+                    scope_id=row[lookup],
+                    day=row["day"],
+                    **{status: row[status] for status in STATUSES},
+                    quantity=row["sold"] or 0,
+                    revenue=row["earned"] or 0,
+                )
+                for row in rows.iterator()
+            ),
+            batch_size=batch_size,
+        )
+        written += len(created)
+    return written
+
+
+# ---- Reads ----
+def _sums():
+    # aliased: annotations may not shadow the model's own fields
+    return {f"sum_{column}": Sum(column) for column in COLUMNS}
+
+
+def _unalias(row):
+    return {column: row[f"sum_{column}"] or 0 for column in COLUMNS}
+
+
+def _totals(rows):
+    totals = dict.fromkeys(COLUMNS, 0)
+    for row in rows:
+        for column in COLUMNS:
+            totals[column] += row[column]
+    return _format(totals)
+
+
+def _format(row):
+    return {
+        "orders": sum(row[status] for status in STATUSES),
+        "by_status": {status: row[status] for status in STATUSES},
+        "quantity": str(Decimal(row["quantity"]).quantize(Decimal("0.01"))),
+        "revenue": str(Decimal(row["revenue"]).quantize(Decimal("0.01"))),
+    }
+
+
+def scope_for(user):
+    return "farmer" if getattr(user, "is_farmer", False) else "buyer"
+
+
+def lifetime(user, scope):
+    """All-time totals of the orders a user received ("farmer") or placed ("buyer")."""
+    rows = OrderRollup.objects.filter(scope=scope, scope_id=user.pk)
+    return _format(_unalias(rows.aggregate(**_sums())))
+
+
+def report(user, start, end):
+    """Daily series and totals between `start` and `end` (inclusive dates)."""
+    scope = scope_for(user)
+    daily = list(
+        OrderRollup.objects.filter(scope=scope, scope_id=user.pk, day__range=(start, end))
+        .order_by("day")
+        .values("day", *COLUMNS)
+    )
+    data = {
+        "scope": scope,
+        "from": start.isoformat(),
+        "to": end.isoformat(),
+        "totals": _totals(daily),
+        "daily": [{"day": row["day"].isoformat(), **_format(row)} for row in daily],
+    }
+
+    if scope == "farmer":
+        products = FarmProduct.objects.filter(farmer=user)
+        per_product = list(
+            OrderRollup.objects.filter(scope="product", scope_id__in=products.values("id"), day__range=(start, end))
+            .values("scope_id")
+            .annotate(**_sums())
+            .order_by("-sum_revenue", "scope_id")
+        )
+        names = dict(products.filter(id__in=[row["scope_id"] for row in per_product]).values_list("id", "name"))
+        data["products"] = [
+            {"product_id": row["scope_id"], "name": names.get(row["scope_id"]), **_format(_unalias(row))}
+            for row in per_product
+        ]
+    return data
@@ -4,3 +4,18 @@ from django.apps import AppConfig
 class AppConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "app"
+
+    def ready(self):
+        # connects the signals that keep the fallback search index in step
+        from . import search  # noqa: F401
+        # and the ones that expire cached public responses
+        from . import response_cache  # noqa: F401
+        # and the ones that expire JWT user claims on user changes
+        from . import authentication  # noqa: F401
+        # and the ones that record deletions for /api/sync/
+        from . import sync  # noqa: F401
+        # and the ones that keep the order rollups current
+        from . import analytics  # noqa: F401
+        # and the ones that put the request metrics' and slow-query log's SQL
+        # hooks on every connection
+        from . import metrics, slow_queries  # noqa: F401
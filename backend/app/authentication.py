@@ -0,0 +1,135 @@
+"""
+JWT authentication without a per-request user lookup.
+
+Access tokens carry the user fields the API reads on every request
+(USER_CLAIM_FIELDS), and ClaimsJWTAuthentication rebuilds `request.user`
+from them as a User instance whose other fields are deferred — so
+`filter(farmer=request.user)` and FK assignment work, and reading e.g.
+`user.email` still lazily loads it.
+
+Revocation: saving or deleting a user (role change, deactivation, new
+password) writes a "changed at" marker to the cache for one access-token
+lifetime. Tokens issued before the marker are not trusted for claims and
+go through the regular database lookup instead, which also enforces
+is_active. With several workers, CACHE_URL must point at a shared store
+for the marker to reach all of them.
+"""
+import math
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import router
+from django.db.models.signals import post_delete, post_save
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+User = get_user_model()
+
+USER_CLAIM = "usr"
+USER_CLAIM_FIELDS = (
+    # everything ProfileSerializer renders, so rendering request.user never lazy-loads
+    "username",
+    "email",
+    "phone_number",
+    "is_active",
+    "is_staff",
+    "is_superuser",
+    "is_farmer",
+    "is_buyer",
+    "location",
+    "latitude",
+    "longitude",
+)
+# Other fields whose change must invalidate outstanding tokens
+REVOKING_FIELDS = {"password", *USER_CLAIM_FIELDS}
+REVOCATION_TTL = int(api_settings.ACCESS_TOKEN_LIFETIME.total_seconds())
+
+
+def set_user_claims(token, user):
+    token[USER_CLAIM] = {field: getattr(user, field) for field in USER_CLAIM_FIELDS}
+    return token
+
+
+def user_from_claims(user_id, claims):
+    """A User built from token claims with every other field deferred, or None."""
+    try:
+        loaded = {"id": int(user_id), **{field: claims[field] for field in USER_CLAIM_FIELDS}}
+    except (KeyError, TypeError, ValueError):
+        return None  # token from before a claim was added
+    # from_db() expects the values in the model's field order
+    names = [field.attname for field in User._meta.concrete_fields if field.attname in loaded]
+    return User.from_db(router.db_for_read(User), names, [loaded[name] for name in names])
+
+
+# ---- Revocation markers ----
+def revocation_key(user_id):
+    return f"auth:changed:{user_id}"
+
+
+def mark_changed(user_id):
+    # Rounded up so a token issued earlier in the same second counts as stale
+    cache.set(revocation_key(user_id), math.ceil(time.time()), REVOCATION_TTL)
+
+
+def is_stale(user_id, issued_at):
+    changed_at = cache.get(revocation_key(user_id))
+    return changed_at is not None and (issued_at is None or issued_at < changed_at)
+
+
+def _on_user_save(sender, instance, created=False, update_fields=None, **kwargs):
+    if created:
+        return  # no tokens exist yet
+    if update_fields is not None and not REVOKING_FIELDS.intersection(update_fields):
+        return  # e.g. last_login, geohash-only saves
+    mark_changed(instance.pk)
+
+
+def _on_user_delete(sender, instance, **kwargs):
+    mark_changed(instance.pk)
+
+
+post_save.connect(_on_user_save, sender=User, dispatch_uid="auth-claims-user-save")
+post_delete.connect(_on_user_delete, sender=User, dispatch_uid="auth-claims-user-delete")
+
+
+# ---- Tokens ----
+class ClaimsRefreshToken(RefreshToken):
+    """Refresh token whose access tokens carry USER_CLAIM."""
+
+    @classmethod
+    def for_user(cls, user):
+        return set_user_claims(super().for_user(user), user)
+
+
+class ClaimsTokenObtainPairSerializer(TokenObtainPairSerializer):
+    token_class = ClaimsRefreshToken
+
+
+class ClaimsTokenRefreshSerializer(TokenRefreshSerializer):
+    token_class = ClaimsRefreshToken
+
+    def validate(self, attrs):
+        data = super().validate(attrs)
+        # The refresh token's claims can be a day old; re-issue with current ones
+        access = AccessToken(data["access"])
+        user = User.objects.get(**{api_settings.USER_ID_FIELD: access[api_settings.USER_ID_CLAIM]})
+        set_user_claims(access, user)
+        access.set_iat()
+        data["access"] = str(access)
+        return data
+
+
+# ---- Authentication ----
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication that trusts fresh USER_CLAIM claims instead of querying app_user."""
+
+    def get_user(self, validated_token):
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        claims = validated_token.get(USER_CLAIM)
+        user = None
+        if user_id is not None and claims is not None and not is_stale(user_id, validated_token.get("iat")):
+            user = user_from_claims(user_id, claims)
+        return user or super().get_user(validated_token)
@@ -0,0 +1,167 @@
+import codecs
+import csv
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+
+from . import search
+from .models import FarmProduct
+from .serializers import FarmProductImportSerializer
+
+IMPORT_CHUNK_SIZE = 500
+MAX_REPORTED_ERRORS = 100
+EXPORT_FIELDS = [
+    "sku",
+    "name",
+    "description",
+    "quantity",
+    "unit",
+    "price_per_unit",
+    "available",
+    "created_at",
+]
+EXPORT_CHUNK_SIZE = 2000
+
+
+# --------------------------
+# Import
+# --------------------------
+def iter_upload_rows(upload):
+    """
+    Yield (row_number, dict) for each record of a CSV or NDJSON upload,
+    decoding line by line so the file is never held in memory. A record
+    that cannot be parsed is yielded as a ValueError instead of a dict; a
+    file that stops decoding (bad UTF-8, broken CSV quoting) ends with one
+    such error, as nothing after that point can be read reliably.
+    """
+    lines = codecs.iterdecode(upload, "utf-8-sig")
+    name = (upload.name or "").lower()
+
+    if name.endswith((".ndjson", ".jsonl")):
+        number = 0
+        try:
+            for line in lines:
+                if not line.strip():
+                    continue
+                number += 1
+                try:
+                    row = json.loads(line)
+                    if not isinstance(row, dict):
+                        raise ValueError("Expected a JSON object")
+                except ValueError as exc:
+                    row = ValueError(str(exc))
+                yield number, row
+        except UnicodeDecodeError:
+            yield number + 1, ValueError("File is not valid UTF-8; rows from here on were not read")
+        return
+
+    reader = csv.DictReader(lines)
+    number = 0
+    try:
+        for number, row in enumerate(reader, start=1):
+            # blank CSV cells mean "not supplied", not an empty value
+            yield number, {key: value for key, value in row.items() if key and value not in ("", None)}
+    except UnicodeDecodeError:
+        yield number + 1, ValueError(f"File is not valid UTF-8 (line {reader.line_num + 1}); rows from here on were not read")
+    except csv.Error as exc:
+        yield number + 1, ValueError(f"Malformed CSV (line {reader.line_num}): {exc}; rows from here on were not read")
+
+
+def import_products(farmer, rows, chunk_size=IMPORT_CHUNK_SIZE):
+    """Create or update the farmer's products keyed by SKU, chunk by chunk."""
+    report = {"created": 0, "updated": 0, "error_count": 0, "errors": []}
+
+    chunk = []
+    for number, row in rows:
+        chunk.append((number, row))
+        if len(chunk) >= chunk_size:
+            _import_chunk(farmer, chunk, report)
+            chunk = []
+    if chunk:
+        _import_chunk(farmer, chunk, report)
+
+    return report
+
+
+def _import_chunk(farmer, chunk, report):
+    # Later rows win when the same SKU appears twice in one chunk
+    valid = {}
+    for number, row in chunk:
+        if isinstance(row, Exception):
+            _add_error(report, number, {"non_field_errors": [str(row)]})
+            continue
+        serializer = FarmProductImportSerializer(data=row)
+        if not serializer.is_valid():
+            _add_error(report, number, serializer.errors)
+            continue
+        valid[serializer.validated_data["sku"]] = serializer.validated_data
+
+    if not valid:
+        return
+
+    now = timezone.now()
+    with transaction.atomic():
+        existing = {
+            product.sku: product
+            for product in FarmProduct.objects.filter(farmer=farmer, sku__in=valid)
+        }
+        to_create, to_update = [], []
+        for sku, data in valid.items():
+            product = existing.get(sku)
+            if product is None:
+                to_create.append(FarmProduct(farmer=farmer, **data))
+                continue
+            for field, value in data.items():
+                setattr(product, field, value)
+            # bulk_update() skips auto_now, so stamp it by hand
+            product.updated_at = now
+            to_update.append(product)
+
+        FarmProduct.objects.bulk_create(to_create)
+        if to_update:
+            FarmProduct.objects.bulk_update(to_update, [*FarmProductImportSerializer.Meta.fields, "updated_at"])
+        search.index_instances(to_create + to_update)
+
+    report["created"] += len(to_create)
+    report["updated"] += len(to_update)
+
+
+def _add_error(report, number, errors):
+    report["error_count"] += 1
+    # Keep the response bounded even when every row of a huge file is bad
+    if len(report["errors"]) < MAX_REPORTED_ERRORS:
+        report["errors"].append({"row": number, "errors": errors})
+
+
+# --------------------------
+# Export
+# --------------------------
+class _Echo:
+    """File-like object whose write() just hands the line back to csv.writer."""
+
+    def write(self, value):
+        return value
+
+
+def export_rows(queryset, fmt):
+    """Yield the catalog as CSV or NDJSON lines, streaming rows from the DB."""
+    rows = (
+        queryset.order_by("pk")
+        .values_list(*EXPORT_FIELDS)
+        .iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    )
+
+    if fmt == "ndjson":
+        encoder = DjangoJSONEncoder()
+        for row in rows:
+            yield encoder.encode(dict(zip(EXPORT_FIELDS, row))) + "\n"
+        return
+
+    writer = csv.writer(_Echo())
+    yield writer.writerow(EXPORT_FIELDS)
+    for row in rows:
+        yield writer.writerow(
+            value.isoformat() if hasattr(value, "isoformat") else value for value in row
+        )
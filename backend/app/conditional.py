@@ -0,0 +1,78 @@
+"""
+Conditional GET for read-only viewsets.
+
+The validator is computed from one aggregate query (latest timestamp plus
+row count) over the filtered queryset, so an unchanged list or object is
+answered with 304 Not Modified before anything is serialized.
+"""
+import hashlib
+from urllib.parse import urlencode
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+
+class ConditionalGetMixin:
+    """
+    ETag / Last-Modified support for `list` and `retrieve`.
+
+    Set `last_modified_field` to a timestamp that changes whenever a row's
+    representation does; the row count catches deletes.
+    """
+
+    last_modified_field = None
+
+    def list(self, request, *args, **kwargs):
+        stamp = self.filter_queryset(self.get_queryset()).aggregate(
+            last_modified=Max(self.last_modified_field), count=Count("pk")
+        )
+        return self.conditional(request, stamp["last_modified"], stamp["count"], super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        lookup = {self.lookup_field: kwargs[self.lookup_url_kwarg or self.lookup_field]}
+        last_modified = (
+            self.filter_queryset(self.get_queryset())
+            .filter(**lookup)
+            .values_list(self.last_modified_field, flat=True)
+            .first()
+        )
+        if last_modified is None:
+            # missing object: let the normal path raise 404
+            return super().retrieve(request, *args, **kwargs)
+        return self.conditional(request, last_modified, 1, super().retrieve, *args, **kwargs)
+
+    def conditional(self, request, last_modified, count, render, *args, **kwargs):
+        etag = self.get_etag(request, last_modified, count)
+        last_modified = int(last_modified.timestamp()) if last_modified else None
+
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = render(request, *args, **kwargs)
+
+        response["ETag"] = etag
+        if last_modified is not None:
+            response["Last-Modified"] = http_date(last_modified)
+        # cacheable, but clients must revalidate each time
+        patch_cache_control(response, public=True, no_cache=True)
+        return response
+
+    def get_etag(self, request, last_modified, count):
+        # query string (filters, ?q=) and renderer change the body too; the
+        # URL prefix doesn't, so both weather aliases share one validator
+        parts = [
+            self.get_queryset().model._meta.label,
+            self.action,
+            str(self.kwargs.get(self.lookup_url_kwarg or self.lookup_field, "")),
+            canonical_query(request),
+            request.accepted_renderer.format,
+            last_modified.isoformat() if last_modified else "",
+            str(count),
+        ]
+        digest = hashlib.md5("|".join(parts).encode(), usedforsecurity=False).hexdigest()
+        return quote_etag(digest)
+
+
+def canonical_query(request):
+    """The query string with parameters sorted, so ?a=1&b=2 and ?b=2&a=1 match."""
+    return urlencode(sorted(request.GET.lists()), doseq=True)
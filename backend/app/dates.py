@@ -0,0 +1,21 @@
+from datetime import date, timedelta
+
+from django.utils import timezone
+
+
+def parse_date_range(start, end, default_days, max_days):
+    """
+    (from, to) dates from optional ISO strings: `to` defaults to today and
+    `from` to `default_days` before it. Raises ValueError with a message
+    fit for a 400 response.
+    """
+    try:
+        end = date.fromisoformat(end) if end else timezone.localdate()
+        start = date.fromisoformat(start) if start else end - timedelta(days=default_days - 1)
+    except ValueError:
+        raise ValueError("from and to must be YYYY-MM-DD dates")
+    if start > end:
+        raise ValueError("from must not be after to")
+    if (end - start).days >= max_days:
+        raise ValueError(f"At most {max_days} days per request")
+    return start, end
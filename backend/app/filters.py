@@ -0,0 +1,44 @@
+from decimal import Decimal, InvalidOperation
+
+from rest_framework import serializers
+from rest_framework.filters import BaseFilterBackend
+
+
+class PriceFilter(BaseFilterBackend):
+    """
+    `?min_price=&max_price=` (per kg) and `?ordering=price|-price` over
+    FarmProduct.price_per_kg, paged by keyset over (price_per_kg, id).
+    Listings in non-weight units have no price_per_kg and drop out.
+    """
+
+    orderings = {"price": ("price_per_kg", "id"), "-price": ("-price_per_kg", "-id")}
+
+    def filter_queryset(self, request, queryset, view):
+        params = request.query_params
+        bounds = {
+            lookup: self.parse_price(params, name)
+            for name, lookup in [("min_price", "price_per_kg__gte"), ("max_price", "price_per_kg__lte")]
+            if params.get(name)
+        }
+        ordering = params.get("ordering")
+        if ordering is not None and ordering not in self.orderings:
+            raise serializers.ValidationError({"ordering": f"Expected one of: {', '.join(self.orderings)}"})
+        if not bounds and ordering is None:
+            return queryset
+
+        queryset = queryset.filter(price_per_kg__isnull=False, **bounds)
+        if ordering is not None:
+            # an explicit ordering beats relevance and distance
+            view.keyset_ordering = self.orderings[ordering]
+            queryset = queryset.order_by(*view.keyset_ordering)
+        return queryset
+
+    @staticmethod
+    def parse_price(params, name):
+        try:
+            value = Decimal(params[name])
+        except InvalidOperation:
+            raise serializers.ValidationError({name: "Must be a number"})
+        if not value.is_finite() or value < 0:
+            raise serializers.ValidationError({name: "Must be a non-negative number"})
+        return value
@@ -0,0 +1,124 @@
+"""
+Geohash helpers for "products near me" search.
+
+A geohash interleaves longitude/latitude bits into a base32 string, so
+points that are close share a prefix. Storing it on User gives a plain
+B-tree-indexed column that narrows a radius search to a few prefix ranges
+on PostgreSQL and SQLite alike, without PostGIS.
+"""
+import math
+
+from django.db.models import F, FloatField, Q, Value
+from django.db.models.functions import ASin, Cos, Least, Power, Radians, Sin, Sqrt, Trim
+from django.db.models.lookups import IExact
+
+BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+PRECISION = 12
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE = 111.32
+
+
+def encode(latitude, longitude, precision=PRECISION):
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars, bits, value, even = [], 0, 0, True
+    while len(chars) < precision:
+        rng, coord = (lon_range, longitude) if even else (lat_range, latitude)
+        mid = (rng[0] + rng[1]) / 2
+        value <<= 1
+        if coord >= mid:
+            value |= 1
+            rng[0] = mid
+        else:
+            rng[1] = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(BASE32[value])
+            bits, value = 0, 0
+    return "".join(chars)
+
+
+def cell_size_degrees(precision):
+    """(height, width) of a geohash cell in degrees at `precision`."""
+    total_bits = 5 * precision
+    lon_bits = (total_bits + 1) // 2
+    lat_bits = total_bits // 2
+    return 180.0 / 2 ** lat_bits, 360.0 / 2 ** lon_bits
+
+
+def covering_cells(latitude, longitude, radius_km):
+    """
+    Geohash prefixes whose cells together cover the circle: the finest
+    precision whose cell is at least `radius_km` on each side, then the
+    centre cell plus its eight neighbours.
+    """
+    km_per_lon_degree = KM_PER_DEGREE * max(math.cos(math.radians(latitude)), 0.01)
+    precision = 1
+    for candidate in range(1, PRECISION + 1):
+        height, width = cell_size_degrees(candidate)
+        if height * KM_PER_DEGREE < radius_km or width * km_per_lon_degree < radius_km:
+            break
+        precision = candidate
+
+    height, width = cell_size_degrees(precision)
+    cells = set()
+    for dlat in (-height, 0.0, height):
+        for dlon in (-width, 0.0, width):
+            lat = min(max(latitude + dlat, -90.0), 89.999999)
+            lon = (longitude + dlon + 180.0) % 360.0 - 180.0
+            cells.add(encode(lat, lon, precision))
+    return sorted(cells)
+
+
+def prefix_upper_bound(prefix):
+    """Smallest string greater than every geohash starting with `prefix`."""
+    chars = list(prefix)
+    while chars:
+        index = BASE32.index(chars[-1])
+        if index < len(BASE32) - 1:
+            chars[-1] = BASE32[index + 1]
+            return "".join(chars)
+        chars.pop()
+    return None
+
+
+def distance_km(latitude, longitude, lat_field, lon_field):
+    """Haversine distance from a point to the row's coordinates, as an ORM expression."""
+    lat0 = math.radians(latitude)
+    dlat = Radians(F(lat_field)) - Value(lat0)
+    dlon = Radians(F(lon_field)) - Value(math.radians(longitude))
+    a = Power(Sin(dlat / 2), 2) + Value(math.cos(lat0)) * Cos(Radians(F(lat_field))) * Power(Sin(dlon / 2), 2)
+    # Least() guards asin() against rounding pushing its argument past 1
+    return Value(2 * EARTH_RADIUS_KM) * ASin(Least(Sqrt(a), Value(1.0)), output_field=FloatField())
+
+
+def normalize_location(location):
+    # "  new   delhi " and "New Delhi" share one weather row and one price index key
+    return " ".join(location.split()).title()
+
+
+# ---- Product scoping ----
+def near(queryset, latitude, longitude, radius_km):
+    """Products whose farmer is within `radius_km`, annotated with `distance`."""
+    # The geohash prefix ranges are an index range scan on app_user;
+    # the exact haversine distance only runs on the rows they return.
+    cells = Q()
+    for prefix in covering_cells(latitude, longitude, radius_km):
+        cell = Q(farmer__geohash__gte=prefix)
+        upper = prefix_upper_bound(prefix)
+        if upper is not None:
+            cell &= Q(farmer__geohash__lt=upper)
+        cells |= cell
+    return (
+        queryset.filter(cells)
+        .annotate(distance=distance_km(latitude, longitude, "farmer__latitude", "farmer__longitude"))
+        .filter(distance__lte=radius_km)
+    )
+
+
+def local_to(queryset, user, radius_km):
+    """Products in a buyer's area: near their coordinates, else from farmers in their location."""
+    if user.latitude is not None and user.longitude is not None:
+        return near(queryset, user.latitude, user.longitude, radius_km)
+    # trimmed on both sides: profiles are saved as typed, e.g. "Pune "
+    return queryset.filter(IExact(Trim("farmer__location"), (user.location or "").strip()))
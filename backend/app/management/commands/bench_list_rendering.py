@@ -0,0 +1,89 @@
+import time
+import uuid
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+
+from app.models import User, FarmProduct, Order
+from app.projections import Projection
+from app.renderers import ORJSONRenderer
+from app.serializers import FarmProductSerializer, OrderSerializer
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the product and order list read paths: ModelSerializer + "
+        "JSONRenderer against values_list() projections + ORJSONRenderer, "
+        "on N generated rows that are rolled back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=10_000)
+        parser.add_argument("--repeat", type=int, default=3, help="best of N runs per path")
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.seed(options["rows"])
+                for label, serializer_class, queryset in [
+                    ("products", FarmProductSerializer, FarmProduct.objects.select_related("farmer")),
+                    ("orders", OrderSerializer, Order.objects.select_related("buyer", "product__farmer")),
+                ]:
+                    self.compare(label, serializer_class, queryset.order_by("-created_at", "-id"), options)
+                raise Rollback
+        except Rollback:
+            pass
+
+    def seed(self, n):
+        tag = uuid.uuid4().hex[:8]
+        farmer = User.objects.create_user(username=f"bench-farmer-{tag}", is_farmer=True, location="Pune")
+        buyer = User.objects.create_user(username=f"bench-buyer-{tag}", is_buyer=True, location="Pune")
+        products = FarmProduct.objects.bulk_create(
+            FarmProduct(
+                farmer=farmer,
+                name=f"bench-{tag}-{i}",
+                description="Freshly harvested",
+                quantity=Decimal("100.00"),
+                price_per_unit=Decimal("12.50"),
+            )
+            for i in range(n)
+        )
+        Order.objects.bulk_create(
+            Order(buyer=buyer, product=product, farmer_id=product.farmer_id, quantity=Decimal("1.00"), total_price=product.price_per_unit)
+            for product in products
+        )
+
+    def compare(self, label, serializer_class, queryset, options):
+        projection = Projection(serializer_class)
+
+        def serializer_path():
+            return JSONRenderer().render(serializer_class(queryset, many=True).data)
+
+        def projection_path():
+            return ORJSONRenderer().render(projection.render(list(projection.rows(queryset))))
+
+        before, before_body = self.best_of(serializer_path, options["repeat"])
+        after, after_body = self.best_of(projection_path, options["repeat"])
+        if before_body != after_body:
+            raise CommandError(f"{label}: projection output differs from the serializer's")
+
+        self.stdout.write(
+            f"{label:<8} rows={options['rows']} serializer={before * 1000:.0f}ms "
+            f"projection={after * 1000:.0f}ms speedup={before / after:.1f}x "
+            f"({len(after_body) / 1024:.0f} KiB, identical)"
+        )
+
+    @staticmethod
+    def best_of(fn, repeat):
+        timings = []
+        for _ in range(max(repeat, 1)):
+            started = time.perf_counter()
+            body = fn()
+            timings.append(time.perf_counter() - started)
+        return min(timings), body
@@ -0,0 +1,117 @@
+import statistics
+import threading
+import time
+import uuid
+from decimal import Decimal
+from queue import Empty, SimpleQueue
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Sum
+
+from app.models import User, FarmProduct, Order
+from app.services import InsufficientStock, place_order
+
+
+class Command(BaseCommand):
+    help = (
+        "Stress-test stock reservation: many threads order one hot product "
+        "concurrently, then verify nothing was oversold. Run it against "
+        "PostgreSQL; SQLite serialises writers and is not representative."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=50)
+        parser.add_argument("--orders", type=int, default=500, help="total order attempts")
+        parser.add_argument("--stock", type=int, default=250, help="units on the hot product")
+        parser.add_argument("--quantity", type=int, default=1, help="units per order")
+        parser.add_argument("--keep", action="store_true", help="keep the generated rows")
+
+    def handle(self, *args, **options):
+        tag = uuid.uuid4().hex[:8]
+        farmer = User.objects.create_user(username=f"bench-farmer-{tag}", is_farmer=True)
+        buyer = User.objects.create_user(username=f"bench-buyer-{tag}", is_buyer=True)
+        product = FarmProduct.objects.create(
+            farmer=farmer,
+            name=f"bench-{tag}",
+            quantity=Decimal(options["stock"]),
+            price_per_unit=Decimal("10.00"),
+        )
+
+        try:
+            stats = self.run(product, buyer, options)
+            self.report(product, stats, options)
+        finally:
+            if not options["keep"]:
+                farmer.delete()
+                buyer.delete()
+
+    def run(self, product, buyer, options):
+        work = SimpleQueue()
+        for _ in range(options["orders"]):
+            work.put(Decimal(options["quantity"]))
+
+        lock = threading.Lock()
+        stats = {"placed": 0, "rejected": 0, "errors": [], "latencies": []}
+
+        def worker():
+            # Each thread gets its own connection; reuse a private copy of
+            # the product so no in-memory state is shared between threads.
+            local_product = FarmProduct.objects.get(pk=product.pk)
+            try:
+                while True:
+                    try:
+                        quantity = work.get_nowait()
+                    except Empty:
+                        return
+                    started = time.perf_counter()
+                    try:
+                        place_order(buyer, local_product, quantity)
+                        outcome = "placed"
+                    except InsufficientStock:
+                        outcome = "rejected"
+                    except Exception as exc:  # surface driver/lock errors in the report
+                        outcome = exc
+                    elapsed = time.perf_counter() - started
+                    with lock:
+                        stats["latencies"].append(elapsed)
+                        if isinstance(outcome, Exception):
+                            stats["errors"].append(repr(outcome))
+                        else:
+                            stats[outcome] += 1
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker) for _ in range(options["threads"])]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        stats["elapsed"] = time.perf_counter() - started
+        return stats
+
+    def report(self, product, stats, options):
+        product.refresh_from_db(fields=["quantity"])
+        orders = Order.objects.filter(product=product)
+        sold = orders.aggregate(sold=Sum("quantity"))["sold"] or 0
+        latencies = sorted(stats["latencies"]) or [0.0]
+
+        self.stdout.write(
+            f"threads={options['threads']} attempts={options['orders']} "
+            f"placed={stats['placed']} rejected={stats['rejected']} errors={len(stats['errors'])}"
+        )
+        self.stdout.write(
+            f"stock {options['stock']} -> {product.quantity} (sold {sold}), "
+            f"{stats['placed'] / stats['elapsed']:.0f} orders/s, "
+            f"p50={statistics.median(latencies) * 1000:.1f}ms "
+            f"p99={latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000:.1f}ms"
+        )
+
+        if stats["errors"]:
+            raise CommandError(f"{len(stats['errors'])} orders failed: {stats['errors'][0]}")
+        if product.quantity < 0 or product.quantity != options["stock"] - sold:
+            raise CommandError(f"stock drifted: {product.quantity} left after selling {sold}")
+        if orders.count() != stats["placed"]:
+            raise CommandError("order rows do not match successful reservations")
+        self.stdout.write(self.style.SUCCESS("no oversell, no lost updates"))
@@ -0,0 +1,247 @@
+import http.client
+import json
+import random
+import threading
+import time
+from datetime import datetime
+from datetime import timezone as dt_timezone
+from queue import Empty, SimpleQueue
+from urllib.parse import urlencode, urlsplit
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+
+from app.authentication import ClaimsRefreshToken
+from app.models import User, FarmingUpdate, FarmProduct, Order, WeatherReport
+
+PERCENTILES = (50, 95, 99)
+
+
+def percentile(ordered, q):
+    """Nearest-rank percentile of an ascending list."""
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, max(0, round(q / 100 * len(ordered)) - 1))]
+
+
+class InProcess:
+    """Requests through Django's full handler and middleware, without a server."""
+
+    def __init__(self):
+        self.client = Client(raise_request_exception=False)  # a failing view counts as a 500
+
+    def send(self, method, path, body, headers):
+        extra = {f"HTTP_{name.upper().replace('-', '_')}": value for name, value in headers.items()}
+        response = self.client.generic(method, path, body or "", content_type="application/json", **extra)
+        if response.streaming:
+            b"".join(response.streaming_content)
+        return response.status_code
+
+    def close(self):
+        pass
+
+
+class OverHTTP:
+    """Requests to a running server, one keep-alive connection per client."""
+
+    def __init__(self, base_url):
+        url = urlsplit(base_url)
+        connection_class = http.client.HTTPSConnection if url.scheme == "https" else http.client.HTTPConnection
+        self.connection = connection_class(url.netloc, timeout=60)
+        self.prefix = url.path.rstrip("/")
+
+    def send(self, method, path, body, headers):
+        self.connection.request(method, self.prefix + path, body=body, headers={"Content-Type": "application/json", **headers})
+        response = self.connection.getresponse()
+        response.read()
+        return response.status
+
+    def close(self):
+        self.connection.close()
+
+
+class Command(BaseCommand):
+    help = (
+        "Drive the real API routes (products list, order create, dashboard, "
+        "updates, weather) with concurrent clients and write p50/p95/p99 "
+        "latency and requests per second per scenario to a JSON file. Runs "
+        "in-process by default, or against a server with --base-url. Needs "
+        "data to work on: see `generate_data`. Order creation writes orders."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--scenarios", nargs="+", choices=list(self.scenarios()), default=list(self.scenarios()))
+        parser.add_argument("--requests", type=int, default=500, help="measured requests per scenario")
+        parser.add_argument("--warmup", type=int, default=20, help="unmeasured requests per scenario first")
+        parser.add_argument("--concurrency", type=int, default=8, help="clients sending at once")
+        parser.add_argument("--base-url", help="e.g. http://localhost:8000; default runs in-process")
+        parser.add_argument("--users", type=int, default=200, help="buyers and farmers to act as")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--output", default="benchmark.json")
+        parser.add_argument("--baseline", help="an earlier --output to compare against")
+
+    @staticmethod
+    def scenarios():
+        # name: (method, path, JSON body, acting user) for one request
+        return {
+            "products": lambda s: ("GET", "/api/products/", None, s.pick(s.buyers)),
+            "order-create": lambda s: (
+                "POST", "/api/orders/", {"product_id": s.pick(s.products), "quantity": "1"}, s.pick(s.buyers)
+            ),
+            "dashboard": lambda s: ("GET", "/api/users/dashboard/", None, s.pick(s.farmers + s.buyers)),
+            "updates": lambda s: ("GET", "/api/updates/", None, None),
+            "weather": lambda s: ("GET", "/api/weather-reports/?" + urlencode({"location": s.pick(s.locations)}), None, None),
+        }
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options["seed"])
+        self.rng_lock = threading.Lock()
+
+        results = {}
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"]):
+            for name in options["scenarios"]:
+                # fresh tokens per scenario; access tokens only last ACCESS_TOKEN_LIFETIME
+                self.load_fixtures(options["users"])
+                results[name] = self.run(self.scenarios()[name], options)
+                self.stdout.write(self.format_row(name, results[name]))
+
+        report = {
+            "created_at": datetime.now(dt_timezone.utc).isoformat(),
+            "target": options["base_url"] or "in-process",
+            "database": connection.vendor,
+            "concurrency": options["concurrency"],
+            "requests": options["requests"],
+            "rows": {
+                model.__name__: model.objects.count()
+                for model in [User, FarmProduct, Order, FarmingUpdate, WeatherReport]
+            },
+            "scenarios": results,
+        }
+        with open(options["output"], "w") as f:
+            json.dump(report, f, indent=2)
+        self.stdout.write(f"wrote {options['output']}")
+
+        if options["baseline"]:
+            self.compare(options["baseline"], results)
+
+    # ---- Fixtures ----
+    def load_fixtures(self, n_users):
+        # Acting users and targets are read once, so lookups don't count against the routes
+        def tokens(queryset):
+            return [str(ClaimsRefreshToken.for_user(user).access_token) for user in queryset.order_by("id")[:n_users]]
+
+        self.buyers = tokens(User.objects.filter(is_buyer=True, is_active=True))
+        self.farmers = tokens(User.objects.filter(is_farmer=True, is_active=True))
+        # deep stock, so order creation keeps succeeding
+        self.products = list(
+            FarmProduct.objects.filter(available=True, quantity__gte=100).order_by("id").values_list("id", flat=True)[:n_users * 10]
+        )
+        self.locations = list(WeatherReport.objects.values_list("location", flat=True).distinct().order_by("location"))
+        if not (self.buyers and self.farmers and self.products and self.locations):
+            raise CommandError("needs buyers, farmers, stocked products and weather reports; run generate_data first")
+
+    def pick(self, values):
+        with self.rng_lock:
+            return self.rng.choice(values)
+
+    # ---- Running ----
+    def run(self, scenario, options):
+        transport = (lambda: OverHTTP(options["base_url"])) if options["base_url"] else InProcess
+        lock = threading.Lock()
+        latencies, statuses = [], {}
+
+        def client(work, measured):
+            sender = transport()
+            try:
+                while True:
+                    try:
+                        work.get_nowait()
+                    except Empty:
+                        return
+                    method, path, body, token = scenario(self)
+                    headers = {"Authorization": f"Bearer {token}"} if token else {}
+                    started = time.perf_counter()
+                    try:
+                        status = sender.send(method, path, json.dumps(body) if body is not None else None, headers)
+                    except Exception as exc:  # surface transport errors in the report
+                        status = type(exc).__name__
+                    elapsed = time.perf_counter() - started
+                    if measured:
+                        with lock:
+                            latencies.append(elapsed)
+                            statuses[str(status)] = statuses.get(str(status), 0) + 1
+            finally:
+                sender.close()
+
+        # warm-up requests (caches, connections) go first and aren't measured
+        self.clients(lambda: client(self.queue(options["warmup"]), False), 1)
+        work = self.queue(options["requests"])
+        started = time.perf_counter()
+        self.clients(lambda: client(work, True), options["concurrency"])
+        return self.summarize(latencies, statuses, time.perf_counter() - started)
+
+    @staticmethod
+    def queue(n):
+        work = SimpleQueue()
+        for i in range(n):
+            work.put(i)
+        return work
+
+    def clients(self, target, n):
+        if n == 1:
+            target()  # the sequential baseline runs in this thread, on its connection
+            return
+
+        def thread_target():
+            try:
+                target()
+            finally:
+                connection.close()  # each thread opened its own
+
+        threads = [threading.Thread(target=thread_target) for _ in range(n)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    # ---- Reporting ----
+    @staticmethod
+    def summarize(latencies, statuses, elapsed):
+        ordered = sorted(latencies)
+        errors = sum(count for status, count in statuses.items() if not status.startswith("2"))
+        ms = lambda seconds: round(seconds * 1000, 2) if seconds is not None else None
+        return {
+            "requests": len(ordered),
+            "errors": errors,
+            "statuses": statuses,
+            "rps": round(len(ordered) / elapsed, 1) if elapsed else None,
+            **{f"p{q}_ms": ms(percentile(ordered, q)) for q in PERCENTILES},
+            "mean_ms": ms(sum(ordered) / len(ordered)) if ordered else None,
+            "max_ms": ms(ordered[-1]) if ordered else None,
+        }
+
+    @staticmethod
+    def format_row(name, result):
+        return (
+            f"{name:<13} n={result['requests']} errors={result['errors']} rps={result['rps']} "
+            + " ".join(f"p{q}={result[f'p{q}_ms']}ms" for q in PERCENTILES)
+        )
+
+    def compare(self, path, results):
+        with open(path) as f:
+            baseline = json.load(f)["scenarios"]
+
+        def change(new, old):
+            return f"{(new - old) / old * 100:+.1f}%" if new is not None and old else "n/a"
+
+        self.stdout.write(f"against {path}:")
+        for name, result in results.items():
+            old = baseline.get(name)
+            if old is None:
+                continue
+            self.stdout.write(
+                f"{name:<13} rps {change(result['rps'], old['rps'])} "
+                + " ".join(f"p{q} {change(result[f'p{q}_ms'], old[f'p{q}_ms'])}" for q in PERCENTILES)
+            )
@@ -0,0 +1,19 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from app.weather import downsample
+
+
+class Command(BaseCommand):
+    help = (
+        "Fold raw weather readings older than WEATHER_RAW_RETENTION_DAYS into "
+        "one daily report per location and delete them. Schedule it daily."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=None, help="override WEATHER_RAW_RETENTION_DAYS")
+
+    def handle(self, *args, **options):
+        days = settings.WEATHER_RAW_RETENTION_DAYS if options["days"] is None else options["days"]
+        reports, readings = downsample(days)
+        self.stdout.write(f"folded {readings} readings older than {days} days into {reports} daily reports")
@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from app.testing import FakeOpenWeather
+
+
+class Command(BaseCommand):
+    help = (
+        "Serve a fake OpenWeather endpoint on localhost for offline benchmarks. "
+        "Point OPENWEATHER_URL at the printed URL."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--port", type=int, default=8765)
+        parser.add_argument("--delay", type=float, default=0.05, help="seconds of simulated upstream latency")
+
+    def handle(self, *args, **options):
+        with FakeOpenWeather(delay=options["delay"], port=options["port"]) as fake:
+            self.stdout.write(f"Fake OpenWeather listening on {fake.url} (Ctrl+C to stop)")
+            try:
+                while True:
+                    time.sleep(1)
+            except KeyboardInterrupt:
+                self.stdout.write(f"Served {len(fake.calls)} requests")
@@ -0,0 +1,240 @@
+import math
+import random
+from contextlib import contextmanager
+from datetime import date, datetime, time, timedelta
+from datetime import timezone as dt_timezone
+from decimal import Decimal
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+
+from app import analytics, geo, prices
+from app.models import User, FarmingUpdate, FarmProduct, Order, WeatherReport
+
+# name, latitude, longitude, mean temperature (°C)
+CITIES = [
+    ("Pune", 18.52, 73.86, 25), ("Nashik", 20.00, 73.79, 24), ("Nagpur", 21.15, 79.09, 27),
+    ("Mumbai", 19.08, 72.88, 27), ("Delhi", 28.70, 77.10, 25), ("Jaipur", 26.91, 75.79, 26),
+    ("Lucknow", 26.85, 80.95, 25), ("Bengaluru", 12.97, 77.59, 24), ("Hyderabad", 17.39, 78.49, 27),
+    ("Chennai", 13.08, 80.27, 29), ("Kolkata", 22.57, 88.36, 27), ("Ahmedabad", 23.02, 72.57, 27),
+    ("Indore", 22.72, 75.86, 25), ("Patna", 25.59, 85.14, 26), ("Ludhiana", 30.90, 75.86, 24),
+]
+# name, unit, typical price per unit
+PRODUCE = [
+    ("Tomatoes", "kg", 30), ("Onions", "kg", 28), ("Potatoes", "kg", 22), ("Wheat", "quintal", 2300),
+    ("Rice", "quintal", 3100), ("Soybeans", "quintal", 4500), ("Cotton", "quintal", 7000),
+    ("Sugarcane", "ton", 3200), ("Mangoes", "dozen", 350), ("Bananas", "dozen", 50), ("Eggs", "dozen", 72),
+    ("Green chillies", "kg", 60), ("Grapes", "kg", 80), ("Pomegranates", "kg", 120), ("Milk", "litre", 55),
+    ("Turmeric", "quintal", 9000), ("Cauliflower", "kg", 25), ("Okra", "kg", 40),
+]
+ORDER_STATUSES = (["pending"] * 10) + (["confirmed"] * 20) + (["completed"] * 60) + (["cancelled"] * 10)
+UPDATE_TOPICS = ["Monsoon advisory", "Mandi prices", "Drip irrigation", "Pest alert", "Soil testing", "Crop insurance"]
+CENTS = Decimal("0.01")
+
+
+@contextmanager
+def backdating(*fields):
+    # auto_now_add would stamp every generated row with today
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+def batches(rows, size):
+    rows = iter(rows)
+    while batch := list(islice(rows, size)):
+        yield batch
+
+
+class Command(BaseCommand):
+    help = (
+        "Fill the database with synthetic users, products, orders, farming "
+        "updates and daily weather for load testing (see `benchmark`). "
+        "--scale 1 is 100k users, 1M products and 10M orders; rows are "
+        "bulk-inserted in batches and the order rollups and price index are "
+        "rebuilt at the end. Use a database you can throw away."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--scale", type=float, default=1.0, help="multiplies the default volumes")
+        parser.add_argument("--users", type=int, help="default 100000 x scale")
+        parser.add_argument("--products", type=int, help="default 1000000 x scale")
+        parser.add_argument("--orders", type=int, help="default 10000000 x scale")
+        parser.add_argument("--updates", type=int, help="default 1000 x scale")
+        parser.add_argument("--weather-years", type=int, default=5, help="years of daily weather per city")
+        parser.add_argument("--farmer-share", type=float, default=0.2, help="share of users who are farmers")
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--prefix", default="synthetic", help="username prefix; must not exist yet")
+        parser.add_argument("--skip-rebuild", action="store_true", help="leave analytics and prices stale")
+
+    def handle(self, *args, **options):
+        scale = options["scale"]
+        counts = {
+            name: options[name] if options[name] is not None else int(default * scale)
+            for name, default in [("users", 100_000), ("products", 1_000_000), ("orders", 10_000_000), ("updates", 1000)]
+        }
+        if counts["users"] < 2:
+            raise CommandError("need at least 2 users (a farmer and a buyer)")
+        if User.objects.filter(username__startswith=f"{options['prefix']}-").exists():
+            raise CommandError(f"users named {options['prefix']}-* already exist; pass another --prefix")
+
+        self.rng = random.Random(options["seed"])
+        self.batch_size = options["batch_size"]
+        self.today = date.today()
+        # orders and listings spread over the same years as the weather
+        self.history_days = max(options["weather_years"], 1) * 365
+
+        farmers, buyers = self.users(counts["users"], options["farmer_share"], options["prefix"])
+        products = self.products(counts["products"], farmers)
+        self.orders(counts["orders"], buyers, products)
+        self.updates(counts["updates"])
+        self.weather(options["weather_years"])
+
+        if not options["skip_rebuild"]:
+            self.stdout.write(f"rebuilt {analytics.rebuild(batch_size=self.batch_size)} order rollup rows")
+            self.stdout.write(f"rebuilt {prices.rebuild(batch_size=self.batch_size)} price index rows")
+
+    # ---- Helpers ----
+    def insert(self, label, model, rows, total, keep=None):
+        """bulk_create `rows` batch by batch; returns keep(obj) for each created row, if given."""
+        kept, written = [], 0
+        for batch in batches(rows, self.batch_size):
+            created = model.objects.bulk_create(batch)
+            if keep is not None:
+                kept.extend(keep(obj) for obj in created)
+            written += len(created)
+            if written % (self.batch_size * 20) < self.batch_size or written == total:
+                self.stdout.write(f"{label}: {written}/{total}")
+        return kept
+
+    def moment(self):
+        """A random time in the generated history."""
+        day = self.today - timedelta(days=self.rng.randrange(self.history_days))
+        return datetime.combine(day, time(), tzinfo=dt_timezone.utc) + timedelta(seconds=self.rng.randrange(86400))
+
+    # ---- Rows ----
+    def users(self, n, farmer_share, prefix):
+        password = make_password("synthetic")  # hashing once; per-user hashing would dominate the run
+        n_farmers = min(max(1, round(n * farmer_share)), n - 1)
+
+        def rows():
+            for i in range(n):
+                city, latitude, longitude, _ = self.rng.choice(CITIES)
+                latitude += self.rng.uniform(-0.2, 0.2)
+                longitude += self.rng.uniform(-0.2, 0.2)
+                farmer = i < n_farmers
+                yield User(
+                    username=f"{prefix}-{i}",
+                    email=f"{prefix}-{i}@example.com",
+                    password=password,
+                    is_farmer=farmer,
+                    is_buyer=not farmer,
+                    location=city,
+                    latitude=latitude,
+                    longitude=longitude,
+                    geohash=geo.encode(latitude, longitude),  # save() isn't called by bulk_create
+                )
+
+        pks = self.insert("users", User, rows(), n, keep=lambda user: user.pk)
+        return pks[:n_farmers], pks[n_farmers:]
+
+    def products(self, n, farmers):
+        """{pk: (price_per_unit, farmer_id)} of the created products."""
+
+        def rows():
+            for _ in range(n):
+                name, unit, typical = self.rng.choice(PRODUCE)
+                price = (Decimal(typical) * Decimal(self.rng.uniform(0.7, 1.3))).quantize(CENTS)
+                yield FarmProduct(
+                    farmer_id=self.rng.choice(farmers),
+                    name=name,
+                    description=f"{name} from this season's harvest",
+                    # deep stock so benchmark orders don't run products dry
+                    quantity=Decimal(self.rng.randrange(100, 100_000)),
+                    unit=unit,
+                    price_per_unit=price,
+                    available=self.rng.random() < 0.9,
+                    created_at=self.moment(),
+                )
+
+        with backdating(FarmProduct._meta.get_field("created_at")):
+            return dict(self.insert("products", FarmProduct, rows(), n, keep=lambda p: (p.pk, (p.price_per_unit, p.farmer_id))))
+
+    def orders(self, n, buyers, products):
+        product_pks = list(products)
+
+        def rows():
+            for _ in range(n):
+                # a few products get most of the orders
+                pk = product_pks[int(len(product_pks) * self.rng.random() ** 3)]
+                quantity = Decimal(self.rng.randrange(1, 20))
+                status = self.rng.choice(ORDER_STATUSES)
+                created_at = self.moment()
+                price, farmer_id = products[pk]
+                yield Order(
+                    buyer_id=self.rng.choice(buyers),
+                    product_id=pk,
+                    farmer_id=farmer_id,
+                    quantity=quantity,
+                    total_price=(price * quantity).quantize(CENTS),
+                    status=status,
+                    created_at=created_at,
+                    confirmed_at=created_at + timedelta(hours=self.rng.randrange(1, 48)) if status in prices.TRADED else None,
+                )
+
+        # stock levels are left as generated; these orders are history, not reservations
+        with backdating(Order._meta.get_field("created_at")):
+            self.insert("orders", Order, rows(), n)
+
+    def updates(self, n):
+        def rows():
+            for i in range(n):
+                topic = self.rng.choice(UPDATE_TOPICS)
+                yield FarmingUpdate(
+                    title=f"{topic} #{i}",
+                    content=f"{topic}: guidance for farmers in {self.rng.choice(CITIES)[0]} this week.",
+                    category=self.rng.choice(["news", "technology", "tips"]),
+                    published_at=self.moment(),
+                )
+
+        with backdating(FarmingUpdate._meta.get_field("published_at")):
+            self.insert("updates", FarmingUpdate, rows(), n)
+
+    def weather(self, years):
+        days = years * 365
+
+        def rows():
+            for city, _, _, mean in CITIES:
+                location = geo.normalize_location(city)
+                for offset in range(days):
+                    day = self.today - timedelta(days=offset)
+                    doy = day.timetuple().tm_yday
+                    temperature = mean + 6 * math.sin(2 * math.pi * (doy - 100) / 365) + self.rng.gauss(0, 1.5)
+                    monsoon = 152 <= doy <= 273
+                    rainy = self.rng.random() < (0.6 if monsoon else 0.08)
+                    rainfall = round(self.rng.expovariate(1 / (12 if monsoon else 4)), 1) if rainy else 0.0
+                    spread = self.rng.uniform(4, 8)
+                    yield WeatherReport(
+                        location=location,
+                        report_date=day,
+                        temperature=round(temperature, 1),
+                        temperature_min=round(temperature - spread, 1),
+                        temperature_max=round(temperature + spread, 1),
+                        humidity=round(min(100.0, (85 if rainy else 45) + self.rng.gauss(0, 8)), 1),
+                        rainfall=rainfall,
+                        conditions="Rain" if rainy else self.rng.choice(["Clear", "Clouds"]),
+                    )
+
+        total = days * len(CITIES)
+        written = 0
+        for batch in batches(rows(), self.batch_size):
+            # days that already have a report (e.g. fetched from OpenWeather) are kept
+            WeatherReport.objects.bulk_create(batch, ignore_conflicts=True)
+            written += len(batch)
+        self.stdout.write(f"weather: {written}/{total} city-days")
@@ -0,0 +1,18 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from app.sync import prune_tombstones
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete sync tombstones older than SYNC_TOMBSTONE_RETENTION_DAYS. "
+        "Clients holding older sync tokens get 410 and resync from scratch. "
+        "Schedule it (e.g. cron daily) so the table stays bounded."
+    )
+
+    def handle(self, *args, **options):
+        deleted = prune_tombstones()
+        self.stdout.write(
+            f"pruned {deleted} tombstones older than {settings.SYNC_TOMBSTONE_RETENTION_DAYS} days"
+        )
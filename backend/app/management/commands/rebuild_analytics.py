@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from app.analytics import rebuild
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the daily order rollups behind the dashboard and "
+        "/api/users/analytics/ from the orders table, e.g. to backfill "
+        "existing orders or after bulk writes that bypassed the ORM."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        written = rebuild(batch_size=options["batch_size"])
+        self.stdout.write(f"rebuilt {written} rollup rows")
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from app.prices import rebuild
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the market price index behind /api/prices/ from confirmed "
+        "and completed orders, e.g. to backfill or after status changes made "
+        "outside the orders API."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        written = rebuild(batch_size=options["batch_size"])
+        self.stdout.write(f"rebuilt {written} price index rows")
@@ -0,0 +1,57 @@
+import asyncio
+import time
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from app.models import User
+from app.weather import fetch_many, normalize_location, store_reports
+
+
+class Command(BaseCommand):
+    help = (
+        "Refresh today's weather for every distinct farmer/buyer location "
+        "concurrently and upsert the rows in bulk. Schedule it (e.g. cron every "
+        "few minutes, below WEATHER_CACHE_TTL) so weather reads never wait on "
+        "OpenWeather."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--concurrency", type=int, default=10, help="max requests in flight")
+        parser.add_argument("--rate", type=float, default=10.0, help="max requests per second per host (0 = unlimited)")
+        parser.add_argument("--url", help="override OPENWEATHER_URL, e.g. a local fake_openweather server")
+
+    def handle(self, *args, **options):
+        raw = (
+            User.objects.filter(Q(is_farmer=True) | Q(is_buyer=True))
+            .exclude(location__isnull=True)
+            .exclude(location="")
+            .values_list("location", flat=True)
+            .distinct()
+        )
+        locations = sorted({normalize_location(location) for location in raw} - {""})
+        if not locations:
+            self.stdout.write("No farmer or buyer locations to refresh")
+            return
+
+        started = time.perf_counter()
+        results = asyncio.run(
+            fetch_many(
+                locations,
+                concurrency=options["concurrency"],
+                rate=options["rate"],
+                url=options["url"],
+            )
+        )
+        fetched = time.perf_counter() - started
+
+        readings = {loc: r for loc, r in results.items() if not isinstance(r, Exception)}
+        failures = {loc: r for loc, r in results.items() if isinstance(r, Exception)}
+        store_reports(readings)
+
+        for location, error in failures.items():
+            self.stderr.write(f"{location}: {error}")
+        self.stdout.write(
+            f"Refreshed {len(readings)}/{len(locations)} locations in {fetched:.2f}s "
+            f"({len(locations) / fetched:.1f} req/s), {len(failures)} failed"
+        )
@@ -0,0 +1,28 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from app import slow_queries
+
+
+class Command(BaseCommand):
+    help = (
+        "Print the statements the slow-query sampler has logged (oldest first), "
+        "with the view and call site that ran them and their plans."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--json", action="store_true", help="One JSON object per line instead of text.")
+        parser.add_argument("--clear", action="store_true", help="Empty the log after printing it.")
+
+    def handle(self, *args, **options):
+        logged = slow_queries.entries()
+        if options["json"]:
+            for entry in logged:
+                self.stdout.write(json.dumps(entry))
+        elif logged:
+            self.stdout.write(slow_queries.format_entries(logged))
+        else:
+            self.stdout.write("no slow queries logged")
+        if options["clear"]:
+            slow_queries.clear()
@@ -0,0 +1,256 @@
+"""
+Per-route request metrics in Prometheus text format (GET /metrics).
+
+MetricsMiddleware times each sampled request, and an `execute_wrapper`
+installed on every connection counts its statements and the time spent in
+them, then the middleware records under the resolved route name (e.g. "product-list",
+"order-detail"):
+
+    app_http_request_duration_seconds   histogram of request latency
+    app_http_requests_total             requests by status code
+    app_http_response_size_bytes_total  response body bytes
+    app_db_queries_per_request          histogram of SQL statements per request
+    app_db_query_duration_seconds_total time spent in SQL
+
+METRICS_SAMPLE_RATE (0-1) picks the share of requests measured; the others
+pass straight through. Counts cover sampled requests only, so divide rates
+by `app_metrics_sample_rate`. Figures are per process: with several
+workers, scrape each or aggregate them in Prometheus.
+
+Scrapers send `Authorization: Bearer <METRICS_TOKEN>`; staff sessions can
+read the page too. Nobody else can, whether or not a token is set.
+"""
+import contextvars
+import random
+import secrets
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.http import HttpResponse, HttpResponseForbidden
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        # cumulative buckets are built at render time, so only one slot changes
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.count += 1
+        self.sum += value
+
+    def samples(self, name, labels):
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            yield f"{name}_bucket", {**labels, "le": _number(bound)}, cumulative
+        yield f"{name}_bucket", {**labels, "le": "+Inf"}, self.count
+        yield f"{name}_sum", labels, self.sum
+        yield f"{name}_count", labels, self.count
+
+
+class RouteStats:
+    def __init__(self):
+        self.latency = Histogram(settings.METRICS_LATENCY_BUCKETS)
+        self.queries = Histogram(QUERY_BUCKETS)
+        self.statuses = {}
+        self.response_bytes = 0
+        self.sql_seconds = 0.0
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes = {}
+
+    def record(self, route, method, status, duration, queries, sql_seconds, size):
+        with self._lock:
+            stats = self._routes.get((route, method))
+            if stats is None:
+                stats = self._routes[route, method] = RouteStats()
+            stats.latency.observe(duration)
+            stats.queries.observe(queries)
+            stats.statuses[status] = stats.statuses.get(status, 0) + 1
+            stats.response_bytes += size
+            stats.sql_seconds += sql_seconds
+
+    def clear(self):
+        with self._lock:
+            self._routes.clear()
+
+    def render(self):
+        with self._lock:
+            routes = sorted(self._routes.items())
+            families = [
+                ("app_http_request_duration_seconds", "histogram", "Request latency by route.",
+                 [s for key, stats in routes for s in stats.latency.samples(
+                     "app_http_request_duration_seconds", _labels(key))]),
+                ("app_http_requests_total", "counter", "Requests by route and status code.",
+                 [("app_http_requests_total", {**_labels(key), "status": str(status)}, count)
+                  for key, stats in routes for status, count in sorted(stats.statuses.items())]),
+                ("app_http_response_size_bytes_total", "counter", "Response body bytes by route.",
+                 [("app_http_response_size_bytes_total", _labels(key), stats.response_bytes)
+                  for key, stats in routes]),
+                ("app_db_queries_per_request", "histogram", "SQL statements per request by route.",
+                 [s for key, stats in routes for s in stats.queries.samples(
+                     "app_db_queries_per_request", _labels(key))]),
+                ("app_db_query_duration_seconds_total", "counter", "Seconds spent in SQL by route.",
+                 [("app_db_query_duration_seconds_total", _labels(key), stats.sql_seconds)
+                  for key, stats in routes]),
+            ]
+
+        lines = []
+        for name, kind, help_text, samples in families:
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+            lines += [f"{sample}{_format_labels(labels)} {_number(value)}" for sample, labels, value in samples]
+        lines += [
+            "# HELP app_metrics_sample_rate Share of requests measured.",
+            "# TYPE app_metrics_sample_rate gauge",
+            f"app_metrics_sample_rate {_number(settings.METRICS_SAMPLE_RATE)}",
+        ]
+        return "\n".join(lines) + "\n"
+
+
+def _labels(key):
+    route, method = key
+    return {"route": route, "method": method}
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+registry = MetricsRegistry()
+
+
+# ---- Collection ----
+class QueryTimer:
+    """execute_wrapper hook: counts statements and the seconds spent in them."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - started
+            self.count += 1
+
+
+def route_name(request):
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return "unresolved"  # 404s from the resolver; keeps label cardinality bounded
+    return match.view_name or match._func_path
+
+
+_timer = contextvars.ContextVar("metrics_query_timer", default=None)
+
+
+def hook(execute, sql, params, many, context):
+    """execute_wrapper on every connection; feeds the measured request's QueryTimer."""
+    timer = _timer.get()
+    if timer is None:
+        return execute(sql, params, many, context)
+    return timer(execute, sql, params, many, context)
+
+
+@receiver(connection_created)
+def install_hook(sender, connection, **kwargs):
+    # Installed once per connection rather than per request: under ASGI the
+    # view's queries run through sync_to_async on connections the middleware
+    # can't reach, while the context variable follows them there.
+    if hook not in connection.execute_wrappers:
+        connection.execute_wrappers.append(hook)
+
+
+class Measurement:
+    """Times one request and counts its SQL, for the sync and async paths alike."""
+
+    def __init__(self, request):
+        self.request = request
+        self.timer = QueryTimer()
+
+    def __enter__(self):
+        self.token = _timer.set(self.timer)
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.duration = time.perf_counter() - self.started
+        _timer.reset(self.token)
+
+    def record(self, response):
+        # streamed bodies aren't buffered, so they count as 0 bytes
+        size = 0 if response.streaming else len(response.content)
+        registry.record(
+            route_name(self.request), self.request.method, response.status_code, self.duration,
+            self.timer.count, self.timer.seconds, size,
+        )
+        return response
+
+
+def sampled(request):
+    rate = settings.METRICS_SAMPLE_RATE
+    return rate > 0 and (rate >= 1 or random.random() < rate) and request.path != "/metrics"
+
+
+class MetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not sampled(request):
+            return self.get_response(request)
+        with Measurement(request) as measurement:
+            response = self.get_response(request)
+        return measurement.record(response)
+
+    async def __acall__(self, request):
+        if not sampled(request):
+            return await self.get_response(request)
+        with Measurement(request) as measurement:
+            response = await self.get_response(request)
+        return measurement.record(response)
+
+
+# ---- Endpoint ----
+def metrics_view(request):
+    token = settings.METRICS_TOKEN
+    scraper = bool(token) and secrets.compare_digest(request.headers.get("Authorization", ""), f"Bearer {token}")
+    if not (scraper or request.user.is_staff):
+        return HttpResponseForbidden()
+    return HttpResponse(registry.render(), content_type=CONTENT_TYPE)
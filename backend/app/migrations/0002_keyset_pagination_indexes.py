@@ -0,0 +1,38 @@
+# Generated by Django 5.2.5 on 2026-10-18 19:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("app", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="farmproduct",
+            index=models.Index(
+                fields=["farmer", "created_at", "id"], name="product_farmer_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="farmproduct",
+            index=models.Index(
+                fields=["available", "created_at", "id"],
+                name="product_avail_created_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(
+                fields=["buyer", "created_at", "id"], name="order_buyer_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(
+                fields=["product", "created_at", "id"], name="order_product_created_idx"
+            ),
+        ),
+    ]
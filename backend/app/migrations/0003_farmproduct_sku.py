@@ -0,0 +1,24 @@
+# Generated by Django 5.2.5 on 2026-10-18 19:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("app", "0002_keyset_pagination_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="farmproduct",
+            name="sku",
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name="farmproduct",
+            constraint=models.UniqueConstraint(
+                fields=("farmer", "sku"), name="product_farmer_sku_uniq"
+            ),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-18 19:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("app", "0003_farmproduct_sku"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="weatherreport",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
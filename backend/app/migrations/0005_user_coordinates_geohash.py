@@ -0,0 +1,30 @@
+# Generated by Django 5.2.5 on 2026-10-18 19:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("app", "0004_weatherreport_updated_at"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="user",
+            name="geohash",
+            field=models.CharField(
+                blank=True, db_index=True, editable=False, max_length=12, null=True
+            ),
+        ),
+        migrations.AddField(
+            model_name="user",
+            name="latitude",
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="user",
+            name="longitude",
+            field=models.FloatField(blank=True, null=True),
+        ),
+    ]
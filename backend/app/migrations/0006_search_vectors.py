@@ -0,0 +1,77 @@
+# Generated by Django 5.2.5 on 2026-10-18 19:37
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+# (table, weight A column, weight B column) — keep in step with app.search.SEARCH_FIELDS
+SEARCH_TABLES = [
+    ("app_farmproduct", "name", "description"),
+    ("app_farmingupdate", "title", "content"),
+]
+
+
+def create_search_triggers(apps, schema_editor):
+    """Trigger-maintained tsvector plus GIN index; PostgreSQL only."""
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for table, title, body in SEARCH_TABLES:
+        vector = (
+            f"setweight(to_tsvector('pg_catalog.english', coalesce(NEW.{title}, '')), 'A') || "
+            f"setweight(to_tsvector('pg_catalog.english', coalesce(NEW.{body}, '')), 'B')"
+        )
+        schema_editor.execute(
+            f"""
+            CREATE FUNCTION {table}_search_vector_update() RETURNS trigger AS $$
+            BEGIN
+                NEW.search_vector := {vector};
+                RETURN NEW;
+            END
+            $$ LANGUAGE plpgsql;
+            """
+        )
+        # Only text edits recompute the vector; stock/price updates stay cheap
+        schema_editor.execute(
+            f"""
+            CREATE TRIGGER {table}_search_vector_update
+            BEFORE INSERT OR UPDATE OF {title}, {body} ON {table}
+            FOR EACH ROW EXECUTE FUNCTION {table}_search_vector_update();
+            """
+        )
+        schema_editor.execute(f"UPDATE {table} SET {title} = {title};")
+        schema_editor.execute(
+            f"CREATE INDEX {table}_search_gin ON {table} USING gin (search_vector);"
+        )
+
+
+def drop_search_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for table, _, _ in SEARCH_TABLES:
+        schema_editor.execute(f"DROP INDEX IF EXISTS {table}_search_gin;")
+        schema_editor.execute(f"DROP TRIGGER IF EXISTS {table}_search_vector_update ON {table};")
+        schema_editor.execute(f"DROP FUNCTION IF EXISTS {table}_search_vector_update();")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("app", "0005_user_coordinates_geohash"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="farmingupdate",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False, null=True
+            ),
+        ),
+        migrations.AddField(
+            model_name="farmproduct",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False, null=True
+            ),
+        ),
+        migrations.RunPython(create_search_triggers, drop_search_triggers),
+    ]
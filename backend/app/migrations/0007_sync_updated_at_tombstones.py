@@ -0,0 +1,79 @@
+# Generated by Django 5.2.5 on 2026-10-18 19:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("app", "0006_search_vectors"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Tombstone",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("resource", models.CharField(max_length=20)),
+                ("object_id", models.BigIntegerField()),
+                ("buyer_id", models.BigIntegerField(blank=True, null=True)),
+                ("farmer_id", models.BigIntegerField(blank=True, null=True)),
+                ("deleted_at", models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name="farmingupdate",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name="farmproduct",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name="order",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddIndex(
+            model_name="farmingupdate",
+            index=models.Index(fields=["updated_at", "id"], name="update_updated_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="farmproduct",
+            index=models.Index(
+                fields=["farmer", "updated_at", "id"], name="product_farmer_updated_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="farmproduct",
+            index=models.Index(fields=["updated_at", "id"], name="product_updated_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(
+                fields=["buyer", "updated_at", "id"], name="order_buyer_updated_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(
+                fields=["product", "updated_at", "id"], name="order_product_updated_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="tombstone",
+            index=models.Index(
+                fields=["deleted_at", "id"], name="tombstone_deleted_idx"
+            ),
+        ),
+    ]
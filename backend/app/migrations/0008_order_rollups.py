@@ -0,0 +1,68 @@
+# Generated by Django 5.2.5 on 2026-10-18 20:12
+
+from django.db import migrations, models
+
+
+def backfill_rollups(apps, schema_editor):
+    # the dashboards read only rollups, so fill them from existing orders
+    from app import analytics
+
+    analytics.rebuild(apps=apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("app", "0007_sync_updated_at_tombstones"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="OrderRollup",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "scope",
+                    models.CharField(
+                        choices=[
+                            ("farmer", "Farmer"),
+                            ("buyer", "Buyer"),
+                            ("product", "Product"),
+                        ],
+                        max_length=10,
+                    ),
+                ),
+                ("scope_id", models.BigIntegerField()),
+                ("day", models.DateField()),
+                ("pending", models.IntegerField(default=0)),
+                ("confirmed", models.IntegerField(default=0)),
+                ("completed", models.IntegerField(default=0)),
+                ("cancelled", models.IntegerField(default=0)),
+                (
+                    "quantity",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=14),
+                ),
+                (
+                    "revenue",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=16),
+                ),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("scope", "scope_id", "day"),
+                        name="rollup_scope_day_uniq",
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
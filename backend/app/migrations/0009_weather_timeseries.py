@@ -0,0 +1,81 @@
+# Generated by Django 5.2.5 on 2026-10-18 20:15
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def dedupe_reports(apps, schema_editor):
+    # fetch used to append a row per call; keep the latest per (location, day)
+    WeatherReport = apps.get_model("app", "WeatherReport")
+    seen = set()
+    duplicates = []
+    for pk, location, report_date in WeatherReport.objects.order_by(
+        "location", "report_date", "-updated_at", "-id"
+    ).values_list("id", "location", "report_date"):
+        if (location, report_date) in seen:
+            duplicates.append(pk)
+        seen.add((location, report_date))
+    for start in range(0, len(duplicates), 500):
+        WeatherReport.objects.filter(pk__in=duplicates[start : start + 500]).delete()
+    WeatherReport.objects.update(
+        temperature_min=models.F("temperature"), temperature_max=models.F("temperature")
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("app", "0008_order_rollups"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="WeatherReading",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("location", models.CharField(max_length=255)),
+                (
+                    "observed_at",
+                    models.DateTimeField(default=django.utils.timezone.now),
+                ),
+                ("temperature", models.FloatField()),
+                ("humidity", models.FloatField()),
+                ("rainfall", models.FloatField()),
+                ("conditions", models.CharField(max_length=100)),
+            ],
+        ),
+        migrations.AddField(
+            model_name="weatherreport",
+            name="samples",
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name="weatherreport",
+            name="temperature_max",
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="weatherreport",
+            name="temperature_min",
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.RunPython(dedupe_reports, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="weatherreport",
+            constraint=models.UniqueConstraint(
+                fields=("location", "report_date"), name="weather_location_date_uniq"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="weatherreading",
+            index=models.Index(fields=["observed_at"], name="reading_observed_idx"),
+        ),
+    ]
@@ -0,0 +1,77 @@
+# Generated by Django 5.2.5 on 2026-10-18 20:31
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_index(apps, schema_editor):
+    from app import prices
+
+    # orders traded before confirmed_at existed: their creation time is the
+    # closest day on record, and without one rebuild() would skip them
+    Order = apps.get_model("app", "Order")
+    Order.objects.filter(status__in=prices.TRADED, confirmed_at__isnull=True).update(confirmed_at=F("created_at"))
+    prices.rebuild(apps=apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("app", "0009_weather_timeseries"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="order",
+            name="confirmed_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name="PriceIndex",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("product_key", models.CharField(max_length=100)),
+                ("location", models.CharField(blank=True, default="", max_length=255)),
+                ("unit", models.CharField(max_length=20)),
+                ("day", models.DateField()),
+                ("trades", models.IntegerField(default=0)),
+                (
+                    "quantity",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=14),
+                ),
+                (
+                    "value",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=16),
+                ),
+                (
+                    "min_price",
+                    models.DecimalField(
+                        blank=True, decimal_places=2, max_digits=10, null=True
+                    ),
+                ),
+                (
+                    "max_price",
+                    models.DecimalField(
+                        blank=True, decimal_places=2, max_digits=10, null=True
+                    ),
+                ),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("product_key", "location", "unit", "day"),
+                        name="price_key_day_uniq",
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(backfill_index, migrations.RunPython.noop),
+    ]
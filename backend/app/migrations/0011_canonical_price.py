@@ -0,0 +1,156 @@
+# Generated by Django 5.2.5 on 2026-10-18 20:35
+
+import django.db.models.expressions
+import django.db.models.functions.text
+import django.db.models.lookups
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("app", "0010_price_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="farmproduct",
+            name="price_per_kg",
+            field=models.GeneratedField(
+                db_persist=True,
+                expression=django.db.models.expressions.CombinedExpression(
+                    models.F("price_per_unit"),
+                    "/",
+                    models.Case(
+                        models.When(
+                            django.db.models.lookups.In(
+                                django.db.models.functions.text.Lower(
+                                    django.db.models.functions.text.Trim("unit")
+                                ),
+                                ["g", "gm", "gram", "grams"],
+                            ),
+                            then=models.Value(Decimal("0.001")),
+                        ),
+                        models.When(
+                            django.db.models.lookups.In(
+                                django.db.models.functions.text.Lower(
+                                    django.db.models.functions.text.Trim("unit")
+                                ),
+                                ["lb", "lbs", "pound", "pounds"],
+                            ),
+                            then=models.Value(Decimal("0.45359237")),
+                        ),
+                        models.When(
+                            django.db.models.lookups.In(
+                                django.db.models.functions.text.Lower(
+                                    django.db.models.functions.text.Trim("unit")
+                                ),
+                                ["kg", "kgs", "kilo", "kilogram", "kilograms", "kilos"],
+                            ),
+                            then=models.Value(Decimal("1")),
+                        ),
+                        models.When(
+                            django.db.models.lookups.In(
+                                django.db.models.functions.text.Lower(
+                                    django.db.models.functions.text.Trim("unit")
+                                ),
+                                ["qtl", "quintal", "quintals"],
+                            ),
+                            then=models.Value(Decimal("100")),
+                        ),
+                        models.When(
+                            django.db.models.lookups.In(
+                                django.db.models.functions.text.Lower(
+                                    django.db.models.functions.text.Trim("unit")
+                                ),
+                                ["mt", "t", "ton", "tonne", "tonnes", "tons"],
+                            ),
+                            then=models.Value(Decimal("1000")),
+                        ),
+                        default=None,
+                        output_field=models.DecimalField(
+                            decimal_places=8, max_digits=12
+                        ),
+                    ),
+                ),
+                output_field=models.DecimalField(decimal_places=4, max_digits=14),
+            ),
+        ),
+        migrations.AddField(
+            model_name="farmproduct",
+            name="quantity_kg",
+            field=models.GeneratedField(
+                db_persist=True,
+                expression=django.db.models.expressions.CombinedExpression(
+                    models.F("quantity"),
+                    "*",
+                    models.Case(
+                        models.When(
+                            django.db.models.lookups.In(
+                                django.db.models.functions.text.Lower(
+                                    django.db.models.functions.text.Trim("unit")
+                                ),
+                                ["g", "gm", "gram", "grams"],
+                            ),
+                            then=models.Value(Decimal("0.001")),
+                        ),
+                        models.When(
+                            django.db.models.lookups.In(
+                                django.db.models.functions.text.Lower(
+                                    django.db.models.functions.text.Trim("unit")
+                                ),
+                                ["lb", "lbs", "pound", "pounds"],
+                            ),
+                            then=models.Value(Decimal("0.45359237")),
+                        ),
+                        models.When(
+                            django.db.models.lookups.In(
+                                django.db.models.functions.text.Lower(
+                                    django.db.models.functions.text.Trim("unit")
+                                ),
+                                ["kg", "kgs", "kilo", "kilogram", "kilograms", "kilos"],
+                            ),
+                            then=models.Value(Decimal("1")),
+                        ),
+                        models.When(
+                            django.db.models.lookups.In(
+                                django.db.models.functions.text.Lower(
+                                    django.db.models.functions.text.Trim("unit")
+                                ),
+                                ["qtl", "quintal", "quintals"],
+                            ),
+                            then=models.Value(Decimal("100")),
+                        ),
+                        models.When(
+                            django.db.models.lookups.In(
+                                django.db.models.functions.text.Lower(
+                                    django.db.models.functions.text.Trim("unit")
+                                ),
+                                ["mt", "t", "ton", "tonne", "tonnes", "tons"],
+                            ),
+                            then=models.Value(Decimal("1000")),
+                        ),
+                        default=None,
+                        output_field=models.DecimalField(
+                            decimal_places=8, max_digits=12
+                        ),
+                    ),
+                ),
+                output_field=models.DecimalField(decimal_places=3, max_digits=16),
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="farmproduct",
+            index=models.Index(
+                fields=["available", "price_per_kg", "id"],
+                name="product_avail_price_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="farmproduct",
+            index=models.Index(
+                fields=["farmer", "price_per_kg", "id"], name="product_farmer_price_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,68 @@
+# Generated by Django 5.2.5 on 2026-10-18 21:10
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_farmer(apps, schema_editor):
+    # copy each order's product.farmer_id before the column becomes NOT NULL
+    Order = apps.get_model("app", "Order")
+    FarmProduct = apps.get_model("app", "FarmProduct")
+    Order.objects.update(
+        farmer_id=models.Subquery(
+            FarmProduct.objects.filter(pk=models.OuterRef("product_id")).values("farmer_id")[:1]
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("app", "0011_canonical_price"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="order",
+            name="farmer",
+            field=models.ForeignKey(
+                editable=False,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="sales",
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+        migrations.RunPython(backfill_farmer, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="order",
+            name="farmer",
+            field=models.ForeignKey(
+                editable=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="sales",
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+        migrations.RemoveIndex(
+            model_name="order",
+            name="order_product_created_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="order",
+            name="order_product_updated_idx",
+        ),
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(
+                fields=["farmer", "created_at", "id"], name="order_farmer_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(
+                fields=["farmer", "updated_at", "id"], name="order_farmer_updated_idx"
+            ),
+        ),
+    ]
@@ -1,27 +1,78 @@
 from django.contrib.auth.models import AbstractUser
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
+from django.utils import timezone
+
+from . import geo, units
 
 class User(AbstractUser):
     is_farmer = models.BooleanField(default=False)
     is_buyer = models.BooleanField(default=False)
     phone_number = models.CharField(max_length=15, blank=True, null=True)
     location = models.CharField(max_length=255, blank=True, null=True)
+    latitude = models.FloatField(blank=True, null=True)
+    longitude = models.FloatField(blank=True, null=True)
+    # derived from latitude/longitude on save; indexed for radius search (see app/geo.py)
+    geohash = models.CharField(max_length=12, blank=True, null=True, db_index=True, editable=False)
+
+    def save(self, *args, **kwargs):
+        if self.latitude is not None and self.longitude is not None:
+            self.geohash = geo.encode(self.latitude, self.longitude)
+        else:
+            self.geohash = None
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and {"latitude", "longitude"} & set(update_fields):
+            kwargs["update_fields"] = {*update_fields, "geohash"}
+        super().save(*args, **kwargs)
 
 
 class FarmProduct(models.Model):
     farmer = models.ForeignKey(User, on_delete=models.CASCADE, related_name="products")
     name = models.CharField(max_length=100)
+    sku = models.CharField(max_length=64, blank=True, null=True)  # farmer-supplied, used by bulk import
     description = models.TextField(blank=True, null=True)
     quantity = models.DecimalField(max_digits=10, decimal_places=2)  # e.g. kg, quintals
     unit = models.CharField(max_length=20, default="kg")
     price_per_unit = models.DecimalField(max_digits=10, decimal_places=2)
+    # unit-normalized copies for comparing listings; NULL for non-weight units (app/units.py)
+    price_per_kg = models.GeneratedField(
+        expression=units.price_per_kg_expression(),
+        output_field=models.DecimalField(max_digits=14, decimal_places=4),
+        db_persist=True,
+    )
+    quantity_kg = models.GeneratedField(
+        expression=units.quantity_kg_expression(),
+        output_field=models.DecimalField(max_digits=16, decimal_places=3),
+        db_persist=True,
+    )
     available = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)  # queryset.update()/bulk_update() must set it too
+    # name (weight A) + description (weight B); maintained by a DB trigger on PostgreSQL
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    class Meta:
+        # Keyset pagination walks (created_at, id) within each list filter
+        indexes = [
+            models.Index(fields=["farmer", "created_at", "id"], name="product_farmer_created_idx"),
+            models.Index(fields=["available", "created_at", "id"], name="product_avail_created_idx"),
+            # /api/sync/ range scans over (updated_at, id)
+            models.Index(fields=["farmer", "updated_at", "id"], name="product_farmer_updated_idx"),
+            models.Index(fields=["updated_at", "id"], name="product_updated_idx"),
+            # ?min_price=&max_price=&ordering=price range scans over (price_per_kg, id)
+            models.Index(fields=["available", "price_per_kg", "id"], name="product_avail_price_idx"),
+            models.Index(fields=["farmer", "price_per_kg", "id"], name="product_farmer_price_idx"),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=["farmer", "sku"], name="product_farmer_sku_uniq"),
+        ]
 
 
 class Order(models.Model):
     buyer = models.ForeignKey(User, on_delete=models.CASCADE, related_name="orders")
     product = models.ForeignKey(FarmProduct, on_delete=models.CASCADE, related_name="orders")
+    # copy of product.farmer_id so a farmer's order list is one index range, not a join
+    farmer = models.ForeignKey(User, on_delete=models.CASCADE, related_name="sales", editable=False)
     quantity = models.DecimalField(max_digits=10, decimal_places=2)
     total_price = models.DecimalField(max_digits=12, decimal_places=2)
     status = models.CharField(max_length=20, choices=[
@@ -31,6 +82,34 @@ class Order(models.Model):
         ("cancelled", "Cancelled"),
     ], default="pending")
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    # when it entered confirmed/completed; dates its trade in the price index
+    confirmed_at = models.DateTimeField(blank=True, null=True)
+
+    # Fields whose change moves the order between OrderRollup rows
+    ROLLUP_FIELDS = ("product_id", "buyer_id", "status", "quantity", "total_price")
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember what was loaded so a later save can undo it in the rollups
+        if all(field not in instance.get_deferred_fields() for field in cls.ROLLUP_FIELDS):
+            instance._rollup_state = tuple(getattr(instance, field) for field in cls.ROLLUP_FIELDS)
+        return instance
+
+    def save(self, *args, **kwargs):
+        # bulk_create() skips this, so its callers set farmer themselves
+        if self.farmer_id is None and self.product_id is not None:
+            self.farmer_id = self.product.farmer_id
+        super().save(*args, **kwargs)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["buyer", "created_at", "id"], name="order_buyer_created_idx"),
+            models.Index(fields=["farmer", "created_at", "id"], name="order_farmer_created_idx"),
+            models.Index(fields=["buyer", "updated_at", "id"], name="order_buyer_updated_idx"),
+            models.Index(fields=["farmer", "updated_at", "id"], name="order_farmer_updated_idx"),
+        ]
 
 class WeatherReport(models.Model):
     location = models.CharField(max_length=255)
@@ -39,7 +118,37 @@ class WeatherReport(models.Model):
     humidity = models.FloatField()
     rainfall = models.FloatField()
     conditions = models.CharField(max_length=100)  # e.g. "Sunny", "Rainy"
+    # Range of the day's readings; once downsampled the fields above are daily means
+    temperature_min = models.FloatField(blank=True, null=True)
+    temperature_max = models.FloatField(blank=True, null=True)
+    samples = models.PositiveIntegerField(default=1)  # readings folded into this row
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)  # last refresh from OpenWeather
+
+    class Meta:
+        constraints = [
+            # the upsert key, and the index behind ?location=&from=&to=
+            models.UniqueConstraint(fields=["location", "report_date"], name="weather_location_date_uniq"),
+        ]
+
+
+class WeatherReading(models.Model):
+    """
+    One raw OpenWeather observation. Kept for WEATHER_RAW_RETENTION_DAYS,
+    then folded into that day's WeatherReport by `downsample_weather`.
+    """
+    location = models.CharField(max_length=255)
+    observed_at = models.DateTimeField(default=timezone.now)
+    temperature = models.FloatField()
+    humidity = models.FloatField()
+    rainfall = models.FloatField()
+    conditions = models.CharField(max_length=100)
+
+    class Meta:
+        indexes = [
+            # downsample_weather scans everything older than the retention cutoff
+            models.Index(fields=["observed_at"], name="reading_observed_idx"),
+        ]
 
 
 class FarmingUpdate(models.Model):
@@ -51,5 +160,80 @@ class FarmingUpdate(models.Model):
         ("tips", "Tips & Best Practices"),
     ], default="news")
     published_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    # title (weight A) + content (weight B); maintained by a DB trigger on PostgreSQL
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["updated_at", "id"], name="update_updated_idx"),
+        ]
+
+
+class Tombstone(models.Model):
+    """
+    Records a deleted product, order or farming update so /api/sync/ can
+    tell clients to drop it. buyer_id/farmer_id scope order tombstones to
+    the two users who could see the order.
+    """
+    resource = models.CharField(max_length=20)  # "products", "orders", "updates"
+    object_id = models.BigIntegerField()
+    buyer_id = models.BigIntegerField(blank=True, null=True)
+    farmer_id = models.BigIntegerField(blank=True, null=True)
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["deleted_at", "id"], name="tombstone_deleted_idx"),
+        ]
+
+
+
+
+class OrderRollup(models.Model):
+    """
+    Daily order totals for one farmer, buyer or product, maintained by
+    app/analytics.py: order counts by status, plus quantity and revenue of
+    the orders that were not cancelled. `day` is the order's created_at date.
+    """
+    scope = models.CharField(max_length=10, choices=[
+        ("farmer", "Farmer"),
+        ("buyer", "Buyer"),
+        ("product", "Product"),
+    ])
+    scope_id = models.BigIntegerField()
+    day = models.DateField()
+    pending = models.IntegerField(default=0)
+    confirmed = models.IntegerField(default=0)
+    completed = models.IntegerField(default=0)
+    cancelled = models.IntegerField(default=0)
+    quantity = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    revenue = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            # also the index behind every (scope, scope_id, day range) read
+            models.UniqueConstraint(fields=["scope", "scope_id", "day"], name="rollup_scope_day_uniq"),
+        ]
+
 
+class PriceIndex(models.Model):
+    """
+    One day of confirmed trades for a product name in a location, kept by
+    app/prices.py. The volume-weighted average price is value / quantity.
+    """
+    product_key = models.CharField(max_length=100)  # prices.normalize_product_name()
+    location = models.CharField(max_length=255, blank=True, default="")  # the farmer's
+    unit = models.CharField(max_length=20)
+    day = models.DateField()
+    trades = models.IntegerField(default=0)
+    quantity = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    value = models.DecimalField(max_digits=16, decimal_places=2, default=0)  # sum of total_price
+    min_price = models.DecimalField(max_digits=10, decimal_places=2, blank=True, null=True)
+    max_price = models.DecimalField(max_digits=10, decimal_places=2, blank=True, null=True)
 
+    class Meta:
+        constraints = [
+            # the upsert key; its (product_key, location) prefix serves /api/prices/ ranges
+            models.UniqueConstraint(fields=["product_key", "location", "unit", "day"], name="price_key_day_uniq"),
+        ]
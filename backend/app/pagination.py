@@ -0,0 +1,166 @@
+import json
+import math
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, FieldError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Opaque-cursor pagination over the unique (created_at, id) key.
+
+    Each page is fetched with a `WHERE (created_at, id) < cursor ... LIMIT n`
+    range condition instead of an OFFSET, so page 1000 costs the same as
+    page 1 as long as a matching (…, created_at, id) index exists.
+
+    A view may set `keyset_ordering` (e.g. `("distance", "id")` for an
+    annotated queryset) to page over a different (key, id) pair. Pages may
+    hold model instances or named `values_list()` rows.
+    """
+
+    cursor_query_param = "cursor"
+    page_size_query_param = "page_size"
+    ordering = ("-created_at", "-id")
+    invalid_cursor_message = "Invalid cursor"
+
+    def get_page_size(self, request):
+        page_size = settings.API_PAGE_SIZE
+        max_page_size = settings.API_MAX_PAGE_SIZE
+        try:
+            requested = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return page_size
+        if requested <= 0:
+            return page_size
+        return min(requested, max_page_size)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.ordering = getattr(view, "keyset_ordering", None) or self.ordering
+        self.cursor = self.decode_cursor(request, self._key_kind(queryset))
+
+        # A "previous" cursor walks the index backwards from its key,
+        # then the page is flipped back into the canonical ordering.
+        reverse = self.cursor is not None and self.cursor["reverse"]
+        ordering = self._reverse_ordering() if reverse else self.ordering
+        queryset = queryset.order_by(*ordering)
+        if self.cursor is not None:
+            queryset = queryset.filter(self._after(ordering, self.cursor["key"]))
+
+        # Fetch one extra row to know whether another page follows.
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        self.page = results[:self.page_size]
+
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, self.cursor is not None
+
+        return self.page
+
+    def get_paginated_response(self, data):
+        return Response({
+            "next": self.get_next_link(),
+            "previous": self.get_previous_link(),
+            "results": data,
+        })
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        if not self.page:
+            # An empty backwards page: restart from the head of the list.
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def encode_cursor(self, instance, reverse):
+        key_name, id_name = (field.lstrip("-") for field in self.ordering)
+        key = getattr(instance, key_name)
+        token = {"o": ",".join(self.ordering), "k": key, "i": getattr(instance, id_name), "r": int(reverse)}
+        if isinstance(key, datetime):
+            token.update(k=key.isoformat(), t="dt")
+        elif isinstance(key, Decimal):
+            token.update(k=str(key), t="dec")
+        token = json.dumps(token, separators=(",", ":"))
+        encoded = urlsafe_b64encode(token.encode()).decode("ascii")
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def decode_cursor(self, request, kind=None):
+        """
+        The cursor's key and direction. It must have been issued for the
+        current ordering, with a key of the ordering field's `kind` ("dt",
+        "dec", or None for a plain number); anything else is a 404.
+        """
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            token = json.loads(urlsafe_b64decode(encoded.encode("ascii")))
+            if token["o"] != ",".join(self.ordering) or token.get("t") != kind:
+                raise ValueError("Cursor from another ordering")
+            key, pk = token["k"], token["i"]
+            if kind == "dt":
+                key = datetime.fromisoformat(key)
+                if key.tzinfo is None:
+                    raise ValueError("Naive cursor timestamp")
+            elif kind == "dec":
+                key = Decimal(key)
+                if not key.is_finite():
+                    raise ValueError("Non-finite cursor key")
+            elif isinstance(key, bool) or not isinstance(key, (int, float)) or not math.isfinite(key):
+                raise ValueError("Unsupported cursor key")
+            if isinstance(pk, bool) or not isinstance(pk, int):
+                raise ValueError("Unsupported cursor id")
+            reverse = bool(int(token.get("r", 0)))
+        except (TypeError, ValueError, KeyError, AttributeError, UnicodeError, InvalidOperation):
+            raise NotFound(self.invalid_cursor_message)
+        return {"key": (key, pk), "reverse": reverse}
+
+    def _key_kind(self, queryset):
+        """How the ordering key is carried in a cursor: "dt", "dec" or None (a plain number)."""
+        name = self.ordering[0].lstrip("-")
+        annotation = queryset.query.annotations.get(name)
+        try:
+            field = annotation.output_field if annotation is not None else queryset.model._meta.get_field(name)
+        except (FieldDoesNotExist, FieldError):
+            return None
+        return {"DateTimeField": "dt", "DecimalField": "dec"}.get(field.get_internal_type())
+
+    def _reverse_ordering(self):
+        return tuple(
+            field[1:] if field.startswith("-") else f"-{field}"
+            for field in self.ordering
+        )
+
+    @staticmethod
+    def _after(ordering, key):
+        """
+        Build the row-value comparison `(created_at, id) > key` (or `<` for
+        descending fields). The redundant bound on created_at alone gives the
+        planner an index range to scan instead of a filter over the OR.
+        """
+        (key_field, id_field), (value, pk) = ordering, key
+        op = "lt" if key_field.startswith("-") else "gt"
+        key_name, id_name = key_field.lstrip("-"), id_field.lstrip("-")
+        return Q(**{f"{key_name}__{op}e": value}) & (
+            Q(**{f"{key_name}__{op}": value})
+            | Q(**{key_name: value, f"{id_name}__{op}": pk})
+        )
@@ -0,0 +1,159 @@
+"""
+Market price index (GET /api/prices/).
+
+Each confirmed order is one trade at total_price / quantity. It is added
+to the PriceIndex row for its product's normalized name, the farmer's
+location, the normalized unit and the confirmation day, inside the transaction that
+confirms the order (services.set_order_status). Moving a trade back out
+(confirmed -> cancelled) takes its quantity and value off again; min/max
+keep the prices that were seen.
+
+`manage.py rebuild_prices` recomputes the index from orders, e.g. to
+backfill or after status changes made outside set_order_status.
+"""
+import re
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Max, Min, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .geo import normalize_location
+from .models import Order, PriceIndex
+from .units import normalize_unit
+
+# Statuses in which an order counts as traded
+TRADED = {"confirmed", "completed"}
+CENTS = Decimal("0.01")
+
+_PLURALS = [(re.compile(r"(\w)ies$"), r"\1y"), (re.compile(r"(\w)oes$"), r"\1o"), (re.compile(r"([^s])s$"), r"\1")]
+
+
+def normalize_product_name(name):
+    """Index key for a product name: "  Fresh Tomatoes " -> "fresh tomato" (crude English singulars only)."""
+    words = " ".join(name.casefold().split()).split(" ")
+    last = words[-1]
+    for pattern, replacement in _PLURALS:
+        if pattern.search(last):
+            last = pattern.sub(replacement, last)
+            break
+    return " ".join([*words[:-1], last])
+
+
+def _key(product, day):
+    return {
+        "product_key": normalize_product_name(product.name),
+        "location": normalize_location(product.farmer.location or ""),
+        "unit": normalize_unit(product.unit),
+        "day": day,
+    }
+
+
+def unit_price(order):
+    return (order.total_price / order.quantity).quantize(CENTS)
+
+
+# ---- Incremental updates ----
+def record_status_change(order, previous):
+    """Apply `order` moving from `previous` to its current status; call inside its transaction."""
+    entered, left = order.status in TRADED, previous in TRADED
+    if entered == left:
+        return  # e.g. confirmed -> completed trades nothing new
+    if order.confirmed_at is None:
+        return  # no confirmation time on record; rebuild_prices skips it too
+
+    key = _key(order.product, timezone.localdate(order.confirmed_at))
+    row, _ = PriceIndex.objects.select_for_update().get_or_create(**key)
+    sign = 1 if entered else -1
+    row.trades += sign
+    row.quantity += sign * order.quantity
+    row.value += sign * order.total_price
+    if entered:
+        price = unit_price(order)
+        row.min_price = price if row.min_price is None else min(row.min_price, price)
+        row.max_price = price if row.max_price is None else max(row.max_price, price)
+    row.save()
+
+
+# ---- Rebuild ----
+@transaction.atomic
+def rebuild(batch_size=1000, apps=None):
+    """
+    Recompute the whole index from traded orders; returns the number of rows
+    written. A migration passes its `apps` to run this on historical models.
+    """
+    orders, index = (Order, PriceIndex) if apps is None else (
+        apps.get_model("app", "Order"), apps.get_model("app", "PriceIndex")
+    )
+    index.objects.all().delete()
+    price = ExpressionWrapper(
+        F("total_price") / F("quantity"), output_field=DecimalField(max_digits=10, decimal_places=2)
+    )
+    groups = (
+        orders.objects.filter(status__in=TRADED, confirmed_at__isnull=False)
+        .annotate(day=TruncDate("confirmed_at"))
+        .values("product__name", "product__farmer__location", "product__unit", "day")
+        .annotate(
+            n=Count("id"),
+            sold=Sum("quantity"),
+            earned=Sum("total_price"),
+            low=Min(price),
+            high=Max(price),
+        )
+        .order_by()
+    )
+
+    # Several raw names ("Tomato", "tomatoes") and units ("kg", " KG") share one normalized key
+    rows = {}
+    for group in groups.iterator():
+        key = (
+            normalize_product_name(group["product__name"]),
+            normalize_location(group["product__farmer__location"] or ""),
+            normalize_unit(group["product__unit"]),
+            group["day"],
+        )
+        low, high = Decimal(group["low"]).quantize(CENTS), Decimal(group["high"]).quantize(CENTS)
+        row = rows.get(key)
+        if row is None:
+            product_key, location, unit, day = key
+            rows[key] = index(
+                product_key=product_key, location=location, unit=unit, day=day,
+                trades=group["n"], quantity=group["sold"], value=group["earned"],
+                min_price=low, max_price=high,
+            )
+            continue
+        row.trades += group["n"]
+        row.quantity += group["sold"]
+        row.value += group["earned"]
+        row.min_price, row.max_price = min(row.min_price, low), max(row.max_price, high)
+
+    index.objects.bulk_create(rows.values(), batch_size=batch_size)
+    return len(rows)
+
+
+# ---- Reads ----
+def trend(product, location, start, end):
+    """Daily index rows for a product name (and location) between two dates."""
+    queryset = PriceIndex.objects.filter(product_key=normalize_product_name(product), day__range=(start, end))
+    if location:
+        queryset = queryset.filter(location=normalize_location(location))
+    series = []
+    for row in queryset.filter(trades__gt=0).order_by("location", "unit", "day"):
+        series.append({
+            "day": row.day.isoformat(),
+            "location": row.location,
+            "unit": row.unit,
+            "vwap": str((row.value / row.quantity).quantize(CENTS)) if row.quantity else None,
+            "min_price": str(row.min_price),
+            "max_price": str(row.max_price),
+            "quantity": str(row.quantity),
+            "trades": row.trades,
+        })
+    return {
+        "product": normalize_product_name(product),
+        "location": normalize_location(location) if location else None,
+        "from": start.isoformat(),
+        "to": end.isoformat(),
+        "series": series,
+    }
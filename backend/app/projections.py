@@ -0,0 +1,196 @@
+"""
+Serializer-free read path for the high-volume list endpoints.
+
+A Projection reads a serializer's (possibly nested) read-only fields once,
+turns them into a flat list of ORM lookups for `.values_list()` and a plan
+that rebuilds the exact dict the serializer would have produced from each
+row tuple. Fields whose representation is the raw database value are
+copied as-is; Decimal and datetime fields get precompiled equivalents of
+their `to_representation` (anything else calls the field's own), so the
+output matches byte-for-byte without building model instances or walking
+`Serializer.to_representation` per object.
+"""
+import datetime
+import decimal
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils import timezone
+from rest_framework import ISO_8601, serializers
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+# Field types whose to_representation() is the identity for database values
+PASSTHROUGH_FIELDS = (
+    serializers.BooleanField,
+    serializers.CharField,
+    serializers.ChoiceField,
+    serializers.EmailField,
+    serializers.FloatField,
+    serializers.IntegerField,
+    serializers.ReadOnlyField,
+)
+
+
+def _bind_datetime(field):
+    # DateTimeField.to_representation looks the active timezone up per value;
+    # resolve it once per render instead. Non-ISO formats keep the field's own.
+    if getattr(field, "format", api_settings.DATETIME_FORMAT) != ISO_8601 or hasattr(field, "timezone"):
+        return lambda: field.to_representation
+
+    def bind():
+        tz = timezone.get_current_timezone() if settings.USE_TZ else None
+
+        def to_representation(value):
+            if tz is not None:
+                value = value.astimezone(tz) if timezone.is_aware(value) else timezone.make_aware(value, tz)
+            elif timezone.is_aware(value):
+                value = timezone.make_naive(value, datetime.timezone.utc)
+            value = value.isoformat()
+            return value[:-6] + "Z" if value.endswith("+00:00") else value
+
+        return to_representation
+
+    return bind
+
+
+def _bind_decimal(field):
+    if field.localize or not getattr(field, "coerce_to_string", api_settings.COERCE_DECIMAL_TO_STRING):
+        return lambda: field.to_representation
+    exponent = Decimal(".1") ** field.decimal_places
+
+    def bind():
+        # same quantize context DecimalField.quantize() copies per value
+        context = decimal.getcontext().copy()
+        if field.max_digits is not None:
+            context.prec = field.max_digits
+
+        def to_representation(value):
+            if not isinstance(value, Decimal):
+                return field.to_representation(value)
+            return "{:f}".format(value.quantize(exponent, rounding=field.rounding, context=context))
+
+        return to_representation
+
+    return bind
+
+
+def _is_plain_pk(field):
+    # an unexpanded relation: the FK column already holds the id
+    return isinstance(field, serializers.PrimaryKeyRelatedField) and field.pk_field is None
+
+
+def _binder(field):
+    if isinstance(field, serializers.DateTimeField):
+        return _bind_datetime(field)
+    if isinstance(field, serializers.DecimalField):
+        return _bind_decimal(field)
+    return lambda: field.to_representation
+
+
+class Projection:
+    """
+    `extras` are (key, lookup, formatter) tuples appended after the
+    serializer's fields, only when the queryset has that annotation and
+    only for rows where it isn't NULL (e.g. `distance_km` on ?near=).
+    """
+
+    max_compiled = 128  # distinct ?fields= / ?expand= specs kept compiled
+
+    def __init__(self, serializer_class, extras=()):
+        self.serializer_class = serializer_class
+        self.extras = extras
+        self._compiled = {}
+
+    def compiled(self, spec=None):
+        # Built on first use: reading serializer fields needs the app registry
+        key = None if spec is None else spec.key
+        if key not in self._compiled:
+            if len(self._compiled) >= self.max_compiled:
+                self._compiled.clear()
+            columns, binders = {}, []
+            serializer = self.serializer_class(context={"sparse_fields": spec})
+            plan = self._compile(serializer, "", columns, binders)
+            self._compiled[key] = plan, columns, binders
+        return self._compiled[key]
+
+    def _compile(self, serializer, prefix, columns, binders):
+        plan = []
+        for field in serializer.fields.values():
+            if field.write_only:
+                continue
+            if field.source == "*" or isinstance(field, serializers.SerializerMethodField):
+                raise ImproperlyConfigured(f"{serializer.__class__.__name__}.{field.field_name} cannot be projected")
+
+            lookup = prefix + "__".join(field.source_attrs)
+            index = columns.setdefault(lookup, len(columns))
+            if isinstance(field, serializers.BaseSerializer):
+                # The FK column doubles as the "related row is NULL" check
+                nested = self._compile(field, lookup + "__", columns, binders)
+                plan.append((field.field_name, index, None, nested))
+            elif type(field) in PASSTHROUGH_FIELDS or _is_plain_pk(field):
+                plan.append((field.field_name, index, None, None))
+            else:
+                binders.append(_binder(field))
+                plan.append((field.field_name, index, len(binders) - 1, None))
+        return plan
+
+    def rows(self, queryset, spec=None, keys=()):
+        """
+        `queryset` as named row tuples carrying every projected column plus
+        its annotations (distance, rank) and `keys`, so keyset pagination can
+        read the ordering key off each row even when ?fields= drops it.
+        """
+        _, columns, _ = self.compiled(spec)
+        lookups = list(columns)
+        for name in [*queryset.query.annotations, *keys]:
+            if name not in lookups:
+                lookups.append(name)
+        return queryset.values_list(*lookups, named=True)
+
+    def render(self, rows, spec=None):
+        plan, _, binders = self.compiled(spec)
+        formatters = [bind() for bind in binders]
+        extras = [
+            (key, rows[0]._fields.index(lookup), formatter)
+            for key, lookup, formatter in self.extras
+            if rows and lookup in rows[0]._fields
+        ]
+        data = []
+        for row in rows:
+            item = _build(plan, row, formatters)
+            for key, index, formatter in extras:
+                if row[index] is not None:
+                    item[key] = formatter(row[index])
+            data.append(item)
+        return data
+
+
+def _build(plan, row, formatters):
+    item = {}
+    for key, index, formatter, nested in plan:
+        value = row[index]
+        if nested is not None:
+            item[key] = None if value is None else _build(nested, row, formatters)
+        elif value is None or formatter is None:
+            item[key] = value
+        else:
+            item[key] = formatters[formatter](value)
+    return item
+
+
+class ProjectedListMixin:
+    """`list` built from `list_projection` instead of `serializer_class`."""
+
+    list_projection = None
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        spec = self.get_serializer_context().get("sparse_fields")
+        ordering = getattr(self, "keyset_ordering", None) or getattr(self.paginator, "ordering", ())
+        rows = self.list_projection.rows(queryset, spec, keys=[field.lstrip("-") for field in ordering])
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(self.list_projection.render(page, spec))
+        return Response(self.list_projection.render(list(rows), spec))
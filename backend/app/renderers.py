@@ -0,0 +1,36 @@
+import orjson
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+# Python's json module escapes neither; DRF's JSONRenderer escapes both so the
+# output is also valid JavaScript. Keep the bytes identical.
+LINE_SEPARATORS = ((b"\xe2\x80\xa8", b"\\u2028"), (b"\xe2\x80\xa9", b"\\u2029"))
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    Drop-in JSONRenderer backed by orjson, byte-compatible with DRF's
+    compact output except for floats. Datetimes and anything orjson doesn't
+    know natively go through DRF's JSONEncoder so they format exactly as
+    before; indented output (?format=json with `indent`) falls back to the
+    stock renderer.
+
+    Floats differ in two ways: exponents are written without "+" or leading
+    zeros and small magnitudes in plain notation (1e-05 -> 0.00001, 1e+16 ->
+    1e16), the same numbers to any JSON parser; and NaN/Infinity render as
+    null, where DRF's strict mode raises ValueError (a 500).
+    """
+
+    options = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        renderer_context = renderer_context or {}
+        if self.get_indent(accepted_media_type, renderer_context):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        ret = orjson.dumps(data, default=JSONEncoder().default, option=self.options)
+        for raw, escaped in LINE_SEPARATORS:
+            ret = ret.replace(raw, escaped)
+        return ret
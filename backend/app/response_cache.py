@@ -0,0 +1,189 @@
+"""
+Rendered-response cache for the public read-only endpoints.
+
+Entries live in the "responses" cache (local memory or a shared store,
+see CACHES in settings) and are keyed by model, list-or-object and the
+sorted query string — not the URL — so /api/weather-reports/ and
+/api/weatherreports/ share one entry.
+
+Invalidation is by generation counters rather than key deletion: every key
+embeds the current generation of its model's list (or of its object), and
+a save/delete bumps those counters when its transaction commits, so stale
+entries are simply never read again and age out on their TTL.
+"""
+import hashlib
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import router, transaction
+from django.db.models.signals import post_delete, post_save
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe
+from rest_framework.response import Response
+
+from .conditional import canonical_query
+from .models import FarmingUpdate, WeatherReport
+
+CACHED_MODELS = (FarmingUpdate, WeatherReport)
+CACHED_HEADERS = ("ETag", "Last-Modified", "Cache-Control")
+KEY_PREFIX = "response"
+
+
+class ResponseCache:
+    def __init__(self, alias, ttl):
+        self.alias = alias
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.invalidations = 0
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    # ---- Generations ----
+    def _generation_keys(self, model, pk):
+        label = model._meta.label_lower
+        # "all" covers bulk changes whose rows we don't know
+        scope = f"{KEY_PREFIX}:gen:{label}:" + ("list" if pk is None else f"obj:{pk}")
+        return [f"{KEY_PREFIX}:gen:{label}:all", scope]
+
+    def _generations(self, keys):
+        found = self.cache.get_many(keys)
+        for key in keys:
+            if key not in found:
+                # Never restart at 1: an evicted counter must not revive old entries
+                self.cache.add(key, time.time_ns(), timeout=None)
+                found[key] = self.cache.get(key)
+        return [found[key] for key in keys]
+
+    def _bump(self, key):
+        try:
+            self.cache.incr(key)
+        except ValueError:
+            self.cache.set(key, time.time_ns(), timeout=None)
+
+    def invalidate(self, model, pks=None):
+        """
+        Expire the model's list responses and those of `pks` (every object if
+        None) once the current transaction commits. Bumping earlier would let a
+        concurrent read of the old rows be cached under the new generation.
+        """
+        pks = None if pks is None else list(pks)
+        transaction.on_commit(lambda: self._invalidate(model, pks), using=router.db_for_write(model))
+
+    def _invalidate(self, model, pks):
+        label = model._meta.label_lower
+        if pks is None:
+            self._bump(f"{KEY_PREFIX}:gen:{label}:all")
+        else:
+            self._bump(f"{KEY_PREFIX}:gen:{label}:list")
+            for pk in pks:
+                self._bump(f"{KEY_PREFIX}:gen:{label}:obj:{pk}")
+        with self._lock:
+            self.invalidations += 1
+
+    # ---- Entries ----
+    def key(self, model, request, pk=None):
+        generations = self._generations(self._generation_keys(model, pk))
+        parts = [
+            model._meta.label_lower,
+            "list" if pk is None else str(pk),
+            *map(str, generations),
+            request.accepted_renderer.format,
+            canonical_query(request),
+        ]
+        digest = hashlib.md5("|".join(parts).encode(), usedforsecurity=False).hexdigest()
+        return f"{KEY_PREFIX}:{digest}"
+
+    def get(self, key):
+        entry = self.cache.get(key)
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return entry
+
+    def set(self, key, response):
+        entry = {
+            "content": response.content,
+            "content_type": response["Content-Type"],
+            "headers": {name: response[name] for name in CACHED_HEADERS if response.has_header(name)},
+        }
+        self.cache.set(key, entry, self.ttl)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "backend": self.cache.__class__.__name__,
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+    def clear(self):
+        self.cache.clear()
+        with self._lock:
+            self.hits = self.misses = self.invalidations = 0
+
+
+response_cache = ResponseCache("responses", settings.RESPONSE_CACHE_TTL)
+
+
+def replay(request, entry):
+    """Rebuild a response from a cache entry, or a 304 if the client's copy is current."""
+    headers = entry["headers"]
+    not_modified = get_conditional_response(
+        request,
+        etag=headers.get("ETag"),
+        last_modified=parse_http_date_safe(headers.get("Last-Modified", "")),
+    )
+    response = not_modified or HttpResponse(entry["content"], content_type=entry["content_type"])
+    for name, value in headers.items():
+        response[name] = value
+    return response
+
+
+class CachedResponseMixin:
+    """Serve `list` / `retrieve` JSON from the response cache."""
+
+    def list(self, request, *args, **kwargs):
+        return self.cached(request, None, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        object_id = kwargs[self.lookup_url_kwarg or self.lookup_field]
+        return self.cached(request, object_id, super().retrieve, *args, **kwargs)
+
+    def cached(self, request, object_id, render, *args, **kwargs):
+        # The browsable API shows the signed-in user, so only JSON is shared
+        if request.accepted_renderer.format != "json":
+            return render(request, *args, **kwargs)
+
+        key = response_cache.key(self.get_queryset().model, request, object_id)
+        entry = response_cache.get(key)
+        if entry is not None:
+            return replay(request, entry)
+
+        response = render(request, *args, **kwargs)
+        if isinstance(response, Response) and response.status_code == 200:
+            # Render now (DRF would do it after we return) so the bytes can be stored
+            response.accepted_renderer = request.accepted_renderer
+            response.accepted_media_type = request.accepted_media_type
+            response.renderer_context = self.get_renderer_context()
+            response.render()
+            response_cache.set(key, response)
+        return response
+
+
+def _on_change(sender, instance, **kwargs):
+    response_cache.invalidate(sender, [instance.pk])
+
+
+for _model in CACHED_MODELS:
+    post_save.connect(_on_change, sender=_model, dispatch_uid=f"response-cache-save-{_model.__name__}")
+    post_delete.connect(_on_change, sender=_model, dispatch_uid=f"response-cache-delete-{_model.__name__}")
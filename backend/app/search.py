@@ -0,0 +1,191 @@
+"""
+Full-text search over products and farming updates.
+
+On PostgreSQL each model has a `search_vector` tsvector column kept up to
+date by a trigger (see migration 0006) and a GIN index, and queries are
+ranked with ts_rank. Other databases (SQLite in tests) fall back to an
+in-process inverted index maintained from post_save/post_delete.
+"""
+import math
+import re
+import threading
+from collections import Counter, defaultdict
+
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connection
+from django.db.models import Case, F, FloatField, Value, When
+from django.db.models.signals import post_delete, post_save
+from rest_framework.filters import BaseFilterBackend
+
+from .models import FarmingUpdate, FarmProduct
+
+CONFIG = "english"
+
+# model -> (weight "A" field, weight "B" field); must match the trigger in 0006
+SEARCH_FIELDS = {
+    FarmProduct: ("name", "description"),
+    FarmingUpdate: ("title", "content"),
+}
+
+FALLBACK_MAX_RESULTS = 1000
+
+
+def uses_postgres():
+    return connection.vendor == "postgresql"
+
+
+def search(queryset, text):
+    """Filter `queryset` to rows matching `text`, annotated with a `rank` score."""
+    if uses_postgres():
+        query = SearchQuery(text, search_type="websearch", config=CONFIG)
+        return queryset.filter(search_vector=query).annotate(
+            rank=SearchRank(F("search_vector"), query)
+        )
+
+    scores = get_index(queryset.model).search(text)
+    return queryset.filter(pk__in=scores).annotate(
+        rank=Case(
+            *(When(pk=pk, then=Value(score)) for pk, score in scores.items()),
+            default=Value(0.0),
+            output_field=FloatField(),
+        )
+    )
+
+
+class FullTextSearchFilter(BaseFilterBackend):
+    """`?q=` relevance search for views whose model is in SEARCH_FIELDS."""
+
+    search_param = "q"
+
+    def filter_queryset(self, request, queryset, view):
+        text = request.query_params.get(self.search_param, "").strip()
+        if not text:
+            return queryset
+
+        queryset = search(queryset, text)
+        # An explicit ordering (e.g. distance on ?near=) wins over relevance
+        if getattr(view, "keyset_ordering", None) is None:
+            view.keyset_ordering = ("-rank", "-id")
+            queryset = queryset.order_by("-rank", "-id")
+        return queryset
+
+
+# --------------------------
+# In-process fallback index
+# --------------------------
+TOKEN_RE = re.compile(r"\w+")
+TITLE_WEIGHT = 1.0
+BODY_WEIGHT = 0.4
+
+
+def tokenize(text):
+    # crude plural folding so "tomatoes" finds "tomato", like the english config
+    for word in TOKEN_RE.findall((text or "").casefold()):
+        if len(word) > 4 and word.endswith("es"):
+            word = word[:-2]
+        elif len(word) > 3 and word.endswith("s"):
+            word = word[:-1]
+        yield word
+
+
+class InvertedIndex:
+    """term -> {pk: weighted term frequency}, built lazily and kept in step by signals."""
+
+    def __init__(self, model):
+        self.model = model
+        self.title_field, self.body_field = SEARCH_FIELDS[model]
+        self._postings = defaultdict(dict)
+        self._doc_terms = {}
+        self._lengths = {}
+        self._built = False
+        self._lock = threading.RLock()
+
+    def _ensure_built(self):
+        if self._built:
+            return
+        with self._lock:
+            if self._built:
+                return
+            rows = self.model.objects.values_list("pk", self.title_field, self.body_field)
+            for pk, title, body in rows.iterator():
+                self._add(pk, title, body)
+            self._built = True
+
+    def _add(self, pk, title, body):
+        self._remove(pk)
+        weights = Counter()
+        for term in tokenize(title):
+            weights[term] += TITLE_WEIGHT
+        for term in tokenize(body):
+            weights[term] += BODY_WEIGHT
+        for term, weight in weights.items():
+            self._postings[term][pk] = weight
+        self._doc_terms[pk] = list(weights)
+        self._lengths[pk] = sum(weights.values())
+
+    def _remove(self, pk):
+        for term in self._doc_terms.pop(pk, ()):
+            self._postings[term].pop(pk, None)
+        self._lengths.pop(pk, None)
+
+    def update(self, instance):
+        with self._lock:
+            if self._built:
+                self._add(instance.pk, getattr(instance, self.title_field), getattr(instance, self.body_field))
+
+    def discard(self, pk):
+        with self._lock:
+            self._remove(pk)
+
+    def search(self, text):
+        """{pk: score} for documents containing every query term, best first."""
+        terms = set(tokenize(text))
+        if not terms:
+            return {}
+        self._ensure_built()
+        with self._lock:
+            postings = sorted((self._postings.get(term, {}) for term in terms), key=len)
+            matches = set(postings[0]).intersection(*postings[1:])
+            scores = {
+                pk: sum(p[pk] for p in postings) / (1 + math.log1p(self._lengths[pk]))
+                for pk in matches
+            }
+        best = sorted(scores.items(), key=lambda item: (-item[1], -item[0]))
+        return dict(best[:FALLBACK_MAX_RESULTS])
+
+    def reset(self):
+        with self._lock:
+            self._postings.clear()
+            self._doc_terms.clear()
+            self._lengths.clear()
+            self._built = False
+
+
+_indexes = {model: InvertedIndex(model) for model in SEARCH_FIELDS}
+
+
+def get_index(model):
+    return _indexes[model]
+
+
+def index_instances(instances):
+    """Refresh the fallback index after bulk writes, which skip post_save."""
+    if uses_postgres():
+        return
+    for instance in instances:
+        get_index(type(instance)).update(instance)
+
+
+def _on_save(sender, instance, **kwargs):
+    if not uses_postgres():
+        get_index(sender).update(instance)
+
+
+def _on_delete(sender, instance, **kwargs):
+    if not uses_postgres():
+        get_index(sender).discard(instance.pk)
+
+
+for _model in SEARCH_FIELDS:
+    post_save.connect(_on_save, sender=_model, dispatch_uid=f"search-index-save-{_model.__name__}")
+    post_delete.connect(_on_delete, sender=_model, dispatch_uid=f"search-index-delete-{_model.__name__}")
@@ -1,11 +1,13 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
 from .models import FarmProduct, Order, WeatherReport, FarmingUpdate
+from .services import InsufficientStock, place_order
+from .sparse import SparseFieldsMixin
 
 User = get_user_model()
 
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(SparseFieldsMixin, serializers.ModelSerializer):
       class Meta :
             model = User
             fields = [
@@ -15,12 +17,26 @@ class UserSerializer(serializers.ModelSerializer):
                   "is_farmer",
                   "is_buyer",
                   "phone_number",
-                  "location"
+                  "location",
 
             ]
 
-class FarmProductSerializer(serializers.ModelSerializer):
+
+class ProfileSerializer(UserSerializer):
+      # a user's own profile; UserSerializer is also nested as every product's
+      # farmer and order's buyer, so exact coordinates stay out of it
+      class Meta(UserSerializer.Meta):
+            fields = [*UserSerializer.Meta.fields, "latitude", "longitude"]
+            extra_kwargs = {
+                  "latitude": {"min_value": -90, "max_value": 90},
+                  "longitude": {"min_value": -180, "max_value": 180},
+            }
+
+class FarmProductSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     farmer = UserSerializer(read_only=True)  # nested farmer info
+    # generated from price_per_unit/quantity and unit; null for non-weight units
+    price_per_kg = serializers.DecimalField(max_digits=14, decimal_places=4, read_only=True)
+    quantity_kg = serializers.DecimalField(max_digits=16, decimal_places=3, read_only=True)
 
     class Meta:
         model = FarmProduct
@@ -28,19 +44,49 @@ class FarmProductSerializer(serializers.ModelSerializer):
             "id",
             "farmer",
             "name",
+            "sku",
             "description",
             "quantity",
             "unit",
             "price_per_unit",
+            "price_per_kg",
+            "quantity_kg",
             "available",
             "created_at",
+            "updated_at",
         ]
 
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        # Only present on ?near= searches
+        if getattr(instance, "distance", None) is not None:
+            data["distance_km"] = round(instance.distance, 2)
+        return data
+
+
+class FarmProductImportSerializer(serializers.ModelSerializer):
+    """One row of a bulk catalog import; rows are matched on the farmer's SKU."""
+
+    class Meta:
+        model = FarmProduct
+        fields = [
+            "sku",
+            "name",
+            "description",
+            "quantity",
+            "unit",
+            "price_per_unit",
+            "available",
+        ]
+        extra_kwargs = {"sku": {"required": True, "allow_null": False, "allow_blank": False}}
+        # (farmer, sku) is the upsert key, so a repeat SKU is an update, not an error
+        validators = []
+
 
 # --------------------------
 # Order Serializer
 # --------------------------
-class OrderSerializer(serializers.ModelSerializer):
+class OrderSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     ordered_at = serializers.DateTimeField(source="created_at", read_only=True)
     buyer = UserSerializer(read_only=True)
     product = FarmProductSerializer(read_only=True)
@@ -62,28 +108,57 @@ class OrderSerializer(serializers.ModelSerializer):
             "status",
             "created_at",
             "ordered_at",
+            "updated_at",
         ]
         read_only_fields = ["total_price", "status", "created_at"]
 
+    def get_fields(self):
+        fields = super().get_fields()
+        if self.instance is not None:
+            # stock was reserved for the original line in place_order(); to change
+            # it, cancel and order again rather than bypass the reservation
+            for name in ("product_id", "quantity"):
+                if name in fields:
+                    fields[name].read_only = True
+        return fields
+
+    def validate_quantity(self, value):
+        if value <= 0:
+            raise serializers.ValidationError("Quantity must be greater than zero.")
+        return value
+
     def create(self, validated_data):
-        product = validated_data["product"]
-        quantity = validated_data["quantity"]
-
-        total_price = product.price_per_unit * quantity
-        order = Order.objects.create(
-            buyer=self.context["request"].user,
-            product=product,
-            quantity=quantity,
-            total_price=total_price,
-            status="pending"
-        )
-
-        # reduce product stock
-        product.quantity -= quantity
-        product.save()
-
-        return order
-    
+        try:
+            return place_order(
+                buyer=validated_data["buyer"],
+                product=validated_data["product"],
+                quantity=validated_data["quantity"],
+            )
+        except InsufficientStock as exc:
+            raise serializers.ValidationError({"quantity": str(exc)})
+
+
+class OrderStatusSerializer(serializers.ModelSerializer):
+    # what the product's farmer may change on an order
+    class Meta:
+        model = Order
+        fields = ["status"]
+        extra_kwargs = {"status": {"required": True}}
+
+
+class CheckoutItemSerializer(serializers.Serializer):
+    product_id = serializers.IntegerField()
+    quantity = serializers.DecimalField(max_digits=10, decimal_places=2)
+
+    def validate_quantity(self, value):
+        if value <= 0:
+            raise serializers.ValidationError("Quantity must be greater than zero.")
+        return value
+
+
+class CheckoutSerializer(serializers.Serializer):
+    # product ids are resolved in bulk by services.checkout, not per item
+    items = CheckoutItemSerializer(many=True, allow_empty=False, max_length=100)
 
 
 # --------------------------
@@ -100,6 +175,9 @@ class WeatherReportSerializer(serializers.ModelSerializer):
             "humidity",
             "rainfall",
             "conditions",
+            "temperature_min",
+            "temperature_max",
+            "samples",
             "created_at",
         ]
 
@@ -116,6 +194,7 @@ class FarmingUpdateSerializer(serializers.ModelSerializer):
             "content",
             "category",
             "published_at",
+            "updated_at",
         ]
 
 
@@ -127,8 +206,13 @@ class SignUpSerializer(serializers.ModelSerializer):
         fields = [
             "username" ,"email", "password",
             "phone_number", "location",
+            "latitude", "longitude",
             "is_farmer","is_buyer",
         ]
+        extra_kwargs = {
+            "latitude": {"min_value": -90, "max_value": 90},
+            "longitude": {"min_value": -180, "max_value": 180},
+        }
     
     def create(self, validated_data):
         password = validated_data.pop("password")
@@ -0,0 +1,176 @@
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Case, F, When
+from django.utils import timezone
+
+from . import analytics, prices
+from .models import FarmProduct, Order
+
+
+class InsufficientStock(Exception):
+    def __init__(self, product, available):
+        self.product = product
+        self.available = available
+        super().__init__(f"Only {available} {product.unit} available")
+
+
+class CheckoutError(Exception):
+    def __init__(self, errors):
+        self.errors = errors
+        super().__init__(errors)
+
+
+class InvalidTransition(Exception):
+    def __init__(self, current, status):
+        self.current = current
+        self.status = status
+        super().__init__(f"Cannot move an order from {current} to {status}")
+
+
+def line_total(product, quantity):
+    return (product.price_per_unit * quantity).quantize(Decimal("0.01"))
+
+
+def reserve_stock(product, quantity):
+    """
+    Take `quantity` off the product's stock with a single conditional UPDATE.
+
+    The `quantity >= n` guard and the decrement run as one statement, so
+    concurrent checkouts can never read the same stock level and oversell.
+    """
+    updated = FarmProduct.objects.filter(
+        pk=product.pk, quantity__gte=quantity
+    ).update(quantity=F("quantity") - quantity, updated_at=timezone.now())
+
+    if not updated:
+        available = (
+            FarmProduct.objects.filter(pk=product.pk)
+            .values_list("quantity", flat=True)
+            .first()
+        )
+        raise InsufficientStock(product, available)
+
+    # Keep the in-memory instance roughly in step for the response body
+    # without paying for a refresh_from_db().
+    product.quantity -= quantity
+
+
+def release_stock(product_id, quantity):
+    """Put `quantity` back on the product's stock, the counterpart of reserve_stock()."""
+    FarmProduct.objects.filter(pk=product_id).update(quantity=F("quantity") + quantity, updated_at=timezone.now())
+
+
+@transaction.atomic
+def place_order(buyer, product, quantity):
+    """Reserve stock and insert the order in one transaction."""
+    reserve_stock(product, quantity)
+    return Order.objects.create(
+        buyer=buyer,
+        product=product,
+        farmer_id=product.farmer_id,
+        quantity=quantity,
+        total_price=line_total(product, quantity),
+        status="pending",
+    )
+
+
+@transaction.atomic
+def checkout(buyer, items):
+    """
+    Place one order per product in `items` ({product_id, quantity} dicts),
+    all or nothing.
+
+    Statements stay fixed regardless of basket size: one locking SELECT,
+    one CASE-based UPDATE for every stock level and one bulk INSERT.
+    """
+    quantities = {}
+    for item in items:
+        product_id = item["product_id"]
+        quantities[product_id] = quantities.get(product_id, 0) + item["quantity"]
+
+    # Lock rows in primary-key order so two overlapping baskets always
+    # acquire locks in the same sequence and cannot deadlock.
+    products = list(
+        FarmProduct.objects.select_related("farmer")
+        .select_for_update(of=("self",))
+        .filter(pk__in=quantities)
+        .order_by("pk")
+    )
+
+    errors = []
+    found = {product.pk: product for product in products}
+    for product_id, quantity in quantities.items():
+        product = found.get(product_id)
+        if product is None:
+            errors.append({"product_id": product_id, "error": "Product not found"})
+        elif quantity > product.quantity:
+            errors.append({
+                "product_id": product_id,
+                "error": str(InsufficientStock(product, product.quantity)),
+            })
+    if errors:
+        raise CheckoutError(errors)
+
+    FarmProduct.objects.filter(pk__in=found).update(
+        quantity=Case(
+            *(When(pk=pk, then=F("quantity") - quantities[pk]) for pk in found),
+            default=F("quantity"),
+        ),
+        updated_at=timezone.now(),  # update() skips auto_now
+    )
+
+    orders = []
+    for product in products:
+        quantity = quantities[product.pk]
+        product.quantity -= quantity
+        orders.append(Order(
+            buyer=buyer,
+            product=product,
+            farmer_id=product.farmer_id,
+            quantity=quantity,
+            total_price=line_total(product, quantity),
+            status="pending",
+        ))
+    orders = Order.objects.bulk_create(orders)
+    # bulk_create() sends no post_save, so count the orders here
+    analytics.record_created(orders)
+    return orders
+
+
+# status: the statuses an order may move to from it
+TRANSITIONS = {
+    "pending": {"confirmed", "cancelled"},
+    "confirmed": {"completed", "cancelled"},
+    "completed": set(),
+    "cancelled": set(),
+}
+
+
+@transaction.atomic
+def set_order_status(order, status):
+    """
+    Move `order` to `status` if TRANSITIONS allows it; cancelling returns
+    its quantity to stock. The rollups and price index follow in the same
+    transaction.
+    """
+    # Lock the row and work from its committed state, so two requests can't
+    # both cancel an order and release its stock twice, and a stale `order`
+    # can't write back an old confirmed_at or rollup baseline
+    locked = Order.objects.select_for_update().get(pk=order.pk)
+    order.status, order.confirmed_at = locked.status, locked.confirmed_at
+    order._rollup_state = locked._rollup_state
+    previous = locked.status
+    if status == previous:
+        return order
+    if status not in TRANSITIONS[previous]:
+        raise InvalidTransition(previous, status)
+
+    order.status = status
+    if status == "cancelled":
+        release_stock(order.product_id, order.quantity)
+    if status in prices.TRADED and previous not in prices.TRADED:
+        order.confirmed_at = timezone.now()
+    order.save(update_fields=["status", "confirmed_at", "updated_at"])
+    prices.record_status_change(order, previous)
+    return order
@@ -0,0 +1,240 @@
+"""
+Slow-query sampler: every SQL statement a request runs that takes longer
+than SLOW_QUERY_THRESHOLD_MS is logged with its normalized text, the view
+and call site it came from, and its plan (EXPLAIN (ANALYZE off) on
+Postgres, EXPLAIN QUERY PLAN on SQLite). Nothing else is kept, so this
+can stay on in production where full query logging can't. Literals are
+scrubbed from the plan as well as the statement, so no row values are kept.
+
+The log is a ring buffer of SLOW_QUERY_LOG_SIZE slots in the default cache:
+a counter picks the slot, so with a shared cache (CACHE_URL) all workers
+write to one buffer and `manage.py slow_queries` reads it from anywhere.
+With the local-memory default it is per process. Staff can also read it
+at /admin/slow-queries/.
+"""
+import contextvars
+import os
+import re
+import sys
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.core.cache import cache
+from django.db import DatabaseError, transaction
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.http import HttpResponse
+from django.utils import timezone
+
+from . import metrics
+
+KEY_PREFIX = "slowq"
+MAX_SQL_LENGTH = 4000
+EXPLAIN = {
+    "postgresql": "EXPLAIN (ANALYZE off) ",
+    "sqlite": "EXPLAIN QUERY PLAN ",
+}
+EXPLAINABLE = ("select", "with", "insert", "update", "delete")
+# other execute_wrappers sit between the caller and the hook; they aren't call sites
+INSTRUMENTATION = {__file__, metrics.__file__}
+APP_DIR = os.path.dirname(__file__) + os.sep
+
+_request = contextvars.ContextVar("slow_query_request", default=None)
+# set while the hook runs its own EXPLAIN / cache writes, which go through it again
+_busy = threading.local()
+
+
+# ---- Normalizing ----
+_LITERALS = [
+    (re.compile(r"'(?:[^']|'')*'"), "?"),             # string literals
+    (re.compile(r"\b\d+(?:\.\d+)?\b"), "?"),          # numbers
+]
+_NORMALIZE = [
+    *_LITERALS,
+    (re.compile(r"%s"), "?"),                          # placeholders
+    (re.compile(r"\s+"), " "),
+    (re.compile(r"\(\?(?:, \?)+\)"), "(...)"),         # IN (?, ?, ?) whatever the list length
+    (re.compile(r"VALUES \((?:[^()]|\(\.\.\.\))*\)(?:, \((?:[^()]|\(\.\.\.\))*\))+", re.I), "VALUES (...)"),
+]
+
+
+def normalize_sql(sql):
+    """Statement text with literals and list lengths taken out, so repeats read alike."""
+    for pattern, replacement in _NORMALIZE:
+        sql = pattern.sub(replacement, sql)
+    return sql.strip()[:MAX_SQL_LENGTH]
+
+
+# the planner's own figures, e.g. "(cost=0.00..35.50 rows=2550 width=4)"
+_PLAN_ESTIMATE = re.compile(r"\(cost=[^)]*\)")
+
+
+def scrub_plan(plan):
+    """Plan text with the statement's literals taken out; estimates are kept."""
+
+    def scrub(text):
+        for pattern, replacement in _LITERALS:
+            text = pattern.sub(replacement, text)
+        return text
+
+    lines = []
+    for line in plan.splitlines():
+        parts = _PLAN_ESTIMATE.split(line)
+        estimates = _PLAN_ESTIMATE.findall(line) + [""]
+        lines.append("".join(scrub(part) + estimate for part, estimate in zip(parts, estimates)))
+    return "\n".join(lines)
+
+
+# ---- Attribution ----
+def _view(request):
+    if request is None:
+        return None
+    match = getattr(request, "resolver_match", None)
+    view = f"{match._func_path} ({match.view_name})" if match else "unresolved"
+    return f"{request.method} {request.path} -> {view}"
+
+
+def call_site(frame):
+    """The innermost frame in this app's code, e.g. "app/views.py:120 in list"."""
+    # None for queries Django itself runs (sessions, auth middleware)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename.startswith(APP_DIR) and filename not in INSTRUMENTATION:
+            return f"{os.path.relpath(filename, settings.BASE_DIR)}:{frame.f_lineno} in {frame.f_code.co_name}"
+        frame = frame.f_back
+    return None
+
+
+def explain(connection, sql, params):
+    prefix = EXPLAIN.get(connection.vendor)
+    if prefix is None or not sql.lstrip().lower().startswith(EXPLAINABLE):
+        return None
+    try:
+        # a savepoint, so a failed EXPLAIN can't poison the request's transaction on Postgres
+        with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+            cursor.execute(prefix + sql, params)
+            rows = cursor.fetchall()
+    except DatabaseError:
+        return None
+    # Postgres: one plan line per row, parameters inlined; SQLite: (id, parent, notused, detail)
+    return scrub_plan("\n".join(str(row[-1]) for row in rows))
+
+
+# ---- Ring buffer ----
+def _slot(n):
+    return f"{KEY_PREFIX}:{n % settings.SLOW_QUERY_LOG_SIZE}"
+
+
+def record(entry):
+    cache.add(f"{KEY_PREFIX}:seq", 0, timeout=None)
+    try:
+        seq = cache.incr(f"{KEY_PREFIX}:seq")
+    except ValueError:
+        return  # counter evicted between add and incr; drop this one
+    cache.set(_slot(seq), {**entry, "seq": seq}, timeout=None)
+
+
+def entries():
+    """Logged statements, oldest first."""
+    found = cache.get_many([_slot(n) for n in range(settings.SLOW_QUERY_LOG_SIZE)])
+    return sorted(found.values(), key=lambda entry: entry["seq"])
+
+
+def clear():
+    cache.delete_many([f"{KEY_PREFIX}:seq", *(_slot(n) for n in range(settings.SLOW_QUERY_LOG_SIZE))])
+
+
+def format_entries(logged):
+    blocks = []
+    for entry in logged:
+        lines = [
+            f"#{entry['seq']} {entry['at']} {entry['duration_ms']:.1f} ms on {entry['database']}",
+            f"  view: {entry['view'] or '-'}",
+            f"  call site: {entry['call_site'] or '-'}",
+            f"  sql: {entry['sql']}",
+        ]
+        if entry["plan"]:
+            lines.append("  plan:")
+            lines += [f"    {line}" for line in entry["plan"].splitlines()]
+        blocks.append("\n".join(lines))
+    return "\n\n".join(blocks)
+
+
+# ---- Collection ----
+def hook(execute, sql, params, many, context):
+    """execute_wrapper that logs a request's statements over the threshold."""
+    if _request.get() is None or getattr(_busy, "active", False):
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    result = execute(sql, params, many, context)
+    duration_ms = (time.perf_counter() - started) * 1000
+    if duration_ms < settings.SLOW_QUERY_THRESHOLD_MS:
+        return result
+
+    _busy.active = True
+    try:
+        connection = context["connection"]
+        record({
+            "at": timezone.now().isoformat(),
+            "duration_ms": duration_ms,
+            "database": connection.alias,
+            "view": _view(_request.get()),
+            "call_site": call_site(sys._getframe(1)),
+            "sql": normalize_sql(sql),
+            # executemany runs one statement per row; there is no single plan to show
+            "plan": None if many else explain(connection, sql, params),
+        })
+    finally:
+        _busy.active = False
+    return result
+
+
+@receiver(connection_created)
+def install_hook(sender, connection, **kwargs):
+    # once per connection, as with the metrics hook: under ASGI the view's
+    # queries run on connections the middleware can't reach, but _request
+    # follows them through sync_to_async
+    if hook not in connection.execute_wrappers:
+        connection.execute_wrappers.append(hook)
+
+
+class SlowQueryMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if settings.SLOW_QUERY_THRESHOLD_MS <= 0:
+            return self.get_response(request)
+        token = _request.set(request)
+        try:
+            return self.get_response(request)
+        finally:
+            _request.reset(token)
+
+    async def __acall__(self, request):
+        if settings.SLOW_QUERY_THRESHOLD_MS <= 0:
+            return await self.get_response(request)
+        token = _request.set(request)
+        try:
+            return await self.get_response(request)
+        finally:
+            _request.reset(token)
+
+
+# ---- Admin page ----
+@staff_member_required
+def slow_queries_view(request):
+    logged = entries()
+    body = format_entries(reversed(logged)) or "No slow queries logged."
+    header = f"Statements over {settings.SLOW_QUERY_THRESHOLD_MS:g} ms, newest first ({len(logged)} kept)\n\n"
+    return HttpResponse(header + body, content_type="text/plain; charset=utf-8")
@@ -0,0 +1,153 @@
+"""
+Sparse fieldsets (`?fields=`) and expansion control (`?expand=`).
+
+    ?fields=id,status,product.name      only these keys; dotted paths reach into relations
+    ?expand=product                     nest `product`, render other relations as their id
+    ?expand=                            no nesting at all
+
+Without `expand` every relation is nested as before, and without `fields`
+every field is returned, so existing clients see no change. A dotted path
+in `fields` expands the relation it goes through.
+"""
+from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+
+ALL = object()  # whole subtree selected
+
+
+def _paths(param):
+    return [path.strip() for path in param.split(",") if path.strip()]
+
+
+def _fields_tree(paths):
+    tree = {}
+    for path in paths:
+        node = tree
+        *parents, leaf = path.split(".")
+        for part in parents:
+            if node.get(part) is ALL:
+                break  # the whole relation is already selected
+            node = node.setdefault(part, {})
+        else:
+            node[leaf] = ALL
+    return tree
+
+
+def _expand_tree(paths):
+    tree = {}
+    for path in paths:
+        node = tree
+        for part in path.split("."):
+            node = node.setdefault(part, {})
+    return tree
+
+
+class FieldSpec:
+    """One serializer level: which fields to keep and which relations to nest."""
+
+    def __init__(self, fields=None, expand=None):
+        self.fields = fields  # None = all, else {name: ALL or subtree}
+        self.expand = expand  # None = all relations, else {name: subtree}
+
+    @classmethod
+    def from_params(cls, fields_param=None, expand_param=None):
+        if fields_param is None and expand_param is None:
+            return None
+        return cls(
+            _fields_tree(_paths(fields_param)) if fields_param else None,
+            _expand_tree(_paths(expand_param)) if expand_param is not None else None,
+        )
+
+    @property
+    def key(self):
+        """Stable, hashable form for caching per-spec compiled output."""
+        return repr((_freeze(self.fields), _freeze(self.expand)))
+
+    def includes(self, name):
+        return self.fields is None or name in self.fields
+
+    def expands(self, name):
+        if self.expand is None or name in self.expand:
+            return True
+        return self.fields is not None and isinstance(self.fields.get(name), dict)
+
+    def child(self, name):
+        fields = None if self.fields is None or self.fields.get(name, ALL) is ALL else self.fields[name]
+        expand = None if self.expand is None else self.expand.get(name, {})
+        return FieldSpec(fields, expand)
+
+    def expanded_path(self, path):
+        """Longest expanded prefix of a `select_related` path like "product__farmer"."""
+        spec, kept = self, []
+        for part in path.split("__"):
+            if not spec.expands(part):
+                break
+            kept.append(part)
+            spec = spec.child(part)
+        return "__".join(kept)
+
+
+def _freeze(tree):
+    if tree is None or tree is ALL:
+        return "*" if tree is ALL else None
+    return tuple(sorted((name, _freeze(child)) for name, child in tree.items()))
+
+
+class SparseFieldsMixin:
+    """
+    Trims a serializer's fields to the FieldSpec in context["sparse_fields"],
+    passing each nested serializer its part of the spec.
+    """
+
+    def get_fields(self):
+        fields = super().get_fields()
+        # Nested serializers get their spec from the parent; the top level from the view
+        spec = self._sparse_spec if hasattr(self, "_sparse_spec") else self.context.get("sparse_fields")
+        if spec is None:
+            return fields
+
+        if spec.fields is not None:
+            unknown = set(spec.fields) - set(fields)
+            if unknown:
+                raise serializers.ValidationError({"fields": f"Unknown field(s): {', '.join(sorted(unknown))}"})
+        if spec.expand is not None:
+            unknown = {name for name in spec.expand if not isinstance(fields.get(name), serializers.BaseSerializer)}
+            if unknown:
+                raise serializers.ValidationError({"expand": f"Not expandable: {', '.join(sorted(unknown))}"})
+
+        trimmed = {}
+        for name, field in fields.items():
+            if not spec.includes(name):
+                continue
+            if isinstance(field, serializers.BaseSerializer):
+                if not spec.expands(name):
+                    field = serializers.PrimaryKeyRelatedField(read_only=True, source=field.source)
+                else:
+                    field._sparse_spec = spec.child(name)
+            trimmed[name] = field
+        return trimmed
+
+
+class SparseFieldsViewMixin:
+    """Parses ?fields= / ?expand= on reads and hands the spec to the serializer."""
+
+    def get_sparse_spec(self):
+        if not hasattr(self, "_sparse_spec"):
+            params = self.request.query_params
+            self._sparse_spec = None
+            if self.request.method in SAFE_METHODS:
+                self._sparse_spec = FieldSpec.from_params(params.get("fields"), params.get("expand"))
+        return self._sparse_spec
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context["sparse_fields"] = self.get_sparse_spec()
+        return context
+
+    def select_expanded(self, queryset, *paths):
+        """select_related() only the part of each path the response will nest."""
+        spec = self.get_sparse_spec()
+        if spec is not None:
+            paths = sorted({spec.expanded_path(path) for path in paths} - {""})
+        # select_related() with no arguments would follow every FK
+        return queryset.select_related(*paths) if paths else queryset
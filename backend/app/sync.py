@@ -0,0 +1,193 @@
+"""
+Delta sync for low-bandwidth clients (GET /api/sync/?since=<token>).
+
+The sync token is an opaque cursor holding, per resource, the last
+(updated_at, id) the client has seen. Each call returns the rows of every
+resource past its cursor via the (…, updated_at, id) indexes, plus
+tombstones for rows deleted since, and a new token. Clients upsert rows
+by id and drop tombstoned ids.
+
+Once a client has caught up, its cursor is pulled back by
+SYNC_OVERLAP_SECONDS so rows from transactions that committed late with an
+earlier updated_at are not skipped; the few re-sent rows are harmless.
+
+Tombstones are kept SYNC_TOMBSTONE_RETENTION_DAYS; tokens older than that
+get 410 and the client syncs from scratch. Schedule `manage.py
+prune_tombstones` (e.g. daily cron) to delete the expired ones.
+"""
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import datetime, timedelta
+from datetime import timezone as dt_timezone
+
+from django.conf import settings
+from django.db.models import Q
+from django.db.models.signals import post_delete
+from django.utils import timezone
+
+from . import geo
+from .analytics import farmer_id
+from .models import FarmingUpdate, FarmProduct, Order, Tombstone
+from .projections import Projection
+from .serializers import FarmingUpdateSerializer, FarmProductSerializer, OrderSerializer
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+TOKEN_VERSION = 1
+
+
+class InvalidSyncToken(Exception):
+    pass
+
+
+class SyncTokenExpired(Exception):
+    """The token predates tombstone retention; the client must sync from scratch."""
+
+
+# ---- Resources ----
+def visible_products(user, initial):
+    """
+    The products /api/products/ lists for `user`. After the first sync,
+    products in scope that went unavailable are still sent (available=false)
+    so clients drop them; a first sync only gets available ones.
+    """
+    queryset = FarmProduct.objects.all()
+    if getattr(user, "is_farmer", False):
+        return queryset.filter(farmer=user)
+    if getattr(user, "is_buyer", False):
+        queryset = geo.local_to(queryset, user, settings.NEAR_DEFAULT_RADIUS_KM)
+    return queryset.filter(available=True) if initial else queryset
+
+
+def visible_orders(user, initial):
+    if getattr(user, "is_farmer", False):
+        return Order.objects.filter(farmer=user)
+    return Order.objects.filter(buyer=user)
+
+
+def visible_tombstones(user):
+    # product and update ids are public; order ids only go to its buyer and farmer
+    return Tombstone.objects.filter(
+        ~Q(resource="orders") | Q(buyer_id=user.pk) | Q(farmer_id=user.pk)
+    )
+
+
+RESOURCES = {
+    # name: (rows visible to a user, given whether this is a first sync; projection for the payload)
+    "products": (visible_products, Projection(FarmProductSerializer)),
+    "orders": (visible_orders, Projection(OrderSerializer)),
+    "updates": (lambda user, initial: FarmingUpdate.objects.all(), Projection(FarmingUpdateSerializer)),
+}
+
+
+# ---- Tokens ----
+def encode_token(cursors):
+    payload = {"v": TOKEN_VERSION, "c": {name: [ts.isoformat(), pk] for name, (ts, pk) in cursors.items()}}
+    return urlsafe_b64encode(json.dumps(payload, separators=(",", ":")).encode()).decode("ascii")
+
+
+def decode_token(token):
+    """{resource: (updated_at, id)} from a token; a missing token starts from the beginning."""
+    start = {name: (EPOCH, 0) for name in [*RESOURCES, "deleted"]}
+    if not token:
+        return start
+    try:
+        payload = json.loads(urlsafe_b64decode(token.encode("ascii")))
+        if payload["v"] != TOKEN_VERSION:
+            raise ValueError("Unsupported token version")
+        for name, (ts, pk) in payload["c"].items():
+            if name in start:
+                start[name] = (datetime.fromisoformat(ts), int(pk))
+                if start[name][0].tzinfo is None:
+                    raise ValueError("Naive timestamp")
+    except (TypeError, ValueError, KeyError, UnicodeError):
+        raise InvalidSyncToken("Invalid sync token")
+
+    horizon = timezone.now() - timedelta(days=settings.SYNC_TOMBSTONE_RETENTION_DAYS)
+    if start["deleted"][0] < horizon:
+        raise SyncTokenExpired("Sync token too old; sync again without one")
+    return start
+
+
+# ---- Changes ----
+def _after(field, cursor):
+    # row-value (field, id) > cursor, with the redundant bound as in KeysetPagination
+    ts, pk = cursor
+    return Q(**{f"{field}__gte": ts}) & (Q(**{f"{field}__gt": ts}) | Q(**{field: ts, "id__gt": pk}))
+
+
+def _page(queryset, field, cursor, limit):
+    """Up to `limit` rows past `cursor` in (field, id) order, and whether more remain."""
+    rows = list(queryset.filter(_after(field, cursor)).order_by(field, "id")[:limit + 1])
+    return rows[:limit], len(rows) > limit
+
+
+def _next_cursor(cursor, last, has_more, caught_up):
+    if has_more:
+        return last
+    # Caught up: hold the cursor back by the overlap, but never behind the old one
+    return max(cursor, min(last, caught_up) if last else caught_up)
+
+
+def changes(user, token=None, limit=None):
+    """The sync payload for `user` since `token` (see module docstring)."""
+    limit = limit or settings.SYNC_MAX_ROWS
+    cursors = decode_token(token)
+    caught_up = (timezone.now() - timedelta(seconds=settings.SYNC_OVERLAP_SECONDS), 0)
+
+    payload, next_cursors, has_more = {}, {}, False
+    for name, (visible, projection) in RESOURCES.items():
+        initial = cursors[name] == (EPOCH, 0)
+        rows, more = _page(projection.rows(visible(user, initial), keys=["updated_at"]), "updated_at", cursors[name], limit)
+        last = (rows[-1].updated_at, rows[-1].id) if rows else None
+        next_cursors[name] = _next_cursor(cursors[name], last, more, caught_up)
+        payload[name] = projection.render(rows)
+        has_more |= more
+
+    deleted, last = {name: [] for name in RESOURCES}, None
+    if cursors["deleted"] == (EPOCH, 0):
+        # a first sync has nothing to drop; start its tombstone cursor now, so
+        # it never pages through old tombstones into SyncTokenExpired
+        tombstone_rows, more = [], False
+    else:
+        tombstones = visible_tombstones(user).values_list("deleted_at", "id", "resource", "object_id", named=True)
+        tombstone_rows, more = _page(tombstones, "deleted_at", cursors["deleted"], limit)
+    for row in tombstone_rows:
+        deleted[row.resource].append(row.object_id)
+        last = (row.deleted_at, row.id)
+    next_cursors["deleted"] = _next_cursor(cursors["deleted"], last, more, caught_up)
+    has_more |= more
+
+    return {
+        **payload,
+        "deleted": deleted,
+        "sync_token": encode_token(next_cursors),
+        "has_more": has_more,
+    }
+
+
+# ---- Tombstones ----
+def prune_tombstones():
+    """Drop tombstones past retention; tokens that old get SyncTokenExpired instead."""
+    horizon = timezone.now() - timedelta(days=settings.SYNC_TOMBSTONE_RETENTION_DAYS)
+    deleted, _ = Tombstone.objects.filter(deleted_at__lt=horizon).delete()
+    return deleted
+
+
+def _record_product(sender, instance, **kwargs):
+    Tombstone.objects.create(resource="products", object_id=instance.pk, farmer_id=instance.farmer_id)
+
+
+def _record_order(sender, instance, **kwargs):
+    Tombstone.objects.create(
+        resource="orders", object_id=instance.pk, buyer_id=instance.buyer_id,
+        farmer_id=farmer_id(instance, instance.product_id),
+    )
+
+
+def _record_update(sender, instance, **kwargs):
+    Tombstone.objects.create(resource="updates", object_id=instance.pk)
+
+
+post_delete.connect(_record_product, sender=FarmProduct, dispatch_uid="sync-tombstone-product")
+post_delete.connect(_record_order, sender=Order, dispatch_uid="sync-tombstone-order")
+post_delete.connect(_record_update, sender=FarmingUpdate, dispatch_uid="sync-tombstone-update")
@@ -0,0 +1,102 @@
+"""
+Local stand-ins for the external services the app calls, so tests and
+offline benchmarks never touch the real APIs.
+"""
+import asyncio
+import json
+import threading
+import time
+from types import SimpleNamespace
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+class FakeOpenWeather:
+    """Local stand-in for the OpenWeather current-weather endpoint."""
+
+    def __init__(self, delay=0.0, status=200, port=0):
+        self.delay = delay
+        self.status = status
+        self.calls = []
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                query = parse_qs(urlparse(self.path).query)
+                fake.calls.append(query["q"][0])
+                time.sleep(fake.delay)
+                if fake.status == 200:
+                    body = {
+                        "main": {"temp": 31.5, "humidity": 40},
+                        "rain": {"1h": 0.2},
+                        "weather": [{"description": "clear sky"}],
+                    }
+                else:
+                    body = {"cod": str(fake.status), "message": "city not found"}
+                payload = json.dumps(body).encode()
+                self.send_response(fake.status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}/data/2.5/weather"
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class FakeChatClient:
+    """
+    Mimics `openai.OpenAI().chat.completions.create` closely enough for
+    app.ai; answers are derived from the question and every call is recorded.
+    """
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.calls = []
+        self._lock = threading.Lock()
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, model, messages, **kwargs):
+        question = messages[-1]["content"]
+        with self._lock:
+            self.calls.append(question)
+        time.sleep(self.delay)
+        message = SimpleNamespace(content=f"Answer to: {question}")
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+class FakeAsyncChatClient:
+    """
+    Streaming counterpart of FakeChatClient for `openai.AsyncOpenAI`: with
+    stream=True it yields the answer word by word, `token_delay` apart.
+    """
+
+    def __init__(self, token_delay=0.0):
+        self.token_delay = token_delay
+        self.calls = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    async def create(self, model, messages, stream=False, **kwargs):
+        question = messages[-1]["content"]
+        self.calls.append(question)
+        words = f"Answer to: {question}".split(" ")
+        tokens = [words[0]] + [f" {word}" for word in words[1:]]
+
+        async def chunks():
+            for token in tokens:
+                await asyncio.sleep(self.token_delay)
+                delta = SimpleNamespace(content=token)
+                yield SimpleNamespace(choices=[SimpleNamespace(delta=delta)])
+
+        return chunks()
@@ -1,3 +1,1953 @@
-from django.test import TestCase
+import asyncio
+import json
+import os
+import tempfile
+import threading
+import time
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock, skipIf
+from urllib.parse import parse_qs, urlencode, urlsplit
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection, transaction
+from django.http import HttpResponse
+from django.test import Client, RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from .catalog import import_products, iter_upload_rows
+from .models import User, FarmProduct, FarmingUpdate, Order, OrderRollup, PriceIndex, Tombstone, WeatherReading, WeatherReport
+from . import ai, analytics, geo, metrics, prices, slow_queries, units
+from .search import get_index, tokenize
+from .projections import Projection
+from .authentication import ClaimsRefreshToken
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+from .renderers import ORJSONRenderer
+from .serializers import FarmProductSerializer, OrderSerializer
+from .services import place_order, set_order_status
+from .ai import AnswerCache, answer_cache, normalize_question
+from .testing import FakeAsyncChatClient, FakeChatClient, FakeOpenWeather
+from .weather import get_weather, store_reports
+from .response_cache import response_cache
+
+
+# --------------------------
+# Shared fixtures
+# --------------------------
+def make_user(username, **extra):
+    return User.objects.create_user(username=username, password="pass1234", **extra)
+
+
+def seed_products(farmer, n):
+    return FarmProduct.objects.bulk_create([
+        FarmProduct(
+            farmer=farmer,
+            name=f"Product {i}",
+            quantity=Decimal("100.00"),
+            unit="kg",
+            price_per_unit=Decimal("10.00"),
+        )
+        for i in range(n)
+    ])
+
+
+def seed_orders(buyer, products):
+    return Order.objects.bulk_create([
+        Order(
+            buyer=buyer,
+            product=product,
+            farmer_id=product.farmer_id,
+            quantity=Decimal("1.00"),
+            total_price=product.price_per_unit,
+        )
+        for product in products
+    ])
+
+
+# --------------------------
+# Query budget tests
+# --------------------------
+class QueryBudgetTestCase(TestCase):
+    """
+    Seeds N rows and checks that an endpoint issues the same, bounded number
+    of queries regardless of N, so an N+1 regression fails loudly.
+    """
+
+    sizes = (1, 25)
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def count_queries(self, user, url):
+        self.client.force_authenticate(user=user)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries), response
+
+    def assertQueryBudget(self, user, url, seed, budget):
+        counts = []
+        for n in self.sizes:
+            seed(n)
+            num_queries, _ = self.count_queries(user, url)
+            counts.append(num_queries)
+
+        self.assertLessEqual(max(counts), budget, f"{url} issued {counts} queries")
+        self.assertEqual(len(set(counts)), 1, f"{url} query count grows with rows: {counts}")
+
+
+class ProductListQueryBudgetTests(QueryBudgetTestCase):
+    def test_farmer_product_list(self):
+        farmer = make_user("farmer", is_farmer=True, location="Pune")
+        self.assertQueryBudget(
+            farmer, "/api/products/", lambda n: seed_products(farmer, n), budget=1
+        )
+
+    def test_buyer_product_list(self):
+        farmer = make_user("farmer", is_farmer=True, location="Pune")
+        buyer = make_user("buyer", is_buyer=True, location="Pune")
+        self.assertQueryBudget(
+            buyer, "/api/products/", lambda n: seed_products(farmer, n), budget=1
+        )
+
+
+class OrderListQueryBudgetTests(QueryBudgetTestCase):
+    def setUp(self):
+        super().setUp()
+        self.farmer = make_user("farmer", is_farmer=True, location="Pune")
+        self.buyer = make_user("buyer", is_buyer=True, location="Pune")
+
+    def seed(self, n):
+        seed_orders(self.buyer, seed_products(self.farmer, n))
+
+    def test_buyer_order_list(self):
+        self.assertQueryBudget(self.buyer, "/api/orders/", self.seed, budget=1)
+
+    def test_farmer_order_list(self):
+        self.assertQueryBudget(self.farmer, "/api/orders/", self.seed, budget=1)
+
+    def test_nested_payload_is_complete(self):
+        self.seed(3)
+        _, response = self.count_queries(self.buyer, "/api/orders/")
+        self.assertEqual(len(response.data["results"]), 3)
+        order = response.data["results"][0]
+        self.assertEqual(order["buyer"]["username"], "buyer")
+        self.assertEqual(order["product"]["farmer"]["username"], "farmer")
+
+
+# --------------------------
+# Keyset pagination tests
+# --------------------------
+@override_settings(API_PAGE_SIZE=4, API_MAX_PAGE_SIZE=10)
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.farmer = make_user("farmer", is_farmer=True, location="Pune")
+        self.client.force_authenticate(user=self.farmer)
+        seed_products(self.farmer, 10)
+        # newest first, ties on created_at broken by id
+        self.expected = list(
+            FarmProduct.objects.order_by("-created_at", "-id").values_list("id", flat=True)
+        )
+
+    def walk(self, url, link="next"):
+        ids = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            ids.extend(p["id"] for p in response.data["results"])
+            url = response.data[link]
+        return ids, response
+
+    def test_forward_walk_visits_every_row_once(self):
+        ids, _ = self.walk("/api/products/")
+        self.assertEqual(ids, self.expected)
+
+    def test_previous_link_returns_prior_page(self):
+        first = self.client.get("/api/products/")
+        self.assertIsNone(first.data["previous"])
+        second = self.client.get(first.data["next"])
+        back = self.client.get(second.data["previous"])
+        self.assertEqual(
+            [p["id"] for p in back.data["results"]],
+            [p["id"] for p in first.data["results"]],
+        )
+
+    def test_page_size_is_clamped_to_maximum(self):
+        response = self.client.get("/api/products/?page_size=1000")
+        self.assertEqual(len(response.data["results"]), 10)
+        response = self.client.get("/api/products/?page_size=2")
+        self.assertEqual(len(response.data["results"]), 2)
+
+    def test_invalid_cursor_is_404(self):
+        response = self.client.get("/api/products/?cursor=not-a-cursor")
+        self.assertEqual(response.status_code, 404)
+
+    @staticmethod
+    def cursor(token):
+        return "/api/products/?" + urlencode({"cursor": urlsafe_b64encode(json.dumps(token).encode()).decode()})
+
+    def test_tampered_cursors_are_404(self):
+        next_url = self.client.get("/api/products/?page_size=2").data["next"]
+        token = json.loads(urlsafe_b64decode(parse_qs(urlsplit(next_url).query)["cursor"][0]))
+        self.assertEqual(self.client.get(self.cursor(token)).status_code, 200)
+        for tampered in [
+            {**token, "k": "12.50", "t": "dec"},
+            {**token, "k": 12, "t": None},
+            {**token, "k": token["k"][:19]},  # naive timestamp
+            {**token, "i": "3"},
+            {key: value for key, value in token.items() if key != "o"},
+        ]:
+            self.assertEqual(self.client.get(self.cursor(tampered)).status_code, 404, tampered)
+
+    def test_cursor_from_another_ordering_is_404(self):
+        next_url = self.client.get("/api/products/?page_size=2").data["next"]
+        self.assertEqual(self.client.get(next_url + "&ordering=price").status_code, 404)
+        next_url = self.client.get("/api/products/?page_size=2&ordering=price").data["next"]
+        self.assertEqual(self.client.get(next_url).status_code, 200)
+        self.assertEqual(self.client.get(next_url.replace("ordering=price", "ordering=-price")).status_code, 404)
+
+    def test_deep_page_is_a_single_query(self):
+        url = "/api/products/"
+        for _ in range(2):
+            url = self.client.get(url).data["next"]
+        with self.assertNumQueries(1):
+            self.client.get(url)
+
+    def test_farmer_order_pages_filter_on_the_order_row(self):
+        buyer = make_user("buyer", is_buyer=True, location="Pune")
+        other = make_user("other", is_farmer=True, location="Pune")
+        mine = seed_orders(buyer, FarmProduct.objects.filter(farmer=self.farmer))
+        seed_orders(buyer, seed_products(other, 3))
+        place_order(buyer, seed_products(self.farmer, 1)[0], Decimal("1"))
+        self.assertEqual(Order.objects.filter(farmer=self.farmer).count(), len(mine) + 1)
+        url = self.client.get("/api/orders/?page_size=2").data["next"]
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(len(response.data["results"]), 2)
+        # (farmer, created_at, id) serves the page only if the filter is on the order itself
+        where = ctx.captured_queries[-1]["sql"].split(" WHERE ", 1)[1]
+        self.assertIn('"app_order"."farmer_id"', where)
+        self.assertNotIn('"app_farmproduct"."farmer_id"', where)
+        ids, _ = self.walk("/api/orders/")
+        self.assertEqual(
+            ids, list(Order.objects.filter(farmer=self.farmer).order_by("-created_at", "-id").values_list("id", flat=True))
+        )
+
+
+# --------------------------
+# Stock reservation tests
+# --------------------------
+class OrderReservationTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.farmer = make_user("farmer", is_farmer=True, location="Pune")
+        self.buyer = make_user("buyer", is_buyer=True, location="Pune")
+        self.product = seed_products(self.farmer, 1)[0]
+        self.client.force_authenticate(user=self.buyer)
+
+    def order(self, quantity):
+        return self.client.post(
+            "/api/orders/", {"product_id": self.product.pk, "quantity": quantity}, format="json"
+        )
+
+    def test_order_decrements_stock_once(self):
+        response = self.order("30")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Decimal(response.data["total_price"]), Decimal("300.00"))
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.quantity, Decimal("70.00"))
+
+    def test_insufficient_stock_is_rejected_without_side_effects(self):
+        response = self.order("100.01")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("Only 100.00 kg available", response.data["quantity"])
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.quantity, Decimal("100.00"))
+        self.assertFalse(Order.objects.exists())
+
+    def test_non_positive_quantity_is_rejected(self):
+        self.assertEqual(self.order("-5").status_code, 400)
+        self.assertEqual(self.order("0").status_code, 400)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.quantity, Decimal("100.00"))
+
+    def test_buyer_cannot_edit_the_reserved_line(self):
+        order_id = self.order("2").data["id"]
+        other = seed_products(self.farmer, 1)[0]
+        response = self.client.patch(
+            f"/api/orders/{order_id}/", {"quantity": "9", "product_id": other.pk}, format="json"
+        )
+        self.assertEqual(response.status_code, 200)
+        order = Order.objects.get(pk=order_id)
+        self.assertEqual((order.product_id, order.quantity, order.total_price), (self.product.pk, Decimal("2.00"), Decimal("20.00")))
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.quantity, Decimal("98.00"))
+
+
+class CheckoutTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.farmer = make_user("farmer", is_farmer=True, location="Pune")
+        self.buyer = make_user("buyer", is_buyer=True, location="Pune")
+        self.products = seed_products(self.farmer, 20)
+        self.client.force_authenticate(user=self.buyer)
+
+    def checkout(self, items):
+        return self.client.post("/api/orders/checkout/", {"items": items}, format="json")
+
+    def basket(self, products, quantity="2"):
+        return [{"product_id": p.pk, "quantity": quantity} for p in products]
+
+    def test_basket_creates_every_order_and_decrements_stock(self):
+        response = self.checkout(self.basket(self.products[:5], "0.40"))
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data["orders"]), 5)
+        self.assertEqual(response.data["total_price"], "20.00")
+        self.assertEqual(Order.objects.filter(buyer=self.buyer).count(), 5)
+        self.assertEqual(
+            set(FarmProduct.objects.filter(pk__in=[p.pk for p in self.products[:5]])
+                .values_list("quantity", flat=True)),
+            {Decimal("99.60")},
+        )
+
+    def test_statement_count_does_not_grow_with_basket_size(self):
+        with CaptureQueriesContext(connection) as small:
+            self.checkout(self.basket(self.products[:2]))
+        with CaptureQueriesContext(connection) as large:
+            self.checkout(self.basket(self.products[2:]))
+        self.assertEqual(len(small.captured_queries), len(large.captured_queries))
+
+    def test_one_short_item_rejects_the_whole_basket(self):
+        items = self.basket(self.products[:3])
+        items[1]["quantity"] = "500"
+        response = self.checkout(items)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data["items"][0]["product_id"], self.products[1].pk)
+        self.assertFalse(Order.objects.exists())
+        self.assertFalse(FarmProduct.objects.exclude(quantity=Decimal("100.00")).exists())
+
+    def test_duplicate_lines_are_merged(self):
+        items = self.basket(self.products[:1], "30") * 2
+        response = self.checkout(items)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["orders"][0]["quantity"], "60.00")
+
+    def test_unknown_product_and_empty_basket_are_rejected(self):
+        self.assertEqual(self.checkout([{"product_id": 999999, "quantity": "1"}]).status_code, 400)
+        self.assertEqual(self.checkout([]).status_code, 400)
+
+
+@skipIf(connection.vendor == "sqlite", "SQLite's shared in-memory test DB rejects concurrent writers")
+class ConcurrentReservationTests(TransactionTestCase):
+    def test_hot_product_is_never_oversold(self):
+        # The command raises CommandError on oversell, lost updates or errors.
+        call_command("bench_reservations", threads=8, orders=60, stock=40, stdout=StringIO())
+
+
+# --------------------------
+# Catalog import / export tests
+# --------------------------
+class CatalogImportExportTests(TestCase):
+    csv_body = (
+        "sku,name,description,quantity,unit,price_per_unit,available\n"
+        "TOM-1,Tomato,Fresh,100,kg,20.50,True\n"
+        "ONI-1,Onion,,50,kg,15,\n"
+        "BAD-1,,,abc,kg,10,True\n"
+    )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.farmer = make_user("farmer", is_farmer=True, location="Pune")
+        self.client.force_authenticate(user=self.farmer)
+
+    def upload(self, name, body):
+        return self.client.post(
+            "/api/products/import/",
+            {"file": SimpleUploadedFile(name, body.encode())},
+            format="multipart",
+        )
+
+    def test_csv_import_creates_products_and_reports_row_errors(self):
+        response = self.upload("catalog.csv", self.csv_body)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["created"], 2)
+        self.assertEqual(response.data["error_count"], 1)
+        error = response.data["errors"][0]
+        self.assertEqual(error["row"], 3)
+        self.assertIn("name", error["errors"])
+        self.assertIn("quantity", error["errors"])
+        onion = FarmProduct.objects.get(farmer=self.farmer, sku="ONI-1")
+        self.assertTrue(onion.available)
+        self.assertIsNone(onion.description)
+
+    def test_reimport_updates_by_sku(self):
+        self.upload("catalog.csv", self.csv_body)
+        body = "\n".join([
+            json.dumps({"sku": "TOM-1", "name": "Tomato", "quantity": "80", "price_per_unit": "22"}),
+            "",
+            json.dumps({"sku": "NEW-1", "name": "Garlic", "quantity": "5", "price_per_unit": "90"}),
+            "not json",
+        ])
+        response = self.upload("catalog.ndjson", body)
+        self.assertEqual((response.data["created"], response.data["updated"]), (1, 1))
+        self.assertEqual(response.data["errors"][0]["row"], 3)
+        tomato = FarmProduct.objects.get(farmer=self.farmer, sku="TOM-1")
+        self.assertEqual(tomato.quantity, Decimal("80"))
+        self.assertEqual(tomato.description, "Fresh")
+        self.assertEqual(FarmProduct.objects.filter(farmer=self.farmer).count(), 3)
+
+    def test_queries_are_per_chunk_not_per_row(self):
+        def rows(n):
+            return iter_upload_rows(SimpleUploadedFile("c.csv", (
+                "sku,name,quantity,price_per_unit\n"
+                + "".join(f"S{i},P{i},1,1\n" for i in range(n))
+            ).encode()))
+
+        with CaptureQueriesContext(connection) as small:
+            import_products(self.farmer, rows(10), chunk_size=50)
+        FarmProduct.objects.all().delete()
+        with CaptureQueriesContext(connection) as large:
+            import_products(self.farmer, rows(50), chunk_size=50)
+        self.assertEqual(len(small.captured_queries), len(large.captured_queries))
+
+    def test_undecodable_upload_is_a_row_error(self):
+        body = self.csv_body.encode().replace(b"Onion", b"Oni\xff\xfeon")
+        response = self.client.post(
+            "/api/products/import/", {"file": SimpleUploadedFile("catalog.csv", body)}, format="multipart"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["created"], 1)
+        error = response.data["errors"][-1]
+        self.assertEqual(error["row"], 2)
+        self.assertIn("line 3", error["errors"]["non_field_errors"][0])
+
+        ndjson = b'{"sku": "A", "name": "A", "quantity": "1", "price_per_unit": "1"}\n\xff\n'
+        response = self.client.post(
+            "/api/products/import/", {"file": SimpleUploadedFile("c.ndjson", ndjson)}, format="multipart"
+        )
+        self.assertEqual((response.status_code, response.data["created"]), (200, 1))
+        self.assertEqual(response.data["errors"][0]["row"], 2)
+
+    def test_only_farmers_can_import(self):
+        self.client.force_authenticate(user=make_user("buyer", is_buyer=True))
+        self.assertEqual(self.upload("catalog.csv", self.csv_body).status_code, 403)
+
+    def test_csv_export_round_trips(self):
+        self.upload("catalog.csv", self.csv_body)
+        response = self.client.get("/api/products/export/csv/")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        body = b"".join(response.streaming_content).decode()
+        lines = body.strip().splitlines()
+        self.assertEqual(lines[0], "sku,name,description,quantity,unit,price_per_unit,available,created_at")
+        self.assertTrue(lines[1].startswith("TOM-1,Tomato,Fresh,100.00,kg,20.50,True,"))
+
+        FarmProduct.objects.all().delete()
+        response = self.upload("export.csv", body)
+        self.assertEqual((response.data["created"], response.data["error_count"]), (2, 0))
+
+    def test_ndjson_export(self):
+        self.upload("catalog.csv", self.csv_body)
+        response = self.client.get("/api/products/export/ndjson/")
+        rows = [json.loads(line) for line in b"".join(response.streaming_content).splitlines()]
+        self.assertEqual([row["sku"] for row in rows], ["TOM-1", "ONI-1"])
+        self.assertEqual(rows[0]["price_per_unit"], "20.50")
+
+
+# --------------------------
+# Weather cache tests
+# --------------------------
+class WeatherCacheTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def fetch(self, location):
+        return self.client.post("/api/weather-reports/fetch/", {"location": location}, format="json")
+
+    def test_repeat_requests_hit_cache_and_upsert_one_row(self):
+        with FakeOpenWeather() as fake, self.settings(OPENWEATHER_URL=fake.url):
+            first = self.fetch("pune")
+            second = self.fetch("  Pune ")
+        self.assertEqual((first.status_code, second.status_code), (201, 200))
+        self.assertEqual(first.data, second.data)
+        self.assertEqual(fake.calls, ["Pune"])
+        self.assertEqual(WeatherReport.objects.count(), 1)
+
+    def test_expired_entry_refreshes_the_same_row(self):
+        with FakeOpenWeather() as fake, self.settings(OPENWEATHER_URL=fake.url, WEATHER_CACHE_TTL=0):
+            self.fetch("Pune")
+            self.fetch("Pune")
+        self.assertEqual(len(fake.calls), 2)
+        self.assertEqual(WeatherReport.objects.count(), 1)
+
+    def test_concurrent_misses_share_one_upstream_call(self):
+        results = []
+        with FakeOpenWeather(delay=0.3) as fake, self.settings(OPENWEATHER_URL=fake.url):
+            threads = [
+                threading.Thread(target=lambda: results.append(get_weather("Nashik")))
+                for _ in range(10)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(len(fake.calls), 1)
+        self.assertEqual(sorted(cached for _, cached in results), [False] + [True] * 9)
+
+    def test_upstream_errors_are_passed_through_and_not_cached(self):
+        with FakeOpenWeather(status=404) as fake, self.settings(OPENWEATHER_URL=fake.url):
+            self.assertEqual(self.fetch("Atlantis").status_code, 404)
+            self.assertEqual(self.fetch("Atlantis").status_code, 404)
+        self.assertEqual(len(fake.calls), 2)
+        self.assertFalse(WeatherReport.objects.exists())
+
+    def test_location_must_be_text(self):
+        for location in ["  ", 42, ["Pune"], None]:
+            self.assertEqual(self.fetch(location).status_code, 400)
+
+
+class RefreshWeatherCommandTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        make_user("f1", is_farmer=True, location="Pune")
+        make_user("f2", is_farmer=True, location=" pune ")
+        make_user("b1", is_buyer=True, location="Nashik")
+        make_user("nobody", location="Mumbai")
+        make_user("f3", is_farmer=True)
+
+    def refresh(self, url, **options):
+        call_command("refresh_weather", url=url, stdout=StringIO(), stderr=StringIO(), **options)
+
+    def test_refreshes_each_distinct_location_once_and_upserts(self):
+        with FakeOpenWeather() as fake:
+            self.refresh(fake.url)
+            self.refresh(fake.url)
+        self.assertEqual(sorted(fake.calls), ["Nashik", "Nashik", "Pune", "Pune"])
+        self.assertEqual(
+            sorted(WeatherReport.objects.values_list("location", flat=True)), ["Nashik", "Pune"]
+        )
+
+    def test_reads_are_served_from_refreshed_rows(self):
+        with FakeOpenWeather() as fake:
+            self.refresh(fake.url)
+            cache.clear()  # e.g. another worker process with its own cache
+            with self.settings(OPENWEATHER_URL=fake.url):
+                data, cached = get_weather("pune")
+        self.assertTrue(cached)
+        self.assertEqual(data["location"], "Pune")
+        self.assertEqual(len(fake.calls), 2)
+
+    def test_per_host_rate_limit_spaces_requests(self):
+        with FakeOpenWeather() as fake:
+            started = time.perf_counter()
+            self.refresh(fake.url, concurrency=10, rate=10)
+            elapsed = time.perf_counter() - started
+        # two requests to one host at 10/s must be at least 0.1s apart
+        self.assertGreaterEqual(elapsed, 0.1)
+
+
+# --------------------------
+# Ask-AI answer cache tests
+# --------------------------
+class AnswerCacheTests(TestCase):
+    def test_normalized_questions_share_a_key(self):
+        self.assertEqual(normalize_question("  When to sow   WHEAT?? "), "when to sow wheat")
+
+    def test_lru_eviction_and_ttl(self):
+        now = [0.0]
+        answers = AnswerCache(max_entries=2, ttl=10, clock=lambda: now[0])
+        answers.get_or_compute("a", lambda: "A")
+        answers.get_or_compute("b", lambda: "B")
+        answers.get_or_compute("a", lambda: "stale")  # touch a, so b is least recent
+        answers.get_or_compute("c", lambda: "C")
+        self.assertEqual(answers.get_or_compute("a", lambda: "new"), ("A", True))
+        self.assertEqual(answers.get_or_compute("b", lambda: "B2"), ("B2", False))
+
+        now[0] = 11
+        self.assertEqual(answers.get_or_compute("a", lambda: "A2"), ("A2", False))
+        self.assertEqual(answers.stats()["evictions"], 2)
+
+
+@mock.patch("app.ai.get_client")
+class AskAIViewTests(TestCase):
+    def setUp(self):
+        answer_cache.clear()
+        self.client = APIClient()
+
+    def ask(self, question):
+        return self.client.post("/api/ask-ai/", {"question": question}, format="json")
+
+    def test_repeat_questions_are_served_from_cache(self, get_client):
+        fake = get_client.return_value = FakeChatClient()
+        first = self.ask("How to treat leaf rust?")
+        second = self.ask("how to treat   leaf rust")
+        self.assertEqual((first.data["cached"], second.data["cached"]), (False, True))
+        self.assertEqual(second.data["answer"], "Answer to: How to treat leaf rust?")
+        self.assertEqual(len(fake.calls), 1)
+
+    def test_identical_in_flight_questions_share_one_call(self, get_client):
+        fake = get_client.return_value = FakeChatClient(delay=0.2)
+        threads = [
+            threading.Thread(target=lambda: answer_cache.get_or_compute(
+                "q", lambda: fake.create(model="m", messages=[{"content": "q"}])
+            ))
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(fake.calls), 1)
+        stats = answer_cache.stats()
+        self.assertEqual((stats["misses"], stats["coalesced"] + stats["hits"]), (1, 7))
+
+    def test_question_must_be_text(self, get_client):
+        for question in ["   ", 42, ["when to sow wheat"], None]:
+            self.assertEqual(self.ask(question).status_code, 400)
+        self.assertFalse(get_client.called)
+
+    def test_stats_are_staff_only(self, get_client):
+        get_client.return_value = FakeChatClient()
+        self.ask("when to sow wheat")
+        self.ask("when to sow wheat")
+        self.assertEqual(self.client.get("/api/ask-ai/").status_code, 401)
+
+        self.client.force_authenticate(user=make_user("admin", is_staff=True))
+        stats = self.client.get("/api/ask-ai/").data
+        self.assertEqual((stats["hits"], stats["misses"], stats["hit_rate"]), (1, 1, 0.5))
+
+
+@mock.patch("app.ai.get_async_client")
+class AskAIStreamTests(TestCase):
+    def setUp(self):
+        answer_cache.clear()
+
+    async def events(self, response):
+        frames = []
+        async for chunk in response.streaming_content:
+            frames.append((time.perf_counter(), chunk.decode()))
+        return frames
+
+    @staticmethod
+    def tokens(frames):
+        return [
+            json.loads(frame.split("data: ", 1)[1])["token"]
+            for _, frame in frames if frame.startswith("data: ")
+        ]
+
+    async def test_tokens_arrive_incrementally_and_are_cached(self, get_async_client):
+        get_async_client.return_value = FakeAsyncChatClient(token_delay=0.05)
+        started = time.perf_counter()
+        response = await self.async_client.post(
+            "/api/ask-ai/stream/", {"question": "when to sow wheat"}, content_type="application/json"
+        )
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        frames = await self.events(response)
+
+        self.assertEqual("".join(self.tokens(frames)), "Answer to: when to sow wheat")
+        self.assertTrue(frames[-1][1].startswith("event: done"))
+        # first token lands after one token delay, not after the whole answer
+        self.assertLess(frames[0][0] - started, frames[-1][0] - started - 0.1)
+        self.assertEqual(answer_cache.get("when to sow wheat"), "Answer to: when to sow wheat")
+
+        response = await self.async_client.get("/api/ask-ai/stream/", {"question": "When to sow wheat?"})
+        frames = await self.events(response)
+        self.assertEqual(self.tokens(frames), ["Answer to: when to sow wheat"])
+        self.assertIn('"cached": true', frames[-1][1])
+
+    async def test_many_conversations_share_one_event_loop(self, get_async_client):
+        get_async_client.return_value = FakeAsyncChatClient(token_delay=0.05)
+
+        async def converse(i):
+            response = await self.async_client.get("/api/ask-ai/stream/", {"question": f"question {i}"})
+            return await self.events(response)
+
+        started = time.perf_counter()
+        results = await asyncio.gather(*(converse(i) for i in range(20)))
+        elapsed = time.perf_counter() - started
+        self.assertTrue(all(frames[-1][1].startswith("event: done") for frames in results))
+        # 20 streams of ~0.2s each overlap instead of running back to back
+        self.assertLess(elapsed, 2.0)
+
+    async def test_missing_question_is_rejected(self, get_async_client):
+        response = await self.async_client.post("/api/ask-ai/stream/", {}, content_type="application/json")
+        self.assertEqual(response.status_code, 400)
+
+
+class AsyncClientTests(TestCase):
+    @override_settings(OPENAI_API_KEY="test")
+    def test_one_client_per_event_loop(self):
+        async def clients():
+            return ai.get_async_client(), ai.get_async_client()
+
+        first, again = asyncio.run(clients())
+        self.assertIs(first, again)
+        self.assertIsNot(asyncio.run(clients())[0], first)
+
+
+# --------------------------
+# Nearby product search tests
+# --------------------------
+class NearbyProductSearchTests(TestCase):
+    # Pune centre, a farm ~5 km away, one ~40 km away and Mumbai (~120 km)
+    PUNE = (18.5204, 73.8567)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.farms = {}
+        for name, lat, lon in [
+            ("near", 18.5600, 73.8800),
+            ("mid", 18.7500, 74.1500),
+            ("far", 19.0760, 72.8777),
+        ]:
+            farmer = make_user(name, is_farmer=True, latitude=lat, longitude=lon)
+            self.farms[name] = seed_products(farmer, 1)[0]
+        make_user("nowhere", is_farmer=True)
+        self.buyer = make_user("buyer", is_buyer=True, location="Pune ")
+        self.client.force_authenticate(user=self.buyer)
+
+    def search(self, **params):
+        return self.client.get("/api/products/", params)
+
+    def test_geohash_is_maintained_on_save(self):
+        farmer = User.objects.get(username="near")
+        self.assertEqual(farmer.geohash, geo.encode(18.56, 73.88))
+        self.assertTrue(farmer.geohash.startswith("te"))
+        farmer.latitude = None
+        farmer.save(update_fields=["latitude"])
+        self.assertIsNone(User.objects.get(pk=farmer.pk).geohash)
+
+    def test_results_within_radius_sorted_by_distance(self):
+        response = self.search(near="%s,%s" % self.PUNE, radius_km=60)
+        self.assertEqual(response.status_code, 200)
+        results = response.data["results"]
+        self.assertEqual([r["id"] for r in results], [self.farms["near"].pk, self.farms["mid"].pk])
+        self.assertLess(results[0]["distance_km"], 6)
+        self.assertLess(results[0]["distance_km"], results[1]["distance_km"])
+
+        wide = self.search(near="%s,%s" % self.PUNE, radius_km=200).data["results"]
+        self.assertEqual(wide[-1]["id"], self.farms["far"].pk)
+
+    def test_distance_ordering_paginates_with_cursor(self):
+        first = self.search(near="%s,%s" % self.PUNE, radius_km=200, page_size=2)
+        second = self.client.get(first.data["next"])
+        ids = [r["id"] for r in first.data["results"] + second.data["results"]]
+        self.assertEqual(ids, [self.farms[name].pk for name in ("near", "mid", "far")])
+
+    def test_buyer_with_coordinates_defaults_to_nearby(self):
+        self.buyer.latitude, self.buyer.longitude = self.PUNE
+        self.buyer.save()
+        results = self.search().data["results"]
+        self.assertEqual([r["id"] for r in results], [self.farms["near"].pk])
+
+    def test_buyer_without_coordinates_matches_farmers_by_location(self):
+        farmer = make_user("untrimmed", is_farmer=True, location=" pune  ")
+        product = seed_products(farmer, 1)[0]
+        results = self.search().data["results"]
+        self.assertEqual([r["id"] for r in results], [product.pk])
+
+    def test_invalid_parameters_are_rejected(self):
+        self.assertEqual(self.search(near="pune").status_code, 400)
+        self.assertEqual(self.search(near="95,10").status_code, 400)
+        self.assertEqual(self.search(near="18,73", radius_km=0).status_code, 400)
+        self.assertEqual(self.search(near="18,73", radius_km=10000).status_code, 400)
+
+    def test_covering_cells_span_the_radius(self):
+        # a point just across a cell boundary is still inside the covering set
+        cells = geo.covering_cells(*self.PUNE, radius_km=50)
+        self.assertIn(geo.encode(18.9, 74.2, len(cells[0])), cells)
+        self.assertEqual(geo.prefix_upper_bound("tez"), "tf")
+        self.assertIsNone(geo.prefix_upper_bound("zz"))
+
+
+# --------------------------
+# Full-text search tests
+# --------------------------
+class FullTextSearchTests(TestCase):
+    def setUp(self):
+        # the fallback index is process-wide; tests roll back without signals
+        for model in (FarmProduct, FarmingUpdate):
+            get_index(model).reset()
+        self.client = APIClient()
+        self.farmer = make_user("farmer", is_farmer=True)
+        self.client.force_authenticate(user=self.farmer)
+        self.products = {
+            name: FarmProduct.objects.create(
+                farmer=self.farmer, name=name, description=description,
+                quantity=Decimal("10.00"), unit="kg", price_per_unit=Decimal("5.00"),
+            )
+            for name, description in [
+                ("Cherry tomato", "Sweet red tomatoes from the greenhouse"),
+                ("Potato", "Good with tomato sauce"),
+                ("Onion", "Red onions"),
+            ]
+        }
+
+    def ids(self, response):
+        return [row["id"] for row in response.data["results"]]
+
+    def test_name_matches_rank_above_description_matches(self):
+        response = self.client.get("/api/products/", {"q": "tomato"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.ids(response), [self.products["Cherry tomato"].pk, self.products["Potato"].pk])
+
+    def test_plural_and_multi_term_queries(self):
+        self.assertEqual(len(self.ids(self.client.get("/api/products/", {"q": "TOMATOES"}))), 2)
+        response = self.client.get("/api/products/", {"q": "red onion"})
+        self.assertEqual(self.ids(response), [self.products["Onion"].pk])
+        self.assertEqual(list(tokenize("Onions potatoes")), ["onion", "potato"])
+
+    def test_index_follows_edits_and_deletes(self):
+        onion = self.products["Onion"]
+        onion.name = "Shallot"
+        onion.save()
+        self.products["Potato"].delete()
+        self.assertEqual(self.ids(self.client.get("/api/products/", {"q": "tomato"})), [self.products["Cherry tomato"].pk])
+        self.assertEqual(self.ids(self.client.get("/api/products/", {"q": "shallot"})), [onion.pk])
+
+    def test_farming_updates_search(self):
+        drip = FarmingUpdate.objects.create(title="Drip irrigation", content="Save water in summer")
+        FarmingUpdate.objects.create(title="Market news", content="Prices are up")
+        response = self.client.get("/api/updates/", {"q": "irrigation"})
+        self.assertEqual([row["id"] for row in response.data], [drip.pk])
+        self.assertEqual(len(self.client.get("/api/updates/").data), 2)
+
+
+# --------------------------
+# Conditional GET tests
+# --------------------------
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        response_cache.clear()
+        self.client = APIClient()
+        FarmingUpdate.objects.create(title="Drip irrigation", content="Save water")
+        self.report = WeatherReport.objects.create(
+            location="Pune", report_date=timezone.now().date(),
+            temperature=30.0, humidity=40.0, rainfall=0.0, conditions="clear sky",
+        )
+
+    def test_unchanged_list_is_not_modified(self):
+        first = self.client.get("/api/updates/")
+        self.assertEqual(first.status_code, 200)
+        self.assertIn("Last-Modified", first)
+        # answered from the response cache's stored validators
+        with self.assertNumQueries(0):
+            again = self.client.get("/api/updates/", HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(again.content, b"")
+        self.assertEqual(again["ETag"], first["ETag"])
+
+        since = self.client.get("/api/updates/", HTTP_IF_MODIFIED_SINCE=first["Last-Modified"])
+        self.assertEqual(since.status_code, 304)
+
+    def test_new_row_or_delete_changes_the_etag(self):
+        etag = self.client.get("/api/updates/")["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            update = FarmingUpdate.objects.create(title="Market news", content="Prices are up")
+        changed = self.client.get("/api/updates/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(changed.status_code, 200)
+        self.assertEqual(len(changed.data), 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            update.delete()
+        self.assertNotEqual(self.client.get("/api/updates/")["ETag"], changed["ETag"])
+
+    def test_edit_changes_the_etag(self):
+        update = FarmingUpdate.objects.get()
+        urls = ["/api/updates/", f"/api/updates/{update.pk}/"]
+        etags = [self.client.get(url)["ETag"] for url in urls]
+        update.content = "Save water and fertilizer"
+        with self.captureOnCommitCallbacks(execute=True):
+            update.save()
+        for url, etag in zip(urls, etags):
+            changed = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(changed.status_code, 200)
+        self.assertEqual(changed.data["content"], "Save water and fertilizer")
+
+    def test_query_string_is_part_of_the_validator(self):
+        etag = self.client.get("/api/updates/")["ETag"]
+        filtered = self.client.get("/api/updates/", {"q": "market"}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(filtered.status_code, 200)
+
+    def test_weather_detail_follows_in_place_refresh(self):
+        url = f"/api/weather-reports/{self.report.pk}/"
+        etag = self.client.get(url)["ETag"]
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        self.report.temperature = 31.0
+        with self.captureOnCommitCallbacks(execute=True):
+            self.report.save()
+        refreshed = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(refreshed.status_code, 200)
+        self.assertEqual(refreshed.data["temperature"], 31.0)
+        self.assertEqual(self.client.get("/api/weather-reports/999/").status_code, 404)
+
+
+# --------------------------
+# Response cache tests
+# --------------------------
+class ResponseCacheTests(TestCase):
+    def setUp(self):
+        response_cache.clear()
+        self.client = APIClient()
+        self.updates = [
+            FarmingUpdate.objects.create(title=f"Update {i}", content="Body") for i in range(2)
+        ]
+        self.report = WeatherReport.objects.create(
+            location="Pune", report_date=timezone.now().date(),
+            temperature=30.0, humidity=40.0, rainfall=0.0, conditions="clear sky",
+        )
+
+    def test_repeat_requests_are_served_from_cache(self):
+        first = self.client.get("/api/updates/")
+        with self.assertNumQueries(0):
+            second = self.client.get("/api/updates/")
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(second["ETag"], first["ETag"])
+        self.assertEqual(response_cache.stats()["hits"], 1)
+        self.assertEqual(response_cache.stats()["misses"], 1)
+
+    def test_weather_url_aliases_share_one_entry(self):
+        first = self.client.get("/api/weather-reports/", {"b": "2", "a": "1"})
+        with self.assertNumQueries(0):
+            alias = self.client.get("/api/weatherreports/", {"a": "1", "b": "2"})
+        self.assertEqual(alias.content, first.content)
+
+    def test_save_invalidates_list_and_only_that_object(self):
+        first, second = self.updates
+        self.client.get("/api/updates/")
+        self.client.get(f"/api/updates/{first.pk}/")
+        self.client.get(f"/api/updates/{second.pk}/")
+
+        first.title = "Edited"
+        with self.captureOnCommitCallbacks(execute=True):
+            first.save()
+        self.assertEqual(self.client.get("/api/updates/").data[0]["title"], "Edited")
+        self.assertEqual(self.client.get(f"/api/updates/{first.pk}/").data["title"], "Edited")
+        with self.assertNumQueries(0):
+            self.client.get(f"/api/updates/{second.pk}/")
+
+        second_url = f"/api/updates/{second.pk}/"
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+        self.assertEqual(len(self.client.get("/api/updates/").data), 1)
+        self.assertEqual(self.client.get(second_url).status_code, 404)
+
+    def test_bulk_weather_refresh_invalidates(self):
+        url = f"/api/weather-reports/{self.report.pk}/"
+        self.client.get(url)
+        with self.captureOnCommitCallbacks(execute=True):
+            store_reports({"Pune": {"temperature": 25.0, "humidity": 60.0, "rainfall": 1.0, "conditions": "rain"}})
+        self.assertEqual(self.client.get(url).data["temperature"], 25.0)
+
+    def test_invalidation_waits_for_commit(self):
+        update = self.updates[0]
+        self.client.get("/api/updates/")
+        with self.captureOnCommitCallbacks() as callbacks:
+            with transaction.atomic():
+                update.title = "Edited"
+                update.save()
+                # a read before commit still sees the old rows, so it must not be keyed anew
+                self.assertEqual(response_cache.stats()["invalidations"], 0)
+                with self.assertNumQueries(0):
+                    self.client.get("/api/updates/")
+        self.assertEqual(len(callbacks), 1)
+        for callback in callbacks:
+            callback()
+        self.assertEqual(response_cache.stats()["invalidations"], 1)
+        self.assertEqual(self.client.get("/api/updates/").data[0]["title"], "Edited")
+
+    def test_stats_endpoint_is_admin_only(self):
+        self.assertIn(self.client.get("/api/cache-stats/").status_code, (401, 403))
+        self.client.force_authenticate(user=make_user("admin", is_staff=True))
+        self.client.get("/api/updates/")
+        stats = self.client.get("/api/cache-stats/").data
+        self.assertEqual(stats["backend"], "LocMemCache")
+        self.assertEqual(stats["misses"], 1)
+
+
+# --------------------------
+# Projection / renderer tests
+# --------------------------
+class ProjectionTests(TestCase):
+    def setUp(self):
+        self.farmer = make_user(
+            "färmer", is_farmer=True, location="Pune", email="f@example.com",
+            latitude=18.56, longitude=73.88,
+        )
+        self.buyer = make_user("buyer", is_buyer=True)
+        self.products = seed_products(self.farmer, 3)
+        product = self.products[0]
+        product.description = "Line\u2028separator, ünïcode and \"quotes\""
+        product.price_per_unit = Decimal("7.5")
+        product.sku = "SKU-1"
+        product.save()
+        seed_orders(self.buyer, self.products)
+        self.client = APIClient()
+
+    def assertSameBytes(self, serializer_class, queryset, **extras):
+        expected = JSONRenderer().render(serializer_class(queryset, many=True).data)
+        projection = Projection(serializer_class, **extras)
+        actual = ORJSONRenderer().render(projection.render(list(projection.rows(queryset))))
+        self.assertEqual(actual, expected)
+
+    def test_coordinates_only_on_the_own_profile(self):
+        self.client.force_authenticate(user=self.buyer)
+        farmer = self.client.get("/api/products/", {"near": "18.56,73.88"}).data["results"][0]["farmer"]
+        self.assertEqual(farmer["username"], "färmer")
+        self.assertNotIn("latitude", farmer)
+        self.assertNotIn("longitude", farmer)
+
+        self.client.force_authenticate(user=self.farmer)
+        profile = self.client.get(f"/api/users/{self.farmer.pk}/").data
+        self.assertEqual((profile["latitude"], profile["longitude"]), (18.56, 73.88))
+
+    def test_orjson_float_differences(self):
+        data = [1e-05, 1e16, 0.1, 18.56, float("nan"), float("inf")]
+        rendered = ORJSONRenderer().render(data)
+        self.assertEqual(rendered, b"[0.00001,1e16,0.1,18.56,null,null]")
+        # the same values to a parser; DRF itself refuses the non-finite ones
+        self.assertEqual(json.loads(rendered)[:4], data[:4])
+        self.assertEqual(JSONRenderer().render(data[:4]), b"[1e-05,1e+16,0.1,18.56]")
+        with self.assertRaises(ValueError):
+            JSONRenderer().render(data[4:])
+
+    def test_products_match_serializer_output(self):
+        self.assertSameBytes(FarmProductSerializer, FarmProduct.objects.order_by("id"))
+
+    def test_orders_match_serializer_output(self):
+        self.assertSameBytes(OrderSerializer, Order.objects.order_by("id"))
+
+    def test_list_endpoints_are_byte_compatible(self):
+        self.client.force_authenticate(user=self.buyer)
+        response = self.client.get("/api/orders/")
+        orders = Order.objects.filter(buyer=self.buyer).order_by("-created_at", "-id")
+        expected = JSONRenderer().render({
+            "next": None, "previous": None, "results": OrderSerializer(orders, many=True).data,
+        })
+        self.assertEqual(response.content, expected)
+
+    def test_nearby_distance_is_projected(self):
+        self.client.force_authenticate(user=self.buyer)
+        results = self.client.get("/api/products/", {"near": "18.52,73.85", "page_size": 2}).json()["results"]
+        self.assertEqual(len(results), 2)
+        self.assertEqual(list(results[0])[-1], "distance_km")
+        self.assertLess(results[0]["distance_km"], 6)
+
+    def test_renderer_matches_stock_json_renderer(self):
+        data = {
+            "when": timezone.now(), "price": Decimal("1.50"), "ratio": 0.1,
+            "nested": [{"a": None, "b": True}], "text": "naïve \u2029",
+        }
+        self.assertEqual(ORJSONRenderer().render(data), JSONRenderer().render(data))
+        self.assertEqual(
+            ORJSONRenderer().render(data, "application/json; indent=2"),
+            JSONRenderer().render(data, "application/json; indent=2"),
+        )
+
+
+# --------------------------
+# Claims-based JWT authentication tests
+# --------------------------
+class ClaimsAuthenticationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.buyer = make_user("buyer", is_buyer=True, location="Pune")
+
+    def login(self):
+        response = self.client.post("/api/token/", {"username": "buyer", "password": "pass1234"})
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def get_orders(self, access):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {access}")
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get("/api/orders/")
+        return response, len(ctx.captured_queries)
+
+    def test_claims_token_skips_user_lookup(self):
+        response, num_queries = self.get_orders(self.login()["access"])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(num_queries, 1)  # the order list itself
+
+        plain = RefreshToken.for_user(self.buyer).access_token
+        response, num_queries = self.get_orders(plain)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(num_queries, 2)
+
+    def test_claims_user_behaves_like_a_user(self):
+        self.buyer.is_buyer, self.buyer.is_farmer = False, True
+        self.buyer.save()
+        access = str(ClaimsRefreshToken.for_user(self.buyer).access_token)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {access}")
+        response = self.client.post(
+            "/api/products/",
+            {"name": "Rice", "quantity": "5.00", "unit": "kg", "price_per_unit": "3.00"},
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(FarmProduct.objects.get().farmer_id, self.buyer.pk)
+        dashboard = self.client.get("/api/users/dashboard/")
+        self.assertEqual((dashboard.data["username"], dashboard.data["email"]), ("buyer", ""))
+        self.assertTrue(dashboard.data["is_farmer"])
+
+    def test_order_create_saves_the_user_lookup(self):
+        product = seed_products(make_user("farmer", is_farmer=True, location="Pune"), 1)[0]
+
+        def place(access):
+            self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {access}")
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.post("/api/orders/", {"product_id": product.pk, "quantity": "1.00"})
+            self.assertEqual(response.status_code, 201, response.content)
+            self.assertEqual(response.data["buyer"]["username"], "buyer")
+            return len(ctx.captured_queries)
+
+        plain = place(RefreshToken.for_user(self.buyer).access_token)
+        # the nested buyer (email, phone_number, ...) comes from the claims too
+        self.assertEqual(place(ClaimsRefreshToken.for_user(self.buyer).access_token), plain - 1)
+
+    def test_user_changes_revoke_outstanding_claims(self):
+        access = self.login()["access"]
+        self.buyer.is_active = False
+        self.buyer.save()
+        response, _ = self.get_orders(access)
+        self.assertEqual(response.status_code, 401)
+
+    def test_role_change_falls_back_to_the_database(self):
+        access = self.login()["access"]
+        User.objects.filter(pk=self.buyer.pk).update(is_farmer=True)
+        self.buyer.refresh_from_db()
+        self.buyer.save(update_fields=["is_farmer"])
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {access}")
+        self.assertTrue(self.client.get("/api/users/dashboard/").data["is_farmer"])
+
+    def test_refresh_reissues_current_claims(self):
+        tokens = self.login()
+        self.buyer.location = "Nashik"
+        self.buyer.save()
+        refreshed = self.client.post("/api/token/refresh/", {"refresh": tokens["refresh"]})
+        self.assertEqual(refreshed.status_code, 200)
+        self.assertEqual(AccessToken(refreshed.data["access"])["usr"]["location"], "Nashik")
+
+
+# --------------------------
+# Sparse fieldset tests
+# --------------------------
+class SparseFieldsTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.farmer = make_user("farmer", is_farmer=True, location="Pune")
+        self.buyer = make_user("buyer", is_buyer=True, location="Pune")
+        self.products = seed_products(self.farmer, 2)
+        self.orders = seed_orders(self.buyer, self.products)
+        self.client.force_authenticate(user=self.buyer)
+
+    def get(self, url, **params):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response, ctx.captured_queries
+
+    def test_fields_trim_list_and_nested_objects(self):
+        response, _ = self.get("/api/orders/", fields="id,status,product.name,product.unit")
+        self.assertEqual(
+            response.json()["results"][0],
+            {"id": self.orders[1].pk, "status": "pending", "product": {"name": "Product 1", "unit": "kg"}},
+        )
+
+    def test_unexpanded_relations_are_ids_and_not_joined(self):
+        response, queries = self.get("/api/orders/", expand="product")
+        order = response.json()["results"][0]
+        self.assertEqual(order["buyer"], self.buyer.pk)
+        self.assertEqual(order["product"]["farmer"], self.farmer.pk)
+        self.assertNotIn("app_user", queries[-1]["sql"])
+
+        response, queries = self.get(f"/api/orders/{self.orders[0].pk}/", expand="")
+        self.assertEqual(response.data["product"], self.products[0].pk)
+        self.assertNotIn("JOIN", queries[-1]["sql"])
+
+    def test_default_output_is_unchanged(self):
+        full, _ = self.get("/api/orders/")
+        expanded, _ = self.get("/api/orders/", expand="buyer,product.farmer")
+        self.assertEqual(full.content, expanded.content)
+
+    def test_keyset_cursor_survives_trimmed_fields(self):
+        first, _ = self.get("/api/orders/", fields="status", page_size=1)
+        second = self.client.get(first.data["next"])
+        self.assertEqual(second.json()["results"], [{"status": "pending"}])
+        self.assertIsNone(second.data["next"])
+
+    def test_product_detail_and_unknown_names(self):
+        response, _ = self.get(f"/api/products/{self.products[0].pk}/", fields="name,farmer.username")
+        self.assertEqual(response.data, {"name": "Product 0", "farmer": {"username": "farmer"}})
+        self.assertEqual(self.client.get("/api/products/", {"fields": "nope"}).status_code, 400)
+        self.assertEqual(self.client.get("/api/products/", {"expand": "name"}).status_code, 400)
+
+
+# --------------------------
+# Delta sync tests
+# --------------------------
+@override_settings(SYNC_OVERLAP_SECONDS=0)
+class DeltaSyncTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.farmer = make_user("farmer", is_farmer=True, location="Pune")
+        self.buyer = make_user("buyer", is_buyer=True, location="Pune")
+        self.other = make_user("other", is_buyer=True, location="Pune")
+        self.products = seed_products(self.farmer, 3)
+        self.orders = seed_orders(self.buyer, self.products[:2])
+        FarmingUpdate.objects.create(title="Drip irrigation", content="Save water")
+        self.client.force_authenticate(user=self.buyer)
+
+    def sync(self, token=None, **params):
+        if token:
+            params["since"] = token
+        response = self.client.get("/api/sync/", params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def ids(self, rows):
+        return sorted(row["id"] for row in rows)
+
+    def test_first_sync_returns_everything_visible(self):
+        data = self.sync()
+        self.assertEqual(self.ids(data["products"]), [p.pk for p in self.products])
+        self.assertEqual(self.ids(data["orders"]), [o.pk for o in self.orders])
+        self.assertEqual(len(data["updates"]), 1)
+        self.assertFalse(data["has_more"])
+
+    def test_repeat_sync_returns_only_changes_and_tombstones(self):
+        token = self.sync()["sync_token"]
+        empty = self.sync(token)
+        self.assertEqual((empty["products"], empty["orders"], empty["updates"]), ([], [], []))
+        self.assertEqual(empty["deleted"], {"products": [], "orders": [], "updates": []})
+
+        product = self.products[0]
+        product.price_per_unit = Decimal("11.00")
+        product.save()
+        self.client.post("/api/orders/", {"product_id": self.products[2].pk, "quantity": "1.00"})
+        gone = self.orders[1].pk
+        self.orders[1].delete()
+
+        data = self.sync(empty["sync_token"])
+        # the new order also reserved stock on products[2]
+        self.assertEqual(self.ids(data["products"]), [product.pk, self.products[2].pk])
+        self.assertEqual(data["products"][0]["price_per_unit"], "11.00")
+        self.assertEqual(len(data["orders"]), 1)
+        self.assertEqual(data["deleted"]["orders"], [gone])
+
+    def test_order_tombstones_are_private(self):
+        token = self.sync()["sync_token"]
+        self.client.force_authenticate(user=self.other)
+        other_token = self.sync()["sync_token"]
+        gone = self.orders[0].pk
+        self.orders[0].delete()
+        self.assertEqual(self.sync(other_token)["deleted"]["orders"], [])
+        self.client.force_authenticate(user=self.buyer)
+        self.assertEqual(self.sync(token)["deleted"]["orders"], [gone])
+        self.assertEqual(Tombstone.objects.get().farmer_id, self.farmer.pk)
+
+    def test_products_match_the_list_endpoint(self):
+        elsewhere = make_user("elsewhere", is_farmer=True, location="Nashik")
+        seed_products(elsewhere, 1)
+        hidden = FarmProduct.objects.create(
+            farmer=self.farmer, name="Withdrawn", quantity=Decimal("5"), unit="kg",
+            price_per_unit=Decimal("10.00"), available=False,
+        )
+        first = self.sync()
+        listed = self.client.get("/api/products/").data["results"]
+        self.assertEqual(self.ids(first["products"]), self.ids(listed))
+        self.assertNotIn(hidden.pk, self.ids(first["products"]))
+
+        # going unavailable is sent as a row the client drops, not left stale
+        FarmProduct.objects.filter(pk=self.products[0].pk).update(available=False, updated_at=timezone.now())
+        changed = {row["id"]: row["available"] for row in self.sync(first["sync_token"])["products"]}
+        self.assertFalse(changed[self.products[0].pk])
+        self.assertFalse(any(changed.values()))  # only drops, never other cities' listings
+
+    def test_cascade_tombstones_reuse_the_deleted_product(self):
+        product = self.products[0]
+        seed_orders(self.other, [product, product])
+        with CaptureQueriesContext(connection) as queries:
+            product.delete()
+        lookups = [q["sql"] for q in queries.captured_queries if 'SELECT "app_farmproduct"."farmer_id"' in q["sql"]]
+        self.assertEqual(lookups, [])
+        self.assertEqual(
+            set(Tombstone.objects.filter(resource="orders").values_list("farmer_id", flat=True)), {self.farmer.pk}
+        )
+
+    @override_settings(SYNC_MAX_ROWS=2)
+    def test_large_backlogs_are_paged(self):
+        first = self.sync()
+        self.assertTrue(first["has_more"])
+        self.assertEqual(len(first["products"]), 2)
+        second = self.sync(first["sync_token"])
+        self.assertEqual(len(second["products"]), 1)
+        self.assertFalse(second["has_more"])
+
+    def test_bad_and_expired_tokens(self):
+        self.assertEqual(self.client.get("/api/sync/", {"since": "garbage"}).status_code, 400)
+        token = self.sync()["sync_token"]
+        with override_settings(SYNC_TOMBSTONE_RETENTION_DAYS=0):
+            self.assertEqual(self.client.get("/api/sync/", {"since": token}).status_code, 410)
+
+        payload = json.loads(urlsafe_b64decode(token))
+        payload["c"]["products"][0] = "2025-01-01T00:00:00"  # no offset
+        naive = urlsafe_b64encode(json.dumps(payload).encode()).decode()
+        self.assertEqual(self.client.get("/api/sync/", {"since": naive}).status_code, 400)
+
+    @override_settings(SYNC_MAX_ROWS=2)
+    def test_unpruned_expired_tombstones_dont_expire_a_fresh_sync(self):
+        for product in self.products:
+            product.delete()
+        Tombstone.objects.update(deleted_at=timezone.now() - timedelta(days=settings.SYNC_TOMBSTONE_RETENTION_DAYS + 1))
+        data = self.sync()
+        self.assertEqual(data["deleted"]["products"], [])
+        while data["has_more"]:
+            data = self.sync(data["sync_token"])
+
+
+# --------------------------
+# Order analytics tests
+# --------------------------
+class OrderAnalyticsTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.farmer = make_user("farmer", is_farmer=True, location="Pune")
+        self.buyer = make_user("buyer", is_buyer=True, location="Pune")
+        self.products = seed_products(self.farmer, 3)
+
+    def place(self, product, quantity="2"):
+        self.client.force_authenticate(user=self.buyer)
+        response = self.client.post("/api/orders/", {"product_id": product.pk, "quantity": quantity}, format="json")
+        self.assertEqual(response.status_code, 201, response.content)
+        return response.data["id"]
+
+    def set_status(self, order_id, new_status):
+        self.client.force_authenticate(user=self.farmer)
+        return self.client.patch(f"/api/orders/{order_id}/", {"status": new_status}, format="json")
+
+    def report(self, user, **params):
+        self.client.force_authenticate(user=user)
+        response = self.client.get("/api/users/analytics/", params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def snapshot(self):
+        # rows emptied by deletions stay behind as zeros; a rebuild doesn't write them
+        rows = OrderRollup.objects.values_list("scope", "scope_id", "day", *analytics.COLUMNS)
+        return sorted(row for row in rows if any(row[3:]))
+
+    def test_orders_and_status_changes_update_rollups(self):
+        first = self.place(self.products[0])
+        self.place(self.products[1], "1")
+        self.client.force_authenticate(user=self.buyer)
+        self.client.post("/api/orders/checkout/", {"items": [
+            {"product_id": self.products[0].pk, "quantity": "3"},
+            {"product_id": self.products[2].pk, "quantity": "1"},
+        ]}, format="json")
+
+        response = self.set_status(first, "cancelled")
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.data["status"], "cancelled")
+
+        totals = self.report(self.farmer)["totals"]
+        self.assertEqual(totals["orders"], 4)
+        self.assertEqual(totals["by_status"], {"pending": 3, "confirmed": 0, "completed": 0, "cancelled": 1})
+        self.assertEqual(totals["quantity"], "5.00")
+        self.assertEqual(totals["revenue"], "50.00")
+        self.assertEqual(self.report(self.buyer)["totals"]["orders"], 4)
+
+        products = {row["product_id"]: row for row in self.report(self.farmer)["products"]}
+        self.assertEqual(products[self.products[0].pk]["by_status"]["cancelled"], 1)
+        self.assertEqual(products[self.products[0].pk]["revenue"], "30.00")
+
+    def test_rollups_match_a_rebuild(self):
+        first = self.place(self.products[0])
+        self.place(self.products[1])
+        self.set_status(first, "confirmed")
+        self.set_status(first, "completed")
+        Order.objects.get(pk=first).delete()
+        self.place(self.products[2], "4")
+
+        live = self.snapshot()
+        out = StringIO()
+        call_command("rebuild_analytics", stdout=out)
+        self.assertIn("rebuilt", out.getvalue())
+        self.assertEqual(self.snapshot(), live)
+
+    def test_dashboard_reads_rollups(self):
+        self.place(self.products[0])
+        self.place(self.products[1])
+        self.client.force_authenticate(user=self.buyer)
+        with self.assertNumQueries(2):
+            response = self.client.get("/api/users/dashboard/")
+        self.assertEqual(response.data["orders_count"], 2)
+        self.assertEqual(response.data["order_stats"]["revenue"], "40.00")
+
+    def test_only_the_products_farmer_can_change_status(self):
+        order = self.place(self.products[0])
+        other = make_user("other-farmer", is_farmer=True)
+        self.client.force_authenticate(user=other)
+        self.assertEqual(self.client.patch(f"/api/orders/{order}/", {"status": "cancelled"}, format="json").status_code, 404)
+        self.assertEqual(self.set_status(order, "shipped").status_code, 400)
+
+    def test_status_transitions(self):
+        order = self.place(self.products[0])
+        self.assertEqual(self.set_status(order, "completed").status_code, 400)  # not confirmed yet
+        self.assertEqual(self.set_status(order, "confirmed").status_code, 200)
+        self.assertEqual(self.set_status(order, "pending").status_code, 400)
+        self.assertEqual(self.set_status(order, "cancelled").status_code, 200)
+        # cancelled is final: no flipping back into a trade
+        for rejected in ["confirmed", "completed", "pending"]:
+            response = self.set_status(order, rejected)
+            self.assertEqual(response.status_code, 400, rejected)
+            self.assertIn("status", response.data)
+        self.assertEqual(Order.objects.get(pk=order).status, "cancelled")
+        self.assertEqual(self.report(self.farmer)["totals"]["by_status"]["cancelled"], 1)
+
+    def test_cancelling_returns_stock(self):
+        product = self.products[0]
+        order = self.place(product, "2.5")
+        self.assertEqual(FarmProduct.objects.get(pk=product.pk).quantity, Decimal("97.50"))
+        self.assertEqual(self.set_status(order, "cancelled").status_code, 200)
+        self.assertEqual(FarmProduct.objects.get(pk=product.pk).quantity, Decimal("100.00"))
+        # repeating the cancel is a no-op, not a second release
+        self.assertEqual(self.set_status(order, "cancelled").status_code, 200)
+        self.assertEqual(FarmProduct.objects.get(pk=product.pk).quantity, Decimal("100.00"))
+
+    def test_stale_instance_changes_from_the_committed_state(self):
+        order_id = self.place(self.products[0])
+        stale = Order.objects.get(pk=order_id)
+        set_order_status(Order.objects.get(pk=order_id), "confirmed")
+        self.assertEqual(PriceIndex.objects.get().trades, 1)
+
+        set_order_status(stale, "cancelled")
+        saved = Order.objects.get(pk=order_id)
+        self.assertEqual(saved.status, "cancelled")
+        self.assertIsNotNone(saved.confirmed_at)
+        self.assertEqual(self.report(self.farmer)["totals"]["by_status"], {
+            "pending": 0, "confirmed": 0, "completed": 0, "cancelled": 1,
+        })
+        # the trade came back off the index
+        self.assertEqual(PriceIndex.objects.get().trades, 0)
+        live = self.snapshot()
+        analytics.rebuild()
+        self.assertEqual(self.snapshot(), live)
+
+    def test_date_range_validation(self):
+        self.client.force_authenticate(user=self.farmer)
+        for params in [{"from": "yesterday"}, {"from": "2025-02-01", "to": "2025-01-01"}, {"from": "2020-01-01", "to": "2025-01-01"}]:
+            self.assertEqual(self.client.get("/api/users/analytics/", params).status_code, 400)
+        self.place(self.products[0])
+        past = self.report(self.farmer, **{"from": "2020-01-01", "to": "2020-01-31"})
+        self.assertEqual(past["totals"]["orders"], 0)
+        self.assertEqual(past["daily"], [])
+
+
+# --------------------------
+# Weather time-series tests
+# --------------------------
+class WeatherTimeSeriesTests(TestCase):
+    def setUp(self):
+        response_cache.clear()
+        self.client = APIClient()
+        self.today = timezone.localdate()
+
+    def reading(self, temperature, conditions="clear sky"):
+        return {"temperature": temperature, "humidity": 50.0, "rainfall": 0.0, "conditions": conditions}
+
+    def report(self, location, days_ago, temperature=20.0):
+        return WeatherReport.objects.create(
+            location=location, report_date=self.today - timedelta(days=days_ago),
+            temperature=temperature, humidity=50.0, rainfall=0.0, conditions="clear sky",
+        )
+
+    def test_readings_upsert_todays_report(self):
+        store_reports({"Pune": self.reading(20.0)})
+        store_reports({"Pune": self.reading(26.0)})
+        store_reports({"Pune": self.reading(23.0)})
+        report = WeatherReport.objects.get()
+        self.assertEqual((report.temperature, report.temperature_min, report.temperature_max), (23.0, 20.0, 26.0))
+        self.assertEqual(report.samples, 3)
+        self.assertEqual(WeatherReading.objects.count(), 3)
+
+    def test_range_query(self):
+        for days_ago in range(40):
+            self.report("Pune", days_ago)
+        self.report("Nashik", 0)
+
+        default = self.client.get("/api/weather-reports/", {"location": " pune "})
+        self.assertEqual(default.status_code, 200)
+        self.assertEqual(len(default.data), 30)
+        self.assertEqual(default.data[-1]["report_date"], self.today.isoformat())
+
+        ranged = self.client.get("/api/weather-reports/", {
+            "from": (self.today - timedelta(days=35)).isoformat(),
+            "to": (self.today - timedelta(days=31)).isoformat(),
+        })
+        self.assertEqual([row["location"] for row in ranged.data], ["Pune"] * 5)
+        self.assertEqual(self.client.get("/api/weather-reports/", {"from": "soon"}).status_code, 400)
+        self.assertEqual(self.client.get("/api/weather-reports/", {"from": "2000-01-01"}).status_code, 400)
+
+    def test_downsample_folds_old_readings_into_daily_reports(self):
+        old = timezone.now() - timedelta(days=10)
+        WeatherReading.objects.bulk_create([
+            WeatherReading(location="Pune", observed_at=old, **self.reading(t, text))
+            for t, text in [(18.0, "mist"), (24.0, "clear sky"), (30.0, "clear sky")]
+        ])
+        self.report("Pune", 10, temperature=30.0)  # the live row from that day
+        store_reports({"Pune": self.reading(25.0)})  # today's reading stays raw
+
+        out = StringIO()
+        call_command("downsample_weather", days=7, stdout=out)
+        self.assertIn("folded 3 readings", out.getvalue())
+        day = WeatherReport.objects.get(report_date=timezone.localdate(old))
+        self.assertEqual((day.temperature, day.temperature_min, day.temperature_max), (24.0, 18.0, 30.0))
+        self.assertEqual((day.conditions, day.samples), ("clear sky", 3))
+        self.assertEqual(WeatherReading.objects.count(), 1)
+        self.assertEqual(WeatherReport.objects.count(), 2)
+
+
+# --------------------------
+# Weather statistics tests
+# --------------------------
+class WeatherStatisticsTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        start = timezone.localdate() - timedelta(days=9)
+        self.days = [start + timedelta(days=i) for i in range(10)]
+        reports = [
+            WeatherReport(
+                location="Pune", report_date=day, temperature=20.0 + i,
+                temperature_min=15.0 + i, temperature_max=25.0 + i, humidity=50.0, rainfall=float(i % 2),
+                conditions="clear sky",
+            )
+            for i, day in enumerate(self.days)
+            if i != 4  # one missing day
+        ]
+        # last year's readings for the same days give the baseline
+        reports += [
+            WeatherReport(
+                location="Pune", report_date=day.replace(year=day.year - 1), temperature=18.0,
+                humidity=50.0, rainfall=0.0, conditions="clear sky",
+            )
+            for day in self.days
+        ]
+        WeatherReport.objects.bulk_create(reports)
+
+    def stats(self, **params):
+        response = self.client.get("/api/weather-reports/statistics/", {"location": "pune", **params})
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def test_rolling_gdd_and_anomalies(self):
+        with self.assertNumQueries(1):
+            data = self.stats(**{"from": self.days[0].isoformat(), "to": self.days[-1].isoformat(), "window": 3})
+        self.assertEqual(data["locations"], ["Pune"])
+        self.assertEqual(data["dates"], [day.isoformat() for day in self.days])
+        self.assertEqual(data["rainfall"][0][:6], [0.0, 1.0, 0.0, 1.0, None, 1.0])
+        # 3-day sums/means skip the missing day
+        self.assertEqual(data["rainfall_sum"][0][3:7], [2.0, 1.0, 2.0, 1.0])
+        self.assertEqual(data["temperature_mean"][0][5], 24.0)
+        # (max(15+i, 10) + min(25+i, 30)) / 2 - 10
+        self.assertEqual(data["gdd"][0][:4], [10.0, 11.0, 12.0, 13.0])
+        self.assertEqual(data["gdd"][0][9], 17.0)  # max capped at 30
+        self.assertEqual(data["gdd_cumulative"][0][:5], [10.0, 21.0, 33.0, 46.0, None])
+        # every observed day has a baseline; a missing day has no anomaly
+        self.assertIsNotNone(data["temperature_anomaly"][0][0])
+        self.assertIsNone(data["temperature_anomaly"][0][4])
+
+    def test_unknown_location_and_bad_parameters(self):
+        self.assertEqual(self.stats(location="Atlantis")["locations"], [])
+        for params in [{"window": "0"}, {"base": "hot"}, {"base": "30", "cap": "20"}, {"from": "2000-01-01"}]:
+            response = self.client.get("/api/weather-reports/statistics/", params)
+            self.assertEqual(response.status_code, 400, params)
+
+        for name, value in [("window", "1.5"), ("base", "hot"), ("cap", "inf")]:
+            response = self.client.get("/api/weather-reports/statistics/", {name: value})
+            self.assertEqual(response.status_code, 400)
+            self.assertTrue(response.json()["error"].startswith(f"{name} must be"))
+            self.assertNotIn(value, response.json()["error"])
+
+
+# --------------------------
+# Market price index tests
+# --------------------------
+class PriceIndexTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.farmer = make_user("farmer", is_farmer=True, location=" pune ")
+        self.other_farmer = make_user("farmer2", is_farmer=True, location="Nashik")
+        self.buyer = make_user("buyer", is_buyer=True)
+        self.tomato = FarmProduct.objects.create(
+            farmer=self.farmer, name="Tomatoes", quantity=Decimal("100"), unit="kg", price_per_unit=Decimal("20.00")
+        )
+        self.cheap_tomato = FarmProduct.objects.create(
+            farmer=self.farmer, name="tomato", quantity=Decimal("100"), unit=" KG", price_per_unit=Decimal("15.00")
+        )
+        self.nashik_tomato = FarmProduct.objects.create(
+            farmer=self.other_farmer, name="Tomato", quantity=Decimal("100"), unit="kg", price_per_unit=Decimal("30.00")
+        )
+
+    def order(self, product, quantity):
+        self.client.force_authenticate(user=self.buyer)
+        response = self.client.post("/api/orders/", {"product_id": product.pk, "quantity": quantity}, format="json")
+        return response.data["id"]
+
+    def set_status(self, order_id, new_status, farmer=None):
+        self.client.force_authenticate(user=farmer or self.farmer)
+        response = self.client.patch(f"/api/orders/{order_id}/", {"status": new_status}, format="json")
+        self.assertEqual(response.status_code, 200, response.content)
+
+    def trend(self, **params):
+        self.client.force_authenticate(user=self.buyer)
+        response = self.client.get("/api/prices/", params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def snapshot(self):
+        return sorted(PriceIndex.objects.values_list(
+            "product_key", "location", "unit", "day", "trades", "quantity", "value", "min_price", "max_price"
+        ))
+
+    def test_names_normalize(self):
+        self.assertEqual(prices.normalize_product_name("  Fresh   TOMATOES "), "fresh tomato")
+        self.assertEqual(prices.normalize_product_name("Berries"), "berry")
+        self.assertEqual(prices.normalize_product_name("Grass"), "grass")
+
+    def test_confirmation_updates_the_index(self):
+        first = self.order(self.tomato, "10")
+        second = self.order(self.cheap_tomato, "30")
+        pending = self.order(self.tomato, "5")
+        self.set_status(first, "confirmed")
+        self.set_status(second, "confirmed")
+        self.set_status(second, "completed")  # already traded
+        self.set_status(self.order(self.nashik_tomato, "1"), "confirmed", farmer=self.other_farmer)
+
+        data = self.trend(product="tomatoes", location="PUNE")
+        self.assertEqual(data["product"], "tomato")
+        [row] = data["series"]
+        self.assertEqual(row["location"], "Pune")
+        self.assertEqual((row["trades"], row["quantity"]), (2, "40.00"))
+        # (10 * 20 + 30 * 15) / 40
+        self.assertEqual(row["vwap"], "16.25")
+        self.assertEqual((row["min_price"], row["max_price"]), ("15.00", "20.00"))
+        self.assertEqual(len(self.trend(product="tomato")["series"]), 2)
+
+        self.set_status(first, "cancelled")
+        [row] = self.trend(product="tomato", location="Pune")["series"]
+        self.assertEqual((row["trades"], row["vwap"]), (1, "15.00"))
+        self.assertFalse(Order.objects.get(pk=pending).confirmed_at)
+
+    def test_rebuild_matches_incremental_index(self):
+        for product, quantity in [(self.tomato, "3"), (self.cheap_tomato, "7")]:
+            self.set_status(self.order(product, quantity), "confirmed")
+        live = self.snapshot()
+        self.assertEqual([row[2] for row in live], ["kg"])  # "kg" and " KG" are one market
+        call_command("rebuild_prices", stdout=StringIO())
+        self.assertEqual(self.snapshot(), live)
+
+    def test_product_is_required(self):
+        self.client.force_authenticate(user=self.buyer)
+        self.assertEqual(self.client.get("/api/prices/").status_code, 400)
+        self.assertEqual(self.client.get("/api/prices/", {"product": "tomato", "from": "x"}).status_code, 400)
+
+
+# --------------------------
+# Unit-normalized price tests
+# --------------------------
+class CanonicalPriceTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.farmer = make_user("farmer", is_farmer=True)
+        self.client.force_authenticate(user=self.farmer)
+        listings = [
+            ("Onion", "50", "kg", "30.00"),        # 30.00 / kg
+            ("Onion sack", "2", "Quintal ", "2500.00"),  # 25.00 / kg
+            ("Onion bulk", "1", "tons", "20000.00"),   # 20.00 / kg
+            ("Onion sample", "500", "g", "0.05"),     # 50.00 / kg
+            ("Eggs", "10", "dozen", "60.00"),         # not a weight
+        ]
+        self.products = {
+            name: FarmProduct.objects.create(
+                farmer=self.farmer, name=name, quantity=Decimal(quantity), unit=unit, price_per_unit=Decimal(price)
+            )
+            for name, quantity, unit, price in listings
+        }
+
+    def names(self, response):
+        self.assertEqual(response.status_code, 200, response.content)
+        return [row["name"] for row in response.data["results"]]
+
+    def test_registry_and_generated_columns(self):
+        self.assertEqual(units.kg_per_unit(" Quintals"), Decimal("100"))
+        self.assertIsNone(units.kg_per_unit("bunch"))
+        sack = FarmProduct.objects.get(name="Onion sack")
+        self.assertEqual((sack.price_per_kg, sack.quantity_kg), (Decimal("25"), Decimal("200")))
+        self.assertIsNone(FarmProduct.objects.get(name="Eggs").price_per_kg)
+
+        # stock updates through F() keep quantity_kg in step
+        buyer = make_user("buyer", is_buyer=True)
+        self.client.force_authenticate(user=buyer)
+        self.client.post("/api/orders/", {"product_id": sack.pk, "quantity": "0.5"}, format="json")
+        self.assertEqual(FarmProduct.objects.get(pk=sack.pk).quantity_kg, Decimal("150"))
+
+    def test_write_responses_carry_the_generated_columns(self):
+        response = self.client.post("/api/products/", {
+            "name": "Wheat", "quantity": "2", "unit": "quintal", "price_per_unit": "2300.00",
+        }, format="json")
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual((response.data["price_per_kg"], response.data["quantity_kg"]), ("23.0000", "200.000"))
+
+        response = self.client.patch(f"/api/products/{response.data['id']}/", {"unit": "kg"}, format="json")
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual((response.data["price_per_kg"], response.data["quantity_kg"]), ("2300.0000", "2.000"))
+
+    def test_price_range_and_ordering(self):
+        response = self.client.get("/api/products/", {"ordering": "price"})
+        self.assertEqual(self.names(response), ["Onion bulk", "Onion sack", "Onion", "Onion sample"])
+        self.assertEqual(response.data["results"][0]["price_per_kg"], "20.0000")
+
+        response = self.client.get("/api/products/", {"min_price": "22", "max_price": "30", "ordering": "-price"})
+        self.assertEqual(self.names(response), ["Onion", "Onion sack"])
+
+    def test_price_ordering_pages_by_keyset(self):
+        first = self.client.get("/api/products/", {"ordering": "price", "page_size": 2})
+        self.assertEqual(self.names(first), ["Onion bulk", "Onion sack"])
+        second = self.client.get(first.data["next"])
+        self.assertEqual(self.names(second), ["Onion", "Onion sample"])
+        self.assertIsNone(second.data["next"])
+
+    def test_bad_parameters(self):
+        for params in [{"min_price": "cheap"}, {"max_price": "-1"}, {"ordering": "name"}]:
+            self.assertEqual(self.client.get("/api/products/", params).status_code, 400, params)
+
+
+# --------------------------
+# Request metrics tests
+# --------------------------
+class MetricsTests(TestCase):
+    def setUp(self):
+        metrics.registry.clear()
+        self.client = APIClient()
+        self.farmer = make_user("farmer", is_farmer=True)
+        FarmProduct.objects.create(
+            farmer=self.farmer, name="Maize", quantity=Decimal("10"), unit="kg", price_per_unit=Decimal("5.00")
+        )
+        self.client.force_authenticate(user=self.farmer)
+        self.ops = make_user("ops", is_staff=True)
+
+    def scrape(self, as_staff=True, **headers):
+        scraper = Client()
+        if as_staff:
+            scraper.force_login(self.ops)
+        response = scraper.get("/metrics", **headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], metrics.CONTENT_TYPE)
+        return response.content.decode()
+
+    def test_records_per_route(self):
+        self.client.get("/api/products/")
+        self.client.get("/api/products/")
+        product = self.client.get(f"/api/products/{FarmProduct.objects.get().pk}/")
+        self.client.get("/no-such-page/")
+
+        text = self.scrape()
+        labels = '{route="product-list",method="GET"}'
+        self.assertIn(f"app_http_request_duration_seconds_count{labels} 2", text)
+        self.assertIn('app_http_request_duration_seconds_bucket{route="product-list",method="GET",le="+Inf"} 2', text)
+        self.assertIn('app_http_requests_total{route="product-list",method="GET",status="200"} 2', text)
+        self.assertIn('app_http_requests_total{route="unresolved",method="GET",status="404"} 1', text)
+        self.assertIn(f'app_http_response_size_bytes_total{{route="product-detail",method="GET"}} {len(product.content)}', text)
+        self.assertIn("app_metrics_sample_rate 1.0", text)
+        # the list runs SQL, so it lands above the zero-query bucket and has time recorded
+        self.assertIn('app_db_queries_per_request_bucket{route="product-list",method="GET",le="0"} 0', text)
+        sql_seconds = next(line for line in text.splitlines() if line.startswith(f"app_db_query_duration_seconds_total{labels}"))
+        self.assertGreater(float(sql_seconds.split()[-1]), 0)
+        # scrapes aren't measured themselves
+        self.assertNotIn('route="metrics"', self.scrape())
+
+    def test_histogram_buckets_are_cumulative(self):
+        histogram = metrics.Histogram([1, 5])
+        for value in [0.5, 3, 3, 9]:
+            histogram.observe(value)
+        samples = [(name, labels.get("le"), value) for name, labels, value in histogram.samples("x", {})]
+        self.assertEqual(samples, [
+            ("x_bucket", "1", 1), ("x_bucket", "5", 3), ("x_bucket", "+Inf", 4), ("x_sum", None, 15.5), ("x_count", None, 4),
+        ])
+
+    @override_settings(METRICS_SAMPLE_RATE=0)
+    def test_sampling_off_records_nothing(self):
+        self.client.get("/api/products/")
+        self.assertNotIn("product-list", self.scrape())
+
+    @override_settings(METRICS_TOKEN="s3cret")
+    def test_token(self):
+        self.assertEqual(self.client.get("/metrics").status_code, 403)
+        self.assertEqual(self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer wrong").status_code, 403)
+        self.scrape(as_staff=False, HTTP_AUTHORIZATION="Bearer s3cret")
+
+    def test_no_token_means_staff_only(self):
+        self.assertEqual(self.client.get("/metrics").status_code, 403)
+        self.scrape()
+        # DEBUG comes from the environment as a string, so it can't open the endpoint
+        for debug in [True, "False"]:
+            with override_settings(DEBUG=debug):
+                self.assertEqual(Client().get("/metrics").status_code, 403)
+
+    def test_async_requests_are_measured(self):
+        async def view(request):
+            await sync_to_async(FarmProduct.objects.count)()
+            return HttpResponse("ok")
+
+        middleware = metrics.MetricsMiddleware(view)
+        self.assertTrue(iscoroutinefunction(middleware))
+        # async_to_sync runs the view's sync_to_async work back on this thread's connection
+        response = async_to_sync(middleware)(RequestFactory().get("/anywhere/"))
+        self.assertEqual(response.status_code, 200)
+        text = self.scrape()
+        self.assertIn('app_http_requests_total{route="unresolved",method="GET",status="200"} 1', text)
+        self.assertIn('app_db_queries_per_request_bucket{route="unresolved",method="GET",le="1"} 1', text)
+
+
+# --------------------------
+# Slow-query sampler tests
+# --------------------------
+# every statement counts as slow
+@override_settings(SLOW_QUERY_THRESHOLD_MS=1e-9, SLOW_QUERY_LOG_SIZE=2)
+class SlowQueryTests(TestCase):
+    def setUp(self):
+        slow_queries.clear()
+        self.client = APIClient()
+        self.farmer = make_user("farmer", is_farmer=True)
+        buyer = make_user("buyer", is_buyer=True)
+        product = FarmProduct.objects.create(
+            farmer=self.farmer, name="Maize", quantity=Decimal("10"), unit="kg", price_per_unit=Decimal("5.00")
+        )
+        Order.objects.create(buyer=buyer, product=product, quantity=Decimal("1"), total_price=Decimal("5.00"))
+        self.client.force_authenticate(user=self.farmer)
+
+    def test_normalize_sql(self):
+        sql = "SELECT * FROM t WHERE a = 'it''s'  AND b IN (1, 2, 3) AND c = %s\n AND d = 2.5"
+        self.assertEqual(slow_queries.normalize_sql(sql), "SELECT * FROM t WHERE a = ? AND b IN (...) AND c = ? AND d = ?")
+        self.assertEqual(
+            slow_queries.normalize_sql("INSERT INTO t (a, b) VALUES (%s, %s), (%s, %s)"),
+            "INSERT INTO t (a, b) VALUES (...)",
+        )
+
+    def test_plan_literals_are_scrubbed(self):
+        plan = (
+            "Index Scan using app_user_pkey on app_user  (cost=0.29..8.30 rows=1 width=4)\n"
+            "  Index Cond: (id = 42)\n"
+            "  Filter: ((phone_number)::text = '+91 98765 43210'::text)"
+        )
+        self.assertEqual(slow_queries.scrub_plan(plan), (
+            "Index Scan using app_user_pkey on app_user  (cost=0.29..8.30 rows=1 width=4)\n"
+            "  Index Cond: (id = ?)\n"
+            "  Filter: ((phone_number)::text = ?::text)"
+        ))
+
+    def test_async_requests_are_sampled(self):
+        async def view(request):
+            await sync_to_async(Order.objects.count)()
+            return HttpResponse("ok")
+
+        middleware = slow_queries.SlowQueryMiddleware(view)
+        self.assertTrue(iscoroutinefunction(middleware))
+        async_to_sync(middleware)(RequestFactory().get("/anywhere/"))
+        entry = slow_queries.entries()[-1]
+        self.assertIn('"app_order"', entry["sql"])
+        self.assertTrue(entry["view"].startswith("GET /anywhere/"))
+
+    def test_logs_view_call_site_and_plan(self):
+        for _ in range(3):
+            self.assertEqual(self.client.get("/api/orders/").status_code, 200)
+        logged = slow_queries.entries()
+        # bounded: only the newest SLOW_QUERY_LOG_SIZE survive, oldest first
+        self.assertEqual([entry["seq"] for entry in logged], [2, 3])
+
+        entry = logged[-1]
+        self.assertIn('"app_order"', entry["sql"])
+        self.assertEqual(entry["view"], "GET /api/orders/ -> app.views.OrderViewSet (order-list)")
+        self.assertRegex(entry["call_site"], r"^app/(?!metrics|slow_queries)\w+\.py:\d+ in \w+$")
+        self.assertNotIn("%s", entry["sql"])
+        self.assertTrue(entry["plan"])  # SQLite's EXPLAIN QUERY PLAN here
+
+    def test_dump(self):
+        self.client.get("/api/orders/")
+        out = StringIO()
+        call_command("slow_queries", "--json", "--clear", stdout=out)
+        lines = out.getvalue().splitlines()
+        self.assertEqual(len(lines), 1)
+        self.assertIn("call_site", json.loads(lines[0]))
+        self.assertEqual(slow_queries.entries(), [])
+
+        self.assertEqual(self.client.get("/admin/slow-queries/").status_code, 302)  # staff only
+        self.client.force_login(make_user("admin", is_staff=True))
+        response = self.client.get("/admin/slow-queries/")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("newest first", response.content.decode())
+
+    @override_settings(SLOW_QUERY_THRESHOLD_MS=0)
+    def test_off(self):
+        self.client.get("/api/orders/")
+        self.assertEqual(slow_queries.entries(), [])
+
+
+# --------------------------
+# Synthetic data and benchmark command tests
+# --------------------------
+class BenchmarkCommandTests(TestCase):
+    def test_generate_then_benchmark(self):
+        call_command(
+            "generate_data", users=20, products=60, orders=300, updates=5, weather_years=1, batch_size=50,
+            stdout=StringIO(),
+        )
+        self.assertEqual(User.objects.filter(username__startswith="synthetic-").count(), 20)
+        self.assertEqual((FarmProduct.objects.count(), Order.objects.count()), (60, 300))
+        self.assertEqual(WeatherReport.objects.count(), 365 * 15)
+        # backdated history, and the rollups rebuilt over it
+        self.assertGreater(Order.objects.dates("created_at", "day").count(), 100)
+        self.assertEqual(
+            sum(row.pending + row.confirmed + row.completed + row.cancelled for row in OrderRollup.objects.filter(scope="buyer")),
+            300,
+        )
+        with self.assertRaises(CommandError):
+            call_command("generate_data", users=2, products=1, orders=1, stdout=StringIO())  # prefix taken
+
+        with tempfile.TemporaryDirectory() as tmp:
+            first, second = os.path.join(tmp, "first.json"), os.path.join(tmp, "second.json")
+            options = {"requests": 6, "warmup": 1, "concurrency": 1, "stdout": StringIO()}
+            call_command("benchmark", output=first, **options)
+            out = StringIO()
+            call_command("benchmark", output=second, baseline=first, **{**options, "stdout": out})
+            with open(second) as f:
+                report = json.load(f)
+
+        self.assertEqual(set(report["scenarios"]), {"products", "order-create", "dashboard", "updates", "weather"})
+        for name, result in report["scenarios"].items():
+            self.assertEqual((result["requests"], result["errors"]), (6, 0), (name, result["statuses"]))
+            self.assertLessEqual(result["p50_ms"], result["p99_ms"])
+        self.assertEqual(Order.objects.count(), 300 + 2 * 7)  # order-create really placed orders
+        self.assertIn("against", out.getvalue())
+
+    def test_percentile(self):
+        from .management.commands.benchmark import percentile
+
+        values = list(range(1, 101))
+        self.assertEqual([percentile(values, q) for q in (50, 95, 99, 100)], [50, 95, 99, 100])
+        self.assertIsNone(percentile([], 50))
@@ -0,0 +1,56 @@
+"""
+Unit-conversion registry for product listings.
+
+FarmProduct.unit is whatever the farmer typed ("kg", "Quintal", "tons").
+UNITS_IN_KG maps each known spelling (lower-cased, trimmed) to kilograms
+per unit; FarmProduct derives price_per_kg and quantity_kg from it as
+stored generated columns, so every write path — save(), bulk imports,
+the F() stock updates — keeps them current without application code.
+Units with no weight ("dozen", "bunch") leave both NULL.
+
+Adding a spelling changes the column expression: run makemigrations.
+"""
+from decimal import Decimal
+
+from django.db.models import Case, DecimalField, F, Value, When
+from django.db.models.functions import Lower, Trim
+from django.db.models.lookups import In
+
+UNITS_IN_KG = {
+    "g": "0.001", "gm": "0.001", "gram": "0.001", "grams": "0.001",
+    "kg": "1", "kgs": "1", "kilo": "1", "kilos": "1", "kilogram": "1", "kilograms": "1",
+    "lb": "0.45359237", "lbs": "0.45359237", "pound": "0.45359237", "pounds": "0.45359237",
+    "quintal": "100", "quintals": "100", "qtl": "100",
+    "t": "1000", "mt": "1000", "ton": "1000", "tons": "1000", "tonne": "1000", "tonnes": "1000",
+}
+
+
+def normalize_unit(unit):
+    return (unit or "").strip().lower()
+
+
+def kg_per_unit(unit):
+    """Kilograms in one `unit`, or None if it isn't a weight we know."""
+    factor = UNITS_IN_KG.get(normalize_unit(unit))
+    return None if factor is None else Decimal(factor)
+
+
+def kg_per_unit_expression(field="unit"):
+    """kg_per_unit() as a database expression over `field`."""
+    spellings = {}
+    for spelling, factor in sorted(UNITS_IN_KG.items()):
+        spellings.setdefault(factor, []).append(spelling)
+    unit = Lower(Trim(field))
+    return Case(
+        *(When(In(unit, names), then=Value(Decimal(factor))) for factor, names in sorted(spellings.items())),
+        default=None,
+        output_field=DecimalField(max_digits=12, decimal_places=8),
+    )
+
+
+def price_per_kg_expression():
+    return F("price_per_unit") / kg_per_unit_expression()
+
+
+def quantity_kg_expression():
+    return F("quantity") * kg_per_unit_expression()
@@ -7,7 +7,11 @@ from .views import (
     WeatherReportViewSet,
     FarmingUpdateViewSet,
     UserSignUpView,
-    AskAIView
+    AskAIView,
+    AskAIStreamView,
+    ResponseCacheStatsView,
+    SyncView,
+    PriceIndexView,
 )
 
 # Create a router
@@ -23,6 +27,10 @@ router.register(r'weatherreports',WeatherReportViewSet, basename="weatherreport"
 # Include router URLs
 urlpatterns = [
     path("ask-ai/", AskAIView.as_view(), name="ask-ai"),  
+    path("ask-ai/stream/", AskAIStreamView.as_view(), name="ask-ai-stream"),
+    path("cache-stats/", ResponseCacheStatsView.as_view(), name="cache-stats"),
+    path("sync/", SyncView.as_view(), name="sync"),
+    path("prices/", PriceIndexView.as_view(), name="prices"),
     path('', include(router.urls)),
     
     
@@ -1,21 +1,37 @@
 from rest_framework import permissions, viewsets, generics,status,serializers
 from rest_framework.response import Response
 from rest_framework.decorators import action
-from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework.parsers import MultiPartParser
 from django.contrib.auth import get_user_model
 from .models import FarmingUpdate,FarmProduct,Order, WeatherReport
-from .serializers import UserSerializer,FarmingUpdateSerializer,FarmProductSerializer,OrderSerializer,WeatherReportSerializer,SignUpSerializer
+from .serializers import ProfileSerializer,FarmingUpdateSerializer,FarmProductSerializer,OrderSerializer,WeatherReportSerializer,SignUpSerializer,CheckoutSerializer,OrderStatusSerializer
+from .authentication import ClaimsRefreshToken
+from .pagination import KeysetPagination
+from .search import FullTextSearchFilter
+from .filters import PriceFilter
+from .conditional import ConditionalGetMixin
+from .response_cache import CachedResponseMixin, response_cache
+from .projections import Projection, ProjectedListMixin
+from .sparse import SparseFieldsViewMixin
+from .services import CheckoutError, InvalidTransition, checkout, set_order_status
+from .catalog import export_rows, import_products, iter_upload_rows
+from .weather import WeatherUpstreamError, get_weather, normalize_location
+from .dates import parse_date_range
+from . import ai, analytics, geo, prices, sync, weather_stats
 from django.conf import settings
-import requests
-from django.utils import timezone
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+import json
+import math
 from rest_framework.views import APIView
-import openai
 
 User = get_user_model()
 
 class UserViewSet(viewsets.ModelViewSet):
       queryset = User.objects.all()
-      serializer_class = UserSerializer
+      serializer_class = ProfileSerializer
       permission_classes = [permissions.IsAuthenticated]
 
       def get_queryset(self):
@@ -25,7 +41,10 @@ class UserViewSet(viewsets.ModelViewSet):
       def dashboard(self, request):
         user = request.user
         product_count = FarmProduct.objects.filter(farmer=user).count()
-        order_count = Order.objects.filter(buyer=user).count()
+        # Order figures come from the daily rollups, not a COUNT over app_order
+        scope = analytics.scope_for(user)
+        order_stats = analytics.lifetime(user, scope)
+        order_count = (order_stats if scope == "buyer" else analytics.lifetime(user, "buyer"))["orders"]
 
         return Response({
             "username": user.username,
@@ -34,112 +53,293 @@ class UserViewSet(viewsets.ModelViewSet):
             "is_buyer": getattr(user, "is_buyer", False),
             "products_count": product_count,
             "orders_count": order_count,
+            "order_stats": order_stats,
         })
+
+      @action(detail=False, methods=["get"])
+      def analytics(self, request):
+        """Daily order rollups for ?from=&to= (ISO dates, default the last ANALYTICS_DEFAULT_DAYS)."""
+        try:
+            start, end = parse_date_range(
+                request.query_params.get("from"),
+                request.query_params.get("to"),
+                settings.ANALYTICS_DEFAULT_DAYS,
+                settings.ANALYTICS_MAX_DAYS,
+            )
+        except ValueError as exc:
+            return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(analytics.report(request.user, start, end))
       
 
-class FarmerProductViewSet(viewsets.ModelViewSet):
+class FarmerProductViewSet(SparseFieldsViewMixin, ProjectedListMixin, viewsets.ModelViewSet):
       queryset = FarmProduct.objects.all()
       serializer_class = FarmProductSerializer
+      # list skips the serializer; same output as FarmProductSerializer
+      list_projection = Projection(
+            FarmProductSerializer, extras=[("distance_km", "distance", lambda km: round(km, 2))]
+      )
       permission_classes = [permissions.IsAuthenticated]
+      pagination_class = KeysetPagination
+      filter_backends = [FullTextSearchFilter, PriceFilter]  # ?q=, ?min_price=&max_price=&ordering=price
 
       def perform_create(self, serializer):
         # Automatically set farmer to the logged-in user
         serializer.save(farmer=self.request.user)
+        self.refresh_generated(serializer.instance)
+
+      def perform_update(self, serializer):
+        serializer.save()
+        self.refresh_generated(serializer.instance)
+
+      @staticmethod
+      def refresh_generated(product):
+        # the database computes these from unit/price/quantity; save() doesn't read them back
+        product.refresh_from_db(fields=["price_per_kg", "quantity_kg"])
 
       def get_queryset(self):
         # If farmer → show only their products
-        # If buyer → show all available products
+        # If buyer → show available products near them
+        # ?near=lat,lon&radius_km= → available products within the radius, nearest first
         user = self.request.user
+        # farmer is nested in the serializer → join it in the same query (unless ?expand= leaves it out)
+        queryset = self.select_expanded(FarmProduct.objects.all(), "farmer")
+
+        near = self.request.query_params.get("near")
+        if near is not None:
+            latitude, longitude = self.parse_near(near)
+            return self.nearby(queryset, latitude, longitude, self.parse_radius())
+
         if getattr(user, "is_farmer", False):
-            return FarmProduct.objects.filter(farmer=user)
+            return queryset.filter(farmer=user)
         if getattr(user, "is_buyer", False):
-            return FarmProduct.objects.filter(
-                available=True,
-                farmer__location=user.location  # ✅ filter by farmer’s location
+            # nearest first around the buyer's coordinates, else by farmer’s location (shared with /api/sync/)
+            if user.latitude is not None and user.longitude is not None:
+                self.keyset_ordering = ("distance", "id")
+            return geo.local_to(queryset, user, settings.NEAR_DEFAULT_RADIUS_KM).filter(available=True)
+
+        return queryset.filter(available=True)
+
+      def nearby(self, queryset, latitude, longitude, radius_km):
+        self.keyset_ordering = ("distance", "id")
+        return geo.near(queryset, latitude, longitude, radius_km).filter(available=True)
+
+      def parse_near(self, near):
+        try:
+            latitude, longitude = (float(part) for part in near.split(","))
+        except ValueError:
+            raise serializers.ValidationError({"near": "Expected near=<latitude>,<longitude>"})
+        if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+            raise serializers.ValidationError({"near": "Coordinates out of range"})
+        return latitude, longitude
+
+      def parse_radius(self):
+        try:
+            radius_km = float(self.request.query_params.get("radius_km", settings.NEAR_DEFAULT_RADIUS_KM))
+        except ValueError:
+            raise serializers.ValidationError({"radius_km": "Must be a number"})
+        if not 0 < radius_km <= settings.NEAR_MAX_RADIUS_KM:
+            raise serializers.ValidationError(
+                {"radius_km": f"Must be between 0 and {settings.NEAR_MAX_RADIUS_KM}"}
             )
+        return radius_km
 
-        return FarmProduct.objects.filter(available=True)
+      @action(detail=False, methods=["post"], url_path="import", parser_classes=[MultiPartParser])
+      def bulk_import(self, request):
+        """Create/update the farmer's catalog from a CSV or NDJSON upload, keyed by sku."""
+        if not getattr(request.user, "is_farmer", False):
+            return Response({"error": "Only farmers can import products"}, status=status.HTTP_403_FORBIDDEN)
 
+        upload = request.FILES.get("file")
+        if upload is None:
+            return Response({"error": "A CSV or NDJSON file is required"}, status=status.HTTP_400_BAD_REQUEST)
 
-class OrderViewSet(viewsets.ModelViewSet):
+        report = import_products(request.user, iter_upload_rows(upload))
+        return Response(report, status=status.HTTP_200_OK)
+
+      @action(detail=False, methods=["get"], url_path=r"export/(?P<fmt>csv|ndjson)")
+      def export(self, request, fmt):
+        """Stream the visible catalog as CSV or NDJSON without buffering it."""
+        content_type = "text/csv" if fmt == "csv" else "application/x-ndjson"
+        response = StreamingHttpResponse(export_rows(self.get_queryset(), fmt), content_type=content_type)
+        response["Content-Disposition"] = f'attachment; filename="products.{fmt}"'
+        return response
+
+
+class OrderViewSet(SparseFieldsViewMixin, ProjectedListMixin, viewsets.ModelViewSet):
     queryset = Order.objects.all()
     serializer_class = OrderSerializer
+    list_projection = Projection(OrderSerializer)
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = KeysetPagination
 
     def get_queryset(self):
         user = self.request.user
+        # buyer, product and product.farmer are nested in the serializer unless ?expand= says otherwise
+        queryset = self.select_expanded(Order.objects.all(), "buyer", "product__farmer")
         if getattr(user, "is_farmer", False):
             # Show orders of farmer’s products
-            return Order.objects.filter(product__farmer=user)
-        return Order.objects.filter(buyer=user)
+            return queryset.filter(farmer=user)
+        return queryset.filter(buyer=user)
 
     def perform_create(self, serializer):
-        product = serializer.validated_data["product"]
-        quantity = serializer.validated_data["quantity"]
+        # Stock is reserved atomically inside OrderSerializer.create
+        serializer.save(buyer=self.request.user)
+
+    def update(self, request, *args, **kwargs):
+        # Farmers only move orders for their products between statuses
+        if not getattr(request.user, "is_farmer", False):
+            return super().update(request, *args, **kwargs)
+        order = self.get_object()
+        serializer = OrderStatusSerializer(order, data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            set_order_status(order, serializer.validated_data["status"])
+        except InvalidTransition as exc:
+            return Response({"status": [str(exc)]}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(OrderSerializer(order, context=self.get_serializer_context()).data)
 
-        if quantity > product.quantity:
-            raise serializers.ValidationError(
-                {"quantity": f"Only {product.quantity} {product.unit} available"}
-            )
+    @action(detail=False, methods=["post"])
+    def checkout(self, request):
+        """Place a whole basket of orders in one all-or-nothing transaction."""
+        serializer = CheckoutSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
 
-        product.quantity -= quantity
-        product.save()
+        try:
+            orders = checkout(request.user, serializer.validated_data["items"])
+        except CheckoutError as exc:
+            return Response({"items": exc.errors}, status=status.HTTP_400_BAD_REQUEST)
 
-        serializer.save(
-            buyer=self.request.user,
-            total_price=quantity * product.price_per_unit
-        )
+        return Response({
+            "orders": OrderSerializer(orders, many=True).data,
+            "total_price": str(sum(order.total_price for order in orders)),
+        }, status=status.HTTP_201_CREATED)
 
 # --------------------------
 # Weather Report ViewSet
 # --------------------------
-class WeatherReportViewSet(viewsets.ReadOnlyModelViewSet):  # read-only
+class WeatherReportViewSet(CachedResponseMixin, ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):  # read-only
     queryset = WeatherReport.objects.all()
     serializer_class = WeatherReportSerializer
     permission_classes = [permissions.AllowAny]  # anyone can see weather reports
+    last_modified_field = "updated_at"  # rows are refreshed in place
+
+    def get_queryset(self):
+        queryset = WeatherReport.objects.all()
+        if self.action != "list":
+            return queryset
+        # ?location=&from=&to= is a range scan over the (location, report_date) key
+        params = self.request.query_params
+        try:
+            start, end = parse_date_range(
+                params.get("from"), params.get("to"), settings.WEATHER_RANGE_DEFAULT_DAYS, settings.WEATHER_RANGE_MAX_DAYS
+            )
+        except ValueError as exc:
+            raise serializers.ValidationError({"error": str(exc)})
+        queryset = queryset.filter(report_date__range=(start, end))
+        if params.get("location"):
+            queryset = queryset.filter(location=normalize_location(params["location"]))
+        return queryset.order_by("location", "report_date")
 
     @action(detail=False, methods=["post"])
     def fetch(self, request):
-        """Fetch weather from OpenWeather API and store it."""
+        """Fetch weather from OpenWeather API (or the cache) and store it."""
         location = request.data.get("location")
-        if not location:
+        if not isinstance(location, str) or not location.strip():
             return Response({"error": "Location is required"}, status=status.HTTP_400_BAD_REQUEST)
 
-        api_key = settings.OPENWEATHER_API_KEY
-        url = f"http://api.openweathermap.org/data/2.5/weather?q={location}&appid={api_key}&units=metric"
-
         try:
-            resp = requests.get(url)
-            data = resp.json()
-
-            if resp.status_code != 200:
-                return Response(data, status=resp.status_code)
-
-            # Extract values
-            report = WeatherReport.objects.create(
-                location=location,
-                report_date=timezone.now().date().isoformat(),  # UNIX timestamp, we’ll convert below
-                temperature=data["main"]["temp"],
-                humidity=data["main"]["humidity"],
-                rainfall=data.get("rain", {}).get("1h", 0.0),
-                conditions=data["weather"][0]["description"]
-            )
-
-            serializer = WeatherReportSerializer(report)
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
-
+            data, cached = get_weather(location)
+        except WeatherUpstreamError as e:
+            return Response(e.data, status=e.status_code)
         except Exception as e:
             return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        return Response(data, status=status.HTTP_200_OK if cached else status.HTTP_201_CREATED)
+
+    @action(detail=False, methods=["get"])
+    def statistics(self, request):
+        """
+        Rolling rainfall/temperature, growing-degree-days and anomalies per day.
+
+        ?location=Pune,Nashik (default: every location), ?from=&to=, ?window=
+        days for the rolling sums/means, ?base=&cap= GDD temperatures in °C.
+        """
+        params = request.query_params
+        try:
+            start, end = parse_date_range(
+                params.get("from"), params.get("to"), settings.WEATHER_STATS_DEFAULT_DAYS, settings.WEATHER_STATS_MAX_DAYS
+            )
+        except ValueError as exc:
+            return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        # int()/float() errors echo the raw input back; name the parameter instead
+        try:
+            window = int(params.get("window", 7))
+        except ValueError:
+            return Response({"error": "window must be a whole number of days"}, status=status.HTTP_400_BAD_REQUEST)
+        temperatures = {}
+        for name, default in [("base", 10.0), ("cap", 30.0)]:
+            try:
+                temperatures[name] = float(params.get(name, default))
+            except ValueError:
+                temperatures[name] = math.nan
+            if not math.isfinite(temperatures[name]):
+                return Response({"error": f"{name} must be a temperature in °C"}, status=status.HTTP_400_BAD_REQUEST)
+        base, cap = temperatures["base"], temperatures["cap"]
+        if not 1 <= window <= 366 or not base < cap:
+            return Response({"error": "window must be 1-366 days and base below cap"}, status=status.HTTP_400_BAD_REQUEST)
+
+        locations = sorted({normalize_location(name) for name in params.get("location", "").split(",")} - {""})
+        return Response(weather_stats.statistics(locations, start, end, window=window, base=base, cap=cap))
         
 
 
 # --------------------------
 # Farming Update ViewSet
 # --------------------------
-class FarmingUpdateViewSet(viewsets.ReadOnlyModelViewSet):  # read-only
+class FarmingUpdateViewSet(CachedResponseMixin, ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):  # read-only
     queryset = FarmingUpdate.objects.all()
     serializer_class = FarmingUpdateSerializer
     permission_classes = [permissions.AllowAny]  # anyone can see farming updates
+    filter_backends = [FullTextSearchFilter]  # ?q=
+    last_modified_field = "updated_at"  # edits don't move published_at
+
+
+# --------------------------
+# Delta Sync View
+# --------------------------
+class SyncView(APIView):
+    """Products, orders and updates changed or deleted since ?since=<sync_token>."""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        try:
+            data = sync.changes(request.user, request.query_params.get("since"))
+        except sync.InvalidSyncToken as e:
+            return Response({"since": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except sync.SyncTokenExpired as e:
+            return Response({"error": str(e)}, status=status.HTTP_410_GONE)
+        return Response(data, status=status.HTTP_200_OK)
+
+
+# --------------------------
+# Market Price View
+# --------------------------
+class PriceIndexView(APIView):
+    """Daily traded prices for ?product= (optionally ?location=) over ?from=&to=, from the price index."""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        params = request.query_params
+        product = params.get("product", "").strip()
+        if not product:
+            return Response({"error": "product is required"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            start, end = parse_date_range(
+                params.get("from"), params.get("to"), settings.PRICES_DEFAULT_DAYS, settings.PRICES_MAX_DAYS
+            )
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(prices.trend(product, params.get("location"), start, end))
 
 
 class UserSignUpView(generics.CreateAPIView):
@@ -154,7 +354,8 @@ class UserSignUpView(generics.CreateAPIView):
         user = serializer.save()
 
 
-        refresh = RefreshToken.for_user(user)
+        # access token carries the user claims ClaimsJWTAuthentication reads
+        refresh = ClaimsRefreshToken.for_user(user)
 
         return Response({
             "user" : serializer.data,
@@ -169,26 +370,62 @@ class UserSignUpView(generics.CreateAPIView):
 class AskAIView(APIView):
     permission_classes = [permissions.AllowAny]  # allow all, or change to IsAuthenticated if needed
 
+    def get_permissions(self):
+        # GET exposes the answer cache stats, which is for staff only
+        if self.request.method == "GET":
+            return [permissions.IsAdminUser()]
+        return super().get_permissions()
+
+    def get(self, request):
+        return Response(ai.answer_cache.stats(), status=status.HTTP_200_OK)
+
     def post(self, request):
         question = request.data.get("question")
-        if not question:
+        if not isinstance(question, str) or not question.strip():
             return Response({"error": "Question is required"}, status=status.HTTP_400_BAD_REQUEST)
 
         try:
-            # Call OpenAI API
-            client = openai.OpenAI(api_key=settings.OPENAI_API_KEY)
-            response = client.chat.completions.create(
-                model="gpt-4o-mini",  # lightweight + fast
-                messages=[
-                    {"role": "system", "content": "You are AgriConnect AI, helping farmers with agriculture-related queries."},
-                    {"role": "user", "content": question},
-                ],
-                max_tokens=300
-            )
-
-            answer = response.choices[0].message.content
+            # Repeat questions are answered from the cache
+            answer, cached = ai.ask(question)
 
-            return Response({"question": question, "answer": answer}, status=status.HTTP_200_OK)
+            return Response({"question": question, "answer": answer, "cached": cached}, status=status.HTTP_200_OK)
 
         except Exception as e:
-            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
\ No newline at end of file
+            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class ResponseCacheStatsView(APIView):
+    # hit rate of the cached /api/updates/ and /api/weather-reports/ responses
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return Response(response_cache.stats(), status=status.HTTP_200_OK)
+
+
+@method_decorator(csrf_exempt, name="dispatch")
+class AskAIStreamView(View):
+    """
+    Async, token-by-token variant of AskAIView served as server-sent events.
+    Run under ASGI (base/asgi.py) so a waiting conversation doesn't hold a worker.
+    GET ?question= works with EventSource; POST takes {"question": ...}.
+    """
+
+    async def get(self, request):
+        return self.stream(request.GET.get("question"))
+
+    async def post(self, request):
+        try:
+            question = json.loads(request.body or b"{}").get("question")
+        except (ValueError, AttributeError):
+            question = None
+        return self.stream(question)
+
+    def stream(self, question):
+        if not isinstance(question, str) or not question.strip():
+            return JsonResponse({"error": "Question is required"}, status=status.HTTP_400_BAD_REQUEST)
+
+        response = StreamingHttpResponse(ai.stream_answer(question), content_type="text/event-stream")
+        response["Cache-Control"] = "no-cache"
+        response["X-Accel-Buffering"] = "no"  # don't let nginx buffer the stream
+        return response
+
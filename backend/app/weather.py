@@ -0,0 +1,288 @@
+import asyncio
+import threading
+from datetime import datetime, time, timedelta
+from urllib.parse import urlsplit
+
+import httpx
+import requests
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Avg, Count, Max, Min
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .geo import normalize_location
+from .models import WeatherReading, WeatherReport
+from .response_cache import response_cache
+from .serializers import WeatherReportSerializer
+
+READING_FIELDS = ["temperature", "humidity", "rainfall", "conditions"]
+UPSERT_FIELDS = [*READING_FIELDS, "temperature_min", "temperature_max", "samples", "updated_at"]
+
+
+class WeatherUpstreamError(Exception):
+    """OpenWeather answered with a non-200 status; carries its payload through."""
+
+    def __init__(self, status_code, data):
+        self.status_code = status_code
+        self.data = data
+        super().__init__(f"OpenWeather returned {status_code}")
+
+
+def cache_key(location):
+    return f"weather:{normalize_location(location).casefold()}"
+
+
+def _request_params(location):
+    return {"q": location, "appid": settings.OPENWEATHER_API_KEY, "units": "metric"}
+
+
+def _parse_reading(status_code, data):
+    if status_code != 200:
+        raise WeatherUpstreamError(status_code, data)
+    return {
+        "temperature": data["main"]["temp"],
+        "humidity": data["main"]["humidity"],
+        "rainfall": data.get("rain", {}).get("1h", 0.0),
+        "conditions": data["weather"][0]["description"],
+    }
+
+
+def fetch_current_weather(location):
+    """Call OpenWeather for `location` and return the fields we store."""
+    resp = requests.get(
+        settings.OPENWEATHER_URL,
+        params=_request_params(location),
+        timeout=settings.OPENWEATHER_TIMEOUT,
+    )
+    return _parse_reading(resp.status_code, resp.json())
+
+
+def store_report(location, reading):
+    return store_reports({location: reading})[0]
+
+
+def _fold(report, reading):
+    # today's row shows the latest reading and the range seen so far
+    temperature = reading["temperature"]
+    for field, value in reading.items():
+        setattr(report, field, value)
+    report.temperature_min = min(temperature, report.temperature_min if report.temperature_min is not None else temperature)
+    report.temperature_max = max(temperature, report.temperature_max if report.temperature_max is not None else temperature)
+    report.samples += 1
+
+
+def store_reports(readings):
+    """
+    Record every {location: reading} as a raw WeatherReading and upsert it
+    into today's WeatherReport in a fixed number of statements, then warm
+    the cache with the results.
+    """
+    today = timezone.now().date()
+    now = timezone.now()
+    existing = {
+        report.location: report
+        for report in WeatherReport.objects.filter(report_date=today, location__in=readings)
+    }
+
+    to_create, to_update = [], []
+    for location, reading in readings.items():
+        report = existing.get(location)
+        if report is None:
+            temperature = reading["temperature"]
+            report = WeatherReport(
+                location=location,
+                report_date=today,
+                temperature_min=temperature,
+                temperature_max=temperature,
+                updated_at=now,
+                **reading,
+            )
+            to_create.append(report)
+            continue
+        _fold(report, reading)
+        # bulk_update() skips auto_now, so stamp it by hand
+        report.updated_at = now
+        to_update.append(report)
+
+    WeatherReading.objects.bulk_create(
+        WeatherReading(location=location, observed_at=now, **reading) for location, reading in readings.items()
+    )
+    # A concurrent fetch may have created the row since; the newer reading wins
+    WeatherReport.objects.bulk_create(
+        to_create,
+        update_conflicts=True,
+        unique_fields=["location", "report_date"],
+        update_fields=UPSERT_FIELDS,
+    )
+    WeatherReport.objects.bulk_update(to_update, UPSERT_FIELDS)
+    # bulk writes don't send post_save
+    response_cache.invalidate(WeatherReport, [report.pk for report in to_create + to_update])
+
+    cache.set_many(
+        {
+            cache_key(report.location): dict(WeatherReportSerializer(report).data)
+            for report in to_create + to_update
+        },
+        settings.WEATHER_CACHE_TTL,
+    )
+    return to_create + to_update
+
+
+def fresh_report(location):
+    """Today's stored report for `location` if it is younger than the cache TTL."""
+    return WeatherReport.objects.filter(
+        location=location,
+        report_date=timezone.now().date(),
+        updated_at__gte=timezone.now() - timedelta(seconds=settings.WEATHER_CACHE_TTL),
+    ).first()
+
+
+# Per-location locks so concurrent misses wait for one upstream call
+_inflight_guard = threading.Lock()
+_inflight = {}
+
+
+def get_weather(location):
+    """
+    Return (serialized report, cached) for `location`.
+
+    Fresh data is served from the cache, or from a row refreshed by the
+    refresh_weather command, for WEATHER_CACHE_TTL seconds. On a miss, only
+    one thread per process calls OpenWeather for a given key; the rest block
+    on its lock and then read what it cached.
+    """
+    location = normalize_location(location)
+    key = cache_key(location)
+
+    data = cache.get(key)
+    if data is not None:
+        return data, True
+
+    with _inflight_guard:
+        lock = _inflight.setdefault(key, threading.Lock())
+
+    with lock:
+        data = cache.get(key)
+        if data is not None:
+            return data, True
+        try:
+            report = fresh_report(location)
+            cached = report is not None
+            if report is None:
+                report = store_report(location, fetch_current_weather(location))
+            data = dict(WeatherReportSerializer(report).data)
+            cache.set(key, data, settings.WEATHER_CACHE_TTL)
+        finally:
+            with _inflight_guard:
+                _inflight.pop(key, None)
+
+    return data, cached
+
+
+# --------------------------
+# Retention
+# --------------------------
+@transaction.atomic
+def downsample(days=None, batch_size=1000):
+    """
+    Fold raw readings from before the last `days` days into one WeatherReport
+    per location and day (means, temperature range, most frequent conditions)
+    and delete them. Returns (reports written, readings deleted).
+    """
+    days = settings.WEATHER_RAW_RETENTION_DAYS if days is None else days
+    cutoff = timezone.make_aware(datetime.combine(timezone.localdate() - timedelta(days=days), time.min))
+    old = WeatherReading.objects.filter(observed_at__lt=cutoff).annotate(day=TruncDate("observed_at"))
+
+    conditions, counted = {}, {}
+    for location, day, text, n in old.values_list("location", "day", "conditions").annotate(n=Count("id")).order_by():
+        if n > counted.get((location, day), 0):
+            conditions[location, day], counted[location, day] = text, n
+
+    now = timezone.now()
+    reports = [
+        WeatherReport(
+            location=row["location"],
+            report_date=row["day"],
+            temperature=row["avg_temperature"],
+            temperature_min=row["min_temperature"],
+            temperature_max=row["max_temperature"],
+            humidity=row["avg_humidity"],
+            rainfall=row["avg_rainfall"],
+            conditions=conditions[row["location"], row["day"]],
+            samples=row["samples"],
+            updated_at=now,
+        )
+        # aliased: annotations may not shadow the model's own fields
+        for row in old.values("location", "day").annotate(
+            avg_temperature=Avg("temperature"),
+            min_temperature=Min("temperature"),
+            max_temperature=Max("temperature"),
+            avg_humidity=Avg("humidity"),
+            avg_rainfall=Avg("rainfall"),
+            samples=Count("id"),
+        ).order_by()
+    ]
+    WeatherReport.objects.bulk_create(
+        reports,
+        batch_size=batch_size,
+        update_conflicts=True,
+        unique_fields=["location", "report_date"],
+        update_fields=UPSERT_FIELDS,
+    )
+    deleted, _ = WeatherReading.objects.filter(observed_at__lt=cutoff).delete()
+    if reports:
+        response_cache.invalidate(WeatherReport)
+    return len(reports), deleted
+
+
+# --------------------------
+# Concurrent batch refresh
+# --------------------------
+class HostRateLimiter:
+    """Spaces requests to each host at most `rate` per second."""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0.0
+        self._next_slot = {}
+        self._lock = asyncio.Lock()
+
+    async def wait(self, host):
+        loop = asyncio.get_running_loop()
+        async with self._lock:
+            now = loop.time()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+async def fetch_many(locations, concurrency=10, rate=10.0, url=None):
+    """
+    Fetch current weather for every location concurrently, with at most
+    `concurrency` requests in flight and `rate` requests/s per host.
+    Returns {location: reading or exception}.
+    """
+    url = url or settings.OPENWEATHER_URL
+    semaphore = asyncio.Semaphore(concurrency)
+    limiter = HostRateLimiter(rate)
+    host = urlsplit(url).netloc
+
+    async with httpx.AsyncClient(
+        timeout=settings.OPENWEATHER_TIMEOUT,
+        limits=httpx.Limits(max_connections=concurrency),
+    ) as client:
+
+        async def fetch_one(location):
+            async with semaphore:
+                await limiter.wait(host)
+                try:
+                    resp = await client.get(url, params=_request_params(location))
+                    return location, _parse_reading(resp.status_code, resp.json())
+                except Exception as exc:
+                    return location, exc
+
+        results = await asyncio.gather(*(fetch_one(location) for location in locations))
+
+    return dict(results)
@@ -0,0 +1,158 @@
+"""
+Vectorized weather statistics (GET /api/weather-reports/statistics/).
+
+The requested locations' whole WeatherReport history is read in one query
+and laid out as (location x day) NumPy grids, with NaN for days without a
+report. Rolling windows, growing-degree-days and anomalies are whole-array
+operations from there; nothing loops per row in Python.
+
+Anomalies are measured against each location's own baseline: the mean of
+every stored year for that day of year, smoothed over BASELINE_SMOOTHING
+days around it.
+"""
+from datetime import timedelta
+
+import numpy as np
+from django.db.models import CharField
+from django.db.models.functions import Cast, Coalesce
+
+from .models import WeatherReport
+
+DAYS_OF_YEAR = 366
+BASELINE_SMOOTHING = 15  # days, centred
+
+
+# ---- Loading ----
+def load(locations, end):
+    """(names, location codes, dates, value columns) for every report up to `end`."""
+    queryset = WeatherReport.objects.filter(report_date__lte=end).order_by()
+    if locations:
+        queryset = queryset.filter(location__in=locations)
+    rows = queryset.values_list(
+        "location",
+        # ISO text parses into datetime64 in C; date objects go one by one
+        Cast("report_date", CharField()),
+        "temperature",
+        # rows from before temperature_min/max existed fall back to the reading
+        Coalesce("temperature_min", "temperature"),
+        Coalesce("temperature_max", "temperature"),
+        "rainfall",
+    )
+    table = np.array(list(rows), dtype=object).reshape(-1, 6)
+    if not len(table):
+        return [], None, None, None
+
+    names, codes = np.unique(table[:, 0].astype(str), return_inverse=True)
+    dates = table[:, 1].astype("datetime64[D]")
+    values = table[:, 2:].astype(float)
+    columns = {
+        name: values[:, i] for i, name in enumerate(["temperature", "temperature_min", "temperature_max", "rainfall"])
+    }
+    return names.tolist(), codes, dates, columns
+
+
+def _grid(codes, offsets, values, shape):
+    grid = np.full(shape, np.nan)
+    grid[codes, offsets] = values
+    return grid
+
+
+def _day_of_year(dates):
+    return (dates - dates.astype("datetime64[Y]").astype("datetime64[D]")).astype(int)
+
+
+# ---- Statistics ----
+def _trailing_sum(values, window):
+    totals = np.cumsum(values, axis=1, dtype=float)
+    totals[:, window:] -= totals[:, :-window].copy()
+    return totals
+
+
+def rolling(grid, window):
+    """Trailing `window`-day (sum, mean) over the days that have a value."""
+    present = ~np.isnan(grid)
+    sums = _trailing_sum(np.where(present, grid, 0.0), window)
+    counts = _trailing_sum(present, window)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(counts > 0, sums, np.nan), np.where(counts > 0, sums / counts, np.nan)
+
+
+def growing_degree_days(temperature_min, temperature_max, base, cap):
+    """Daily GDD by the averaging method, with temperatures clipped to [base, cap]."""
+    low = np.clip(temperature_min, base, cap)
+    high = np.clip(temperature_max, base, cap)
+    return (low + high) / 2 - base
+
+
+def baseline(codes, doy, values, n_locations):
+    """(location x day-of-year) mean of `values` over all years, circularly smoothed."""
+    present = ~np.isnan(values)
+    flat = codes[present] * DAYS_OF_YEAR + doy[present]
+    size = n_locations * DAYS_OF_YEAR
+    sums = np.bincount(flat, weights=values[present], minlength=size).reshape(n_locations, DAYS_OF_YEAR)
+    counts = np.bincount(flat, minlength=size).reshape(n_locations, DAYS_OF_YEAR).astype(float)
+
+    sums, counts = _smooth(sums), _smooth(counts)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(counts > 0, sums / counts, np.nan)
+
+
+def _smooth(values):
+    # centred window; the year wraps so late December smooths into early January
+    half = BASELINE_SMOOTHING // 2
+    wrapped = np.concatenate([values[:, DAYS_OF_YEAR - half:], values, values[:, :half]], axis=1)
+    return _trailing_sum(wrapped, 2 * half + 1)[:, 2 * half:]
+
+
+def _compact(grid):
+    # NaN -> None; two decimals is finer than any of the readings
+    return np.where(np.isnan(grid), None, np.round(grid, 2)).tolist()
+
+
+def statistics(locations, start, end, window=7, base=10.0, cap=30.0):
+    """
+    Daily series from `start` to `end` for each location, as one array per
+    metric with a row per location (see the response's "locations").
+    """
+    names, codes, dates, columns = load(locations, end)
+    first = np.datetime64(start, "D")
+    calendar = np.arange(first, np.datetime64(end + timedelta(days=1), "D"))
+    data = {
+        "locations": names,
+        "dates": calendar.astype(str).tolist(),
+        "window": window,
+        "base_temperature": base,
+        "cap_temperature": cap,
+    }
+    if not names:
+        return data
+
+    # History before `start` still feeds the rolling windows and the baseline
+    origin = min(dates.min(), first)
+    offsets = (dates - origin).astype(int)
+    shape = (len(names), int((calendar[-1] - origin).astype(int)) + 1)
+    grids = {name: _grid(codes, offsets, values, shape) for name, values in columns.items()}
+    visible = slice(int((first - origin).astype(int)), None)
+
+    rainfall_sum, rainfall_mean = rolling(grids["rainfall"], window)
+    _, temperature_mean = rolling(grids["temperature"], window)
+    gdd = growing_degree_days(grids["temperature_min"], grids["temperature_max"], base, cap)[:, visible]
+
+    doy = _day_of_year(dates)
+    calendar_doy = _day_of_year(calendar)
+    temperature_baseline = baseline(codes, doy, columns["temperature"], len(names))[:, calendar_doy]
+    rainfall_baseline = baseline(codes, doy, columns["rainfall"], len(names))[:, calendar_doy]
+
+    data.update({
+        "temperature": _compact(grids["temperature"][:, visible]),
+        "rainfall": _compact(grids["rainfall"][:, visible]),
+        "rainfall_sum": _compact(rainfall_sum[:, visible]),
+        "rainfall_mean": _compact(rainfall_mean[:, visible]),
+        "temperature_mean": _compact(temperature_mean[:, visible]),
+        "gdd": _compact(gdd),
+        # accumulated from `start`; missing days add nothing
+        "gdd_cumulative": _compact(np.where(np.isnan(gdd), np.nan, np.nancumsum(gdd, axis=1))),
+        "temperature_anomaly": _compact(grids["temperature"][:, visible] - temperature_baseline),
+        "rainfall_anomaly": _compact(grids["rainfall"][:, visible] - rainfall_baseline),
+    })
+    return data
@@ -3,6 +3,10 @@ ASGI config for base project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Serve it with an ASGI server (e.g. ``uvicorn base.asgi:application``) so the
+async streaming views such as /api/ask-ai/stream/ can hold many open
+connections per process.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
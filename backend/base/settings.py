@@ -56,6 +56,9 @@ INSTALLED_APPS = [
 AUTH_USER_MODEL = 'app.User'
 
 MIDDLEWARE = [
+    # first, so its timings cover the rest of the stack
+    "app.metrics.MetricsMiddleware",
+    "app.slow_queries.SlowQueryMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -104,19 +107,88 @@ DATABASES = {
     }
 }
 
+# Local memory by default; point CACHE_URL / RESPONSE_CACHE_URL at a shared
+# store (e.g. redis://host:6379/1) so every worker sees the same entries.
+CACHES = {
+    "default": env.cache_url("CACHE_URL", default="locmemcache://"),
+    "responses": env.cache_url("RESPONSE_CACHE_URL", default="locmemcache://responses"),
+}
+# Rendered /api/updates/ and /api/weather-reports/ responses (app/response_cache.py)
+RESPONSE_CACHE_TTL = env.int("RESPONSE_CACHE_TTL", default=300)
+
 OPENWEATHER_API_KEY = env("OPENWEATHER_API_KEY")
+OPENWEATHER_URL = env("OPENWEATHER_URL", default="http://api.openweathermap.org/data/2.5/weather")
+OPENWEATHER_TIMEOUT = env.float("OPENWEATHER_TIMEOUT", default=5.0)
+# Seconds a location's weather is served from cache before OpenWeather is asked again
+WEATHER_CACHE_TTL = env.int("WEATHER_CACHE_TTL", default=600)
+# /api/weather-reports/ date range: default and largest span per request
+WEATHER_RANGE_DEFAULT_DAYS = env.int("WEATHER_RANGE_DEFAULT_DAYS", default=30)
+WEATHER_RANGE_MAX_DAYS = env.int("WEATHER_RANGE_MAX_DAYS", default=366)
+# /api/weather-reports/statistics/ date range: default and largest span (ten years)
+WEATHER_STATS_DEFAULT_DAYS = env.int("WEATHER_STATS_DEFAULT_DAYS", default=365)
+WEATHER_STATS_MAX_DAYS = env.int("WEATHER_STATS_MAX_DAYS", default=3660)
+# Days raw readings are kept before downsample_weather folds them into daily reports
+WEATHER_RAW_RETENTION_DAYS = env.int("WEATHER_RAW_RETENTION_DAYS", default=7)
 OPENAI_API_KEY = env("OPENAI_API_KEY")
+# Ask-AI answer cache: max distinct questions kept per process, and their lifetime in seconds
+ASK_AI_CACHE_SIZE = env.int("ASK_AI_CACHE_SIZE", default=1000)
+ASK_AI_CACHE_TTL = env.int("ASK_AI_CACHE_TTL", default=24 * 60 * 60)
 
 REST_FRAMEWORK = {
       'DEFAULT_AUTHENTICATION_CLASSES' :( 
-            'rest_framework_simplejwt.authentication.JWTAuthentication',
+            # JWTAuthentication that builds request.user from token claims (app/authentication.py)
+            'app.authentication.ClaimsJWTAuthentication',
         ),
         'DEFAULT_PERMISSION_CLASSES' : (
               'rest_framework.permissions.IsAuthenticated',
         ),
+        # orjson-backed, same bytes as rest_framework.renderers.JSONRenderer
+        'DEFAULT_RENDERER_CLASSES' : (
+              'app.renderers.ORJSONRenderer',
+              'rest_framework.renderers.BrowsableAPIRenderer',
+        ),
 
 }
 
+# Keyset pagination for the product and order lists (app/pagination.py).
+# Clients may ask for ?page_size= up to API_MAX_PAGE_SIZE.
+API_PAGE_SIZE = env.int("API_PAGE_SIZE", default=50)
+API_MAX_PAGE_SIZE = env.int("API_MAX_PAGE_SIZE", default=200)
+
+# Radius search on /api/products/?near=lat,lon&radius_km= (and a buyer's default view)
+NEAR_DEFAULT_RADIUS_KM = env.float("NEAR_DEFAULT_RADIUS_KM", default=25.0)
+NEAR_MAX_RADIUS_KM = env.float("NEAR_MAX_RADIUS_KM", default=500.0)
+
+# Delta sync (/api/sync/, app/sync.py): rows per resource per call, how far a
+# caught-up cursor is held back for late commits, and how long deletions are remembered
+SYNC_MAX_ROWS = env.int("SYNC_MAX_ROWS", default=500)
+SYNC_OVERLAP_SECONDS = env.int("SYNC_OVERLAP_SECONDS", default=5)
+SYNC_TOMBSTONE_RETENTION_DAYS = env.int("SYNC_TOMBSTONE_RETENTION_DAYS", default=30)
+
+# Order analytics (/api/users/analytics/, app/analytics.py): default and
+# largest date range per request
+ANALYTICS_DEFAULT_DAYS = env.int("ANALYTICS_DEFAULT_DAYS", default=30)
+ANALYTICS_MAX_DAYS = env.int("ANALYTICS_MAX_DAYS", default=366)
+
+# Market price index (/api/prices/, app/prices.py): default and largest date range
+PRICES_DEFAULT_DAYS = env.int("PRICES_DEFAULT_DAYS", default=30)
+PRICES_MAX_DAYS = env.int("PRICES_MAX_DAYS", default=366)
+
+# Request metrics (/metrics, app/metrics.py): share of requests measured
+# (0 turns collection off), latency histogram buckets in seconds, and the
+# bearer token scrapers must send (unset: staff sessions only)
+METRICS_SAMPLE_RATE = env.float("METRICS_SAMPLE_RATE", default=1.0)
+METRICS_LATENCY_BUCKETS = env.list(
+    "METRICS_LATENCY_BUCKETS", cast=float, default=[0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0]
+)
+METRICS_TOKEN = env("METRICS_TOKEN", default="")
+
+# Slow-query sampler (app/slow_queries.py): statements slower than this are
+# logged with their plan (0 turns it off), and how many entries the ring
+# buffer keeps
+SLOW_QUERY_THRESHOLD_MS = env.float("SLOW_QUERY_THRESHOLD_MS", default=200.0)
+SLOW_QUERY_LOG_SIZE = env.int("SLOW_QUERY_LOG_SIZE", default=100)
+
 SIMPLE_JWT = {
       "ACCESS_TOKEN_LIFETIME" : timedelta(minutes=10),
       "REFRESH_TOKEN_LIFETIME" : timedelta(days=1),
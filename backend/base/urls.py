@@ -18,15 +18,20 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path,include
 from app.views import UserSignUpView
+from app.metrics import metrics_view
+from app.slow_queries import slow_queries_view
+from app.authentication import ClaimsTokenObtainPairSerializer, ClaimsTokenRefreshSerializer
 from rest_framework_simplejwt.views import (
     TokenObtainPairView,
     TokenRefreshView,
 )
 
 urlpatterns = [
+    path("admin/slow-queries/", slow_queries_view, name="slow-queries"),
     path("admin/", admin.site.urls),
+    path("metrics", metrics_view, name="metrics"),
     path("api/", include("app.urls")),
     path('api/signup/', UserSignUpView.as_view(), name = 'signup'),
-    path("api/token/", TokenObtainPairView.as_view(), name="token_obtain_pair"),
-    path("api/token/refresh/", TokenRefreshView.as_view(), name="token_refresh"),
+    path("api/token/", TokenObtainPairView.as_view(serializer_class=ClaimsTokenObtainPairSerializer), name="token_obtain_pair"),
+    path("api/token/refresh/", TokenRefreshView.as_view(serializer_class=ClaimsTokenRefreshSerializer), name="token_refresh"),
 ]
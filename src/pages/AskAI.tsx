@@ -11,17 +11,40 @@ const AskAI = () => {
     setAnswer("");
 
     try {
-      const res = await fetch("http://127.0.0.1:8000/api/ask-ai/", {
+      // Server-sent events: the answer is streamed token by token
+      const res = await fetch("http://127.0.0.1:8000/api/ask-ai/stream/", {
         method: "POST",
         headers: { "Content-Type": "application/json" },
         body: JSON.stringify({ question }),
       });
 
-      const data = await res.json();
-      if (res.ok) {
-        setAnswer(data.answer);
-      } else {
+      if (!res.ok || !res.body) {
+        const data = await res.json();
         setAnswer("Error: " + (data.error || "Failed to get answer"));
+        return;
+      }
+
+      const reader = res.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = "";
+      while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        // Frames are separated by a blank line
+        const frames = buffer.split("\n\n");
+        buffer = frames.pop() || "";
+        for (const frame of frames) {
+          const dataLine = frame.split("\n").find((line) => line.startsWith("data: "));
+          if (!dataLine) continue;
+          const data = JSON.parse(dataLine.slice(6));
+          if (frame.startsWith("event: error")) {
+            setAnswer("Error: " + data.error);
+          } else if (data.token) {
+            setAnswer((prev) => prev + data.token);
+          }
+        }
       }
     } catch (err: any) {
       setAnswer("Error: " + err.message);
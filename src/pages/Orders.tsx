@@ -33,6 +33,9 @@ const Orders = () => {
   const [userData, setUserData] = useState<UserData | null>(null);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState<string | null>(null);
+  // cursor link to the next page of orders, null once everything is loaded
+  const [nextPage, setNextPage] = useState<string | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
 
   useEffect(() => {
     const token = localStorage.getItem("accessToken");
@@ -51,13 +54,20 @@ const Orders = () => {
         const user = await userRes.json();
         setUserData(user);
 
-        // fetch orders
-        const orderRes = await fetch("http://127.0.0.1:8000/api/orders/", {
+        // fetch orders: only the fields rendered below, so the farmer isn't embedded
+        const fields = [
+          "id", "quantity", "total_price", "status", "created_at",
+          "product.id", "product.name", "product.unit", "product.price_per_unit",
+          "buyer.id", "buyer.username",
+        ].join(",");
+        const orderRes = await fetch(`http://127.0.0.1:8000/api/orders/?fields=${fields}`, {
           headers: { Authorization: `Bearer ${token}` },
         });
         if (!orderRes.ok) throw new Error("Failed to fetch orders");
         const data = await orderRes.json();
-        setOrders(data);
+        // paginated: { next, previous, results }, newest first
+        setOrders(data.results);
+        setNextPage(data.next);
       } catch (err: any) {
         setError(err.message);
       } finally {
@@ -68,6 +78,27 @@ const Orders = () => {
     fetchData();
   }, [navigate]);
 
+  // Append the next page of orders (the link keeps ?fields=)
+  const loadMore = async () => {
+    const token = localStorage.getItem("accessToken");
+    if (!token || !nextPage) return;
+
+    setLoadingMore(true);
+    try {
+      const res = await fetch(nextPage, {
+        headers: { Authorization: `Bearer ${token}` },
+      });
+      if (!res.ok) throw new Error("Failed to fetch orders");
+      const data = await res.json();
+      setOrders((prev) => [...prev, ...data.results]);
+      setNextPage(data.next);
+    } catch (err: any) {
+      setError(err.message);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   // Update order status (farmer only)
   const handleStatusUpdate = async (orderId: number, newStatus: string) => {
     const token = localStorage.getItem("accessToken");
@@ -155,6 +186,16 @@ const Orders = () => {
           ))}
         </ul>
       )}
+
+      {nextPage && (
+        <button
+          onClick={loadMore}
+          disabled={loadingMore}
+          className="mt-6 border px-4 py-2 rounded bg-white hover:bg-gray-100 disabled:opacity-50"
+        >
+          {loadingMore ? "Loading..." : "Load more"}
+        </button>
+      )}
     </div>
   );
 };
@@ -27,6 +27,9 @@ const Products = () => {
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState<string | null>(null);
   const [userData, setUserData] = useState<UserData | null>(null);
+  // cursor link to the next page of products, null once everything is loaded
+  const [nextPage, setNextPage] = useState<string | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [showAddForm, setShowAddForm] = useState(false);
 
   // Form state (only for farmers)
@@ -65,7 +68,9 @@ const Products = () => {
         });
         if (!res.ok) throw new Error("Failed to fetch products");
         const data = await res.json();
-        setProducts(data);
+        // paginated: { next, previous, results }, newest first
+        setProducts(data.results);
+        setNextPage(data.next);
       } catch (err: any) {
         setError(err.message);
       } finally {
@@ -76,6 +81,27 @@ const Products = () => {
     fetchData();
   }, [navigate]);
 
+  // Append the next page of products
+  const loadMore = async () => {
+    const token = localStorage.getItem("accessToken");
+    if (!token || !nextPage) return;
+
+    setLoadingMore(true);
+    try {
+      const res = await fetch(nextPage, {
+        headers: { Authorization: `Bearer ${token}` },
+      });
+      if (!res.ok) throw new Error("Failed to fetch products");
+      const data = await res.json();
+      setProducts((prev) => [...prev, ...data.results]);
+      setNextPage(data.next);
+    } catch (err: any) {
+      setError(err.message);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   // Handle product input change (farmer)
   const handleChange = (
     e: React.ChangeEvent<HTMLInputElement | HTMLTextAreaElement>
@@ -102,7 +128,7 @@ const Products = () => {
       if (!res.ok) throw new Error("Failed to add product");
 
       const newProduct = await res.json();
-      setProducts([...products, newProduct]);
+      setProducts([newProduct, ...products]);
 
       // Reset form
       setFormData({
@@ -177,6 +203,46 @@ const handleOrder = async (productId: number, quantity: number) => {
 };
 
 
+  // Checkout every product with a quantity entered (buyer only)
+  // One request, all-or-nothing on the server
+  const handleCheckout = async () => {
+    const items = Object.entries(orderQuantity)
+      .filter(([, quantity]) => quantity > 0)
+      .map(([productId, quantity]) => ({ product_id: Number(productId), quantity }));
+    if (items.length === 0) return;
+
+    const token = localStorage.getItem("accessToken");
+    if (!token) {
+      navigate("/login");
+      return;
+    }
+
+    try {
+      const res = await fetch("http://127.0.0.1:8000/api/orders/checkout/", {
+        method: "POST",
+        headers: {
+          "Content-Type": "application/json",
+          Authorization: `Bearer ${token}`,
+        },
+        body: JSON.stringify({ items }),
+      });
+
+      if (!res.ok) {
+        const errorData = await res.json();
+        throw new Error(JSON.stringify(errorData) || "Failed to checkout");
+      }
+
+      const ordered = new Map(items.map((i) => [i.product_id, i.quantity]));
+      setProducts((prev) =>
+        prev.map((p) =>
+          ordered.has(p.id!) ? { ...p, quantity: p.quantity - ordered.get(p.id!)! } : p
+        )
+      );
+      setOrderQuantity({});
+    } catch (err: any) {
+      setError(err.message);
+    }
+  };
 
   if (loading) return <p className="text-center mt-10">Loading...</p>;
   if (error) return <p className="text-red-500 text-center">{error}</p>;
@@ -245,6 +311,28 @@ const handleOrder = async (productId: number, quantity: number) => {
             ))}
           </div>
         )}
+
+        {nextPage && (
+          <div className="mt-8 text-center">
+            <button
+              onClick={loadMore}
+              disabled={loadingMore}
+              className="bg-white border hover:bg-gray-100 text-gray-700 px-6 py-2 rounded-lg shadow-sm transition disabled:opacity-50"
+            >
+              {loadingMore ? "Loading..." : "Load more"}
+            </button>
+          </div>
+        )}
+
+        {/* Buyer can order everything entered above in one go */}
+        {userData?.is_buyer && products.length > 0 && (
+          <button
+            onClick={handleCheckout}
+            className="mt-8 bg-green-600 hover:bg-green-700 text-white px-6 py-3 rounded-lg font-semibold shadow-md transition"
+          >
+            Checkout all
+          </button>
+        )}
       </div>
 
       {/* Add Product Button & Form (Farmer only) */}